@@ -0,0 +1,183 @@
+import argparse
+import contextlib
+import itertools
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Ensure project root is on sys.path when running as a script
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import numpy as np
+import pandas as pd
+from chromadb import PersistentClient
+
+from seqindexing.app.store import open_window_store
+from seqindexing.app.utils import interpolate_to_fixed_size
+from seqindexing.benchmark import latency_summary, random_sketches
+from seqindexing.data.data_sp500 import (
+    BATCH_SIZE,
+    CSV_PATH,
+    HNSW_EF_CONSTRUCTION,
+    HNSW_EF_SEARCH,
+    HNSW_M,
+    HNSW_SPACE,
+    TARGET_SIZE,
+    hnsw_configuration,
+    ingest,
+)
+
+# Recall of Chroma's approximate (HNSW) search against exact L2, and its
+# query latency, for a grid of HNSW settings. Each (space, M,
+# ef_construction) combination builds a temporary collection over the same
+# tickers; every ef_search is then applied in place. Queries are real
+# windows of the indexed series (with a little noise) and random-walk
+# sketches like the ones drawn in the dashboard. The dashboard itself
+# searches its exact in-process WindowIndex, not HNSW, so these settings only
+# matter to clients that query the collection directly.
+#
+#   python -m seqindexing.ann_eval --max-stocks 20 --m 8 16 32 --ef-search 10 50 100 --target-recall 0.95
+
+
+def sample_queries(embeddings, n, noise, seed):
+    """Half real windows (plus gaussian noise), half drawn-looking sketches, as (kind, vector) pairs."""
+    rng = np.random.default_rng(seed)
+    n_windows = n // 2
+    picked = embeddings[rng.choice(len(embeddings), size=n_windows, replace=False)]
+    windows = picked + rng.normal(0.0, noise, size=picked.shape).astype(np.float32)
+    sketches = [interpolate_to_fixed_size(np.array(s), target_size=TARGET_SIZE)
+                for s in random_sketches(n - n_windows, seed=seed + 1)]
+    # Sketches are min-max normalized like the stored windows
+    sketches = [(s - s.min()) / (s.max() - s.min() or 1.0) for s in sketches]
+    return [("window", v) for v in windows] + [("sketch", np.asarray(v, dtype=np.float32)) for v in sketches]
+
+
+def exact_topk(embeddings, sq_norms, vector, k):
+    """Row ids and squared L2 distances of the k nearest windows, by brute force."""
+    distances = sq_norms - 2.0 * (embeddings @ vector) + float(vector @ vector)
+    top = np.argpartition(distances, k - 1)[:k]
+    top = top[np.argsort(distances[top], kind="stable")]
+    return top, distances
+
+
+def recall_at_k(rows, distances, exact_rows):
+    """
+    Share of the returned windows that are among the exact top k. Ties at the
+    k-th distance count as correct, so duplicate windows do not lower recall.
+    """
+    kth = distances[exact_rows[-1]]
+    return float(np.sum(distances[rows] <= kth + 1e-6 * max(1.0, abs(kth)))) / len(exact_rows)
+
+
+def evaluate(args):
+    df = pd.read_csv(CSV_PATH, parse_dates=["Date"]).set_index("Date").dropna(axis=1)
+    if args.max_stocks:
+        df = df.iloc[:, :args.max_stocks]
+
+    results = {"meta": {"args": vars(args), "tickers": len(df.columns)}, "baseline": [], "settings": []}
+    with tempfile.TemporaryDirectory(prefix="seqindexing_ann_") as tmp:
+        # The window store gives the exact rows every collection is built from
+        ingest(df, None, store_path=Path(tmp) / "window_store")
+        names, columns = open_window_store(Path(tmp) / "window_store")
+        embeddings = np.asarray(columns["embeddings"])
+        sq_norms = np.asarray(columns["sq_norms"])
+        row_of = {
+            (names[t], s, w): row for row, (t, s, w) in enumerate(zip(
+                columns["ticker_ids"].tolist(), columns["start_idx"].tolist(), columns["window_size"].tolist()))
+        }
+        results["meta"]["windows"] = len(embeddings)
+
+        queries = sample_queries(embeddings, args.queries, args.noise, args.seed)
+        exact = {}
+        for k in args.k:
+            timings = []
+            for q, (_, vector) in enumerate(queries):
+                t0 = time.perf_counter()
+                exact[k, q] = exact_topk(embeddings, sq_norms, vector, k)
+                timings.append(time.perf_counter() - t0)
+            results["baseline"].append({"method": "exact", "k": k, **latency_summary(timings)})
+            print(f"exact {results['baseline'][-1]}")
+
+        chroma_path = str(Path(tmp) / "chroma_db")
+        client = PersistentClient(path=chroma_path)
+        batch_size = min(BATCH_SIZE, client.get_max_batch_size())
+        for n, (space, m, ef_construction) in enumerate(itertools.product(args.space, args.m, args.ef_construction)):
+            configuration = hnsw_configuration(space, m, ef_construction, max(args.ef_search))
+            collection = client.create_collection(f"ann_eval_{n}", configuration=configuration)
+            t0 = time.perf_counter()
+            ingest(df, collection, batch_size=batch_size, store_path=None)
+            build_seconds = time.perf_counter() - t0
+
+            for ef_search in args.ef_search:
+                collection.modify(configuration={"hnsw": {"ef_search": ef_search}})
+                # An index already loaded in this process keeps its old ef until the client is reopened
+                client.clear_system_cache()
+                client = PersistentClient(path=chroma_path)
+                collection = client.get_collection(collection.name)
+                for k in args.k:
+                    timings, recalls = [], {"window": [], "sketch": []}
+                    for q, (kind, vector) in enumerate(queries):
+                        t0 = time.perf_counter()
+                        found = collection.query(query_embeddings=[vector], n_results=k, include=["metadatas"])
+                        timings.append(time.perf_counter() - t0)
+                        rows = np.array([row_of[meta["name"], meta["start_idx"], meta["window_size"]]
+                                         for meta in found["metadatas"][0]], dtype=np.intp)
+                        exact_rows, distances = exact[k, q]
+                        recalls[kind].append(recall_at_k(rows, distances, exact_rows))
+                    everything = recalls["window"] + recalls["sketch"]
+                    results["settings"].append({
+                        "space": space,
+                        "m": m,
+                        "ef_construction": ef_construction,
+                        "ef_search": ef_search,
+                        "effective_ef": max(ef_search, k),  # HNSW never searches fewer than k candidates
+                        "k": k,
+                        "build_seconds": round(build_seconds, 2),
+                        "recall": round(float(np.mean(everything)), 4),
+                        "recall_min": round(float(np.min(everything)), 4),
+                        "recall_windows": round(float(np.mean(recalls["window"])), 4) if recalls["window"] else None,
+                        "recall_sketches": round(float(np.mean(recalls["sketch"])), 4) if recalls["sketch"] else None,
+                        **latency_summary(timings),
+                    })
+                    print(f"hnsw {results['settings'][-1]}")
+            client.delete_collection(collection.name)
+
+    if args.target_recall is not None:
+        results["recommended"] = {
+            k: min((row for row in results["settings"] if row["k"] == k and row["recall"] >= args.target_recall),
+                   key=lambda row: row["p50_ms"], default=None)
+            for k in args.k
+        }
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Recall@k vs. query latency of the Chroma HNSW index over real windows.")
+    parser.add_argument("--max-stocks", type=int, default=20, help="tickers from data/sp500.csv to index (0 for all)")
+    parser.add_argument("--queries", type=int, default=200, help="query vectors (half real windows, half sketches)")
+    parser.add_argument("--noise", type=float, default=0.02, help="std of the noise added to sampled windows")
+    parser.add_argument("--k", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--space", nargs="+", default=[HNSW_SPACE], choices=["l2", "cosine", "ip"])
+    parser.add_argument("--m", type=int, nargs="+", default=[HNSW_M])
+    parser.add_argument("--ef-construction", type=int, nargs="+", default=[HNSW_EF_CONSTRUCTION])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[10, 50, HNSW_EF_SEARCH, 200])
+    parser.add_argument("--target-recall", type=float, help="also report the fastest setting reaching this recall per k")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    with contextlib.redirect_stdout(sys.stderr):
+        report = evaluate(args)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+        print(f"Wrote {args.out}", file=sys.stderr)
+    else:
+        print(text)
@@ -1,10 +1,35 @@
+import logging
+import time
 from flask import Flask, redirect
 import dash
-from .layout import layout
+from .logs import configure_logging
+from .layout import serve_layout
 from .callbacks import register_callbacks
+from .data import catalog, warm_up, query_cache_stats
+from .metrics import instrument_callbacks, register_metrics_route
+from .api import register_api_routes
+from .results import result_store
+
+log = logging.getLogger(__name__)
+
+
+def _gauges():
+    cache = query_cache_stats()
+    store = result_store.stats()
+    datasets = catalog.stats().values()
+    return {
+        "seqindexing_query_cache_entries": cache["entries"],
+        "seqindexing_query_cache_hit_rate": round(cache["hit_rate"], 4),
+        "seqindexing_result_store_entries": store["entries"],
+        "seqindexing_result_store_bytes": store["bytes"],
+        "seqindexing_datasets_loaded": sum(d["loaded"] for d in datasets),
+        "seqindexing_datasets_bytes": sum(d["bytes"] for d in datasets),
+    }
 
 
 def create_app():
+    configure_logging()
+    started = time.perf_counter()
     server = Flask(__name__)
     dash_app = dash.Dash(
         __name__,
@@ -15,8 +40,13 @@ def create_app():
         ],
     )
 
-    dash_app.layout = layout
+    dash_app.layout = serve_layout
+    instrument_callbacks(dash_app)
     register_callbacks(dash_app)
+    register_metrics_route(server, gauges=_gauges)
+    register_api_routes(server)
+    warm_up()
+    log.info("app cold start", extra={"fields": {"seconds": round(time.perf_counter() - started, 2)}})
 
     @server.route('/')
     def _root_redirect():
@@ -0,0 +1,155 @@
+import logging
+import time
+
+import numpy as np
+from flask import jsonify, request
+
+from .config import API_MAX_K, API_MAX_MASS_QUERIES, API_MAX_MASS_WINDOW_SIZES, API_MAX_QUERIES
+from .data import get_dataset, search_vectors
+from .metrics import metrics
+from .search import SEARCH_METRICS
+from .utils import normalize_minmax
+
+# POST /api/search runs a batch of query shapes through the dashboard's
+# search (data.search_vectors) and returns the hits as columns:
+#
+#   curl -X POST localhost:8060/api/search -H 'Content-Type: application/json' \
+#        -d '{"queries": [[1, 3, 2, 5, 4], [5, 4, 3, 2, 1]], "k": 5, "tickers": ["AAPL", "MSFT"]}'
+#
+# Request fields: queries (a list of shapes, or {id: shape}; any length >= 2,
+# min-max normalized and resampled like a drawn sketch, so only the shape
+# matters, not its scale), k (hits per ticker and query), metric, tickers,
+# window_range ([lo, hi] window sizes) and dataset. Each hit is one row of
+# `columns`; `ticker` indexes `names`. "mass" queries are not batched (each
+# scans every ticker once per window size), so they have their own, lower
+# limits on the number of queries and on the span of window_range.
+
+log = logging.getLogger(__name__)
+
+
+def parse_search_request(body):
+    """Validated search arguments from a request body; raises ValueError with a message for the client."""
+    if not isinstance(body, dict):
+        raise ValueError("expected a JSON object")
+
+    queries = body.get("queries")
+    if isinstance(queries, dict):
+        ids, shapes = list(queries), list(queries.values())
+    elif isinstance(queries, list):
+        ids, shapes = list(range(len(queries))), queries
+    else:
+        raise ValueError("queries must be a list of shapes or an object of id -> shape")
+    if not shapes:
+        raise ValueError("queries is empty")
+    if len(shapes) > API_MAX_QUERIES:
+        raise ValueError(f"at most {API_MAX_QUERIES} queries per request")
+    parsed = []
+    for query_id, shape in zip(ids, shapes):
+        try:
+            shape = np.asarray(shape, dtype=np.float64)
+        except (TypeError, ValueError):
+            raise ValueError(f"query {query_id!r} is not a list of numbers")
+        if shape.ndim != 1 or len(shape) < 2 or not np.all(np.isfinite(shape)):
+            raise ValueError(f"query {query_id!r} needs at least two finite values")
+        # The index holds min-max normalized windows, and a drawn sketch is normalized the same way
+        parsed.append(normalize_minmax(shape))
+
+    k = body.get("k", 10)
+    if not isinstance(k, int) or isinstance(k, bool) or not 1 <= k <= API_MAX_K:
+        raise ValueError(f"k must be an integer from 1 to {API_MAX_K}")
+
+    metric = body.get("metric", "euclidean")
+    if metric not in SEARCH_METRICS:
+        raise ValueError(f"metric must be one of {', '.join(SEARCH_METRICS)}")
+
+    try:
+        dataset = get_dataset(body.get("dataset"))
+    except KeyError as exc:
+        raise ValueError(exc.args[0])
+    if not dataset.available:
+        raise ValueError(f"dataset {dataset.id!r} has no price data")
+
+    tickers = body.get("tickers")
+    if tickers is not None:
+        if not isinstance(tickers, list) or not all(isinstance(t, str) for t in tickers):
+            raise ValueError("tickers must be a list of names")
+        known = set(dataset.series["titles"])
+        unknown = [t for t in tickers if t not in known]
+        if unknown:
+            raise ValueError(f"unknown tickers: {', '.join(unknown[:10])}")
+
+    window_range = body.get("window_range")
+    if window_range is not None:
+        if (not isinstance(window_range, list) or len(window_range) != 2
+                or not all(isinstance(w, int) and not isinstance(w, bool) for w in window_range)
+                or window_range[0] > window_range[1]):
+            raise ValueError("window_range must be [min, max] window sizes")
+        window_range = tuple(window_range)
+
+    if metric == "mass":
+        if len(parsed) > API_MAX_MASS_QUERIES:
+            raise ValueError(f"at most {API_MAX_MASS_QUERIES} mass queries per request")
+        if window_range is not None and window_range[1] - window_range[0] + 1 > API_MAX_MASS_WINDOW_SIZES:
+            raise ValueError(f"a mass window_range spans at most {API_MAX_MASS_WINDOW_SIZES} window sizes")
+
+    return {
+        "ids": ids, "shapes": parsed, "k": k, "metric": metric, "dataset": dataset.id,
+        "tickers": tickers or None, "window_range": window_range,
+    }
+
+
+def hit_columns(results):
+    """Hits of every query as parallel columns, with ticker names dictionary-encoded."""
+    names, name_index = [], {}
+    columns = {key: [] for key in ("query", "ticker", "start_idx", "end_idx", "window_size", "score",
+                                   "start_date", "end_date")}
+    for query, hits in enumerate(results):
+        for hit in hits:
+            ticker = name_index.get(hit["name"])
+            if ticker is None:
+                ticker = name_index[hit["name"]] = len(names)
+                names.append(hit["name"])
+            columns["query"].append(query)
+            columns["ticker"].append(ticker)
+            columns["start_idx"].append(hit["start_idx"])
+            columns["end_idx"].append(hit["end_idx"])
+            columns["window_size"].append(hit["window_size"])
+            columns["score"].append(round(float(hit["score"]), 6))
+            columns["start_date"].append(hit["start_date"])
+            columns["end_date"].append(hit["end_date"])
+    return names, columns
+
+
+def register_api_routes(server):
+    """POST /api/search on the Flask server (see the module comment for the request format)."""
+    @server.route("/api/search", methods=["POST"])
+    def _api_search():
+        started = time.perf_counter()
+        try:
+            args = parse_search_request(request.get_json(silent=True))
+        except ValueError as exc:
+            metrics.inc("seqindexing_api_requests_total", route="search", status=400)
+            return jsonify({"error": str(exc)}), 400
+
+        results = search_vectors(
+            args["shapes"], k=args["k"], filtered_titles=args["tickers"], window_range=args["window_range"],
+            metric=args["metric"], dataset=args["dataset"],
+        )
+        names, columns = hit_columns(results)
+        meta = {
+            "dataset": args["dataset"], "metric": args["metric"], "k": args["k"],
+            "window_range": args["window_range"], "ids": args["ids"],
+        }
+        response = jsonify(dict(meta, count=len(columns["query"]), names=names, columns=columns))
+
+        elapsed = time.perf_counter() - started
+        metrics.observe("seqindexing_api_seconds", elapsed, route="search", metric=args["metric"])
+        metrics.inc("seqindexing_api_requests_total", route="search", status=200)
+        log.info("api search", extra={"fields": {
+            "dataset": args["dataset"], "metric": args["metric"], "queries": len(args["shapes"]), "k": args["k"],
+            "tickers": len(args["tickers"]) if args["tickers"] else "all", "hits": len(columns["query"]),
+            "ms": round(elapsed * 1000.0, 2),
+        }})
+        return response
+
+    return server
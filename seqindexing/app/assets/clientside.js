@@ -0,0 +1,149 @@
+// Clientside filtering of match results by score threshold and window size.
+// Works on the compact columnar arrays written to the "match-arrays" store by
+// callbacks.match_arrays (t: ticker index, p: pattern index, s/e: start/end
+// row, w: window size, d: score, x0/x1: start/end dates), so dragging the
+// threshold slider or editing the window range never calls the server.
+
+(function () {
+    function keptMatches(arrays, threshold, minWs, maxWs) {
+        const keep = [];
+        if (!arrays) {
+            return keep;
+        }
+        const lo = minWs == null ? -Infinity : minWs;
+        const hi = maxWs == null ? Infinity : maxWs;
+        const thr = threshold == null ? Infinity : threshold;
+        for (let k = 0; k < arrays.d.length; k++) {
+            if (arrays.d[k] <= thr && arrays.w[k] >= lo && arrays.w[k] <= hi) {
+                keep.push(k);
+            }
+        }
+        return keep;
+    }
+
+    // Union of [s, e) intervals; returns match ids whose start opens a run,
+    // paired with the match id holding the run's furthest end.
+    function mergeRuns(arrays, ids) {
+        ids = ids.slice().sort((a, b) => arrays.s[a] - arrays.s[b]);
+        const runs = [];
+        for (const k of ids) {
+            const last = runs[runs.length - 1];
+            if (last && arrays.s[k] <= arrays.e[last.end]) {
+                if (arrays.e[k] > arrays.e[last.end]) {
+                    last.end = k;
+                }
+            } else {
+                runs.push({start: k, end: k});
+            }
+        }
+        return runs;
+    }
+
+    function groupBy(arrays, ids, key) {
+        const groups = new Map();
+        for (const k of ids) {
+            const g = key(k);
+            if (!groups.has(g)) {
+                groups.set(g, []);
+            }
+            groups.get(g).push(k);
+        }
+        return groups;
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        seqindexing: {
+            passThrough: function (value) {
+                return value;
+            },
+
+            windowSizeStore: function (minVal, maxVal, unit) {
+                return [minVal, maxVal, unit];
+            },
+
+            // Match shading of every rendered preview card. The server ranks and
+            // pages the cards by matches under the threshold; the visibility and
+            // order set here keep the rendered page in that order until it does.
+            filterPreviews: function (arrays, threshold, minWs, maxWs, children, figures, styles) {
+                if (!figures || figures.length === 0) {
+                    return [window.dash_clientside.no_update, window.dash_clientside.no_update];
+                }
+                const patternOf = {};
+                (arrays ? arrays.patterns : []).forEach((id, idx) => { patternOf[id] = idx; });
+
+                const counts = new Map();
+                for (const k of keptMatches(arrays, threshold, null, null)) {
+                    counts.set(arrays.t[k], (counts.get(arrays.t[k]) || 0) + 1);
+                }
+                const inRange = keptMatches(arrays, threshold, minWs, maxWs);
+                const byPair = groupBy(arrays, inRange, (k) => arrays.t[k] + ":" + arrays.p[k]);
+
+                const newFigures = figures.map((fig) => {
+                    const meta = (fig && fig.layout && fig.layout.meta) || {};
+                    const shapes = [];
+                    for (const shade of meta.shaded || []) {
+                        const ids = byPair.get(meta.ticker + ":" + patternOf[shade.pattern]) || [];
+                        for (const run of mergeRuns(arrays, ids)) {
+                            shapes.push({
+                                type: "rect", xref: "x", yref: "paper",
+                                x0: arrays.s[run.start],
+                                x1: Math.min(arrays.e[run.end], arrays.last),
+                                y0: 0, y1: 1,
+                                fillcolor: shade.color, opacity: 0.25,
+                                line: {width: 1, color: shade.color, dash: shade.dash},
+                                layer: "below",
+                            });
+                        }
+                    }
+                    return Object.assign({}, fig, {layout: Object.assign({}, fig.layout, {shapes: shapes})});
+                });
+
+                const newStyles = styles.map((style, idx) => {
+                    const meta = (figures[idx] && figures[idx].layout && figures[idx].layout.meta) || {};
+                    const count = counts.get(meta.ticker) || 0;
+                    const hidden = arrays && arrays.d.length > 0 && count === 0;
+                    return Object.assign({}, style, {display: hidden ? "none" : "block", order: -count});
+                });
+                return [newFigures, newStyles];
+            },
+
+            // Server-built main chart plus one filled region trace per
+            // (pattern, ticker) pair, restricted to the current filters.
+            composeMainPlot: function (base, arrays, threshold, minWs, maxWs) {
+                if (!base) {
+                    return window.dash_clientside.no_update;
+                }
+                const figure = Object.assign({}, base.figure, {data: (base.figure.data || []).slice()});
+                if (!arrays || !base.regions.length) {
+                    return figure;
+                }
+                const patternOf = {};
+                arrays.patterns.forEach((id, idx) => { patternOf[id] = idx; });
+                const byPair = groupBy(arrays, keptMatches(arrays, threshold, minWs, maxWs),
+                    (k) => arrays.t[k] + ":" + arrays.p[k]);
+
+                for (const region of base.regions) {
+                    const ids = byPair.get(region.ticker + ":" + patternOf[region.pattern]) || [];
+                    if (ids.length === 0) {
+                        continue;
+                    }
+                    const x = [];
+                    const y = [];
+                    for (const run of mergeRuns(arrays, ids)) {
+                        const x0 = arrays.x0[run.start];
+                        const x1 = arrays.x1[run.end];
+                        x.push(x0, x0, x1, x1, null);
+                        y.push(0, 1, 1, 0, null);
+                    }
+                    figure.data.push({
+                        type: "scatter", x: x, y: y, yaxis: "y2", mode: "lines",
+                        fill: "toself", fillcolor: region.color,
+                        line: {width: 1, color: region.color}, opacity: 0.25,
+                        hoverinfo: "skip", showlegend: false,
+                    });
+                }
+                return figure;
+            },
+        },
+    });
+})();
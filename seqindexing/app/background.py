@@ -0,0 +1,48 @@
+import logging
+from functools import partial
+
+from .config import BACKGROUND_ENABLED, BACKGROUND_CACHE_DIR, RESULT_STORE_BACKEND
+from .metrics import metrics
+
+# Optional dependency: background callbacks need diskcache (pip install "dash[diskcache]")
+try:
+    import diskcache
+    from dash import DiskcacheManager
+except ImportError:
+    diskcache = None
+
+log = logging.getLogger(__name__)
+
+
+def run_background_job(job_fn, *args):
+    """Entry point of a background job process; its metrics go to the spool for the server."""
+    metrics.mark_background_job()
+    try:
+        job_fn(*args)
+    finally:
+        metrics.flush_spool()
+
+
+if diskcache is not None:
+    class JobManager(DiskcacheManager):
+        """DiskcacheManager whose job processes start in run_background_job."""
+
+        def call_job_fn(self, key, job_fn, args, context):
+            return super().call_job_fn(key, partial(run_background_job, job_fn), args, context)
+
+
+def make_background_manager():
+    """
+    DiskcacheManager for long-running callbacks, or None to run them in the
+    request thread. Background jobs run in a child process, so the results
+    they write must go to a store every process can read.
+    """
+    if not BACKGROUND_ENABLED:
+        return None
+    if diskcache is None:
+        log.warning("background search disabled: diskcache is not installed")
+        return None
+    if RESULT_STORE_BACKEND != "disk":
+        log.warning("background search disabled: it needs result_store.backend = disk")
+        return None
+    return JobManager(diskcache.Cache(str(BACKGROUND_CACHE_DIR)))
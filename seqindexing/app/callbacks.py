@@ -1,9 +1,14 @@
-from dash import Input, Output, State, callback_context, ALL
+from dash import Input, Output, State, callback_context, ALL, Patch, ClientsideFunction
 from dash import html, dcc
-from .data import series, query_chroma_topk_for_each_name
-from .config import SERIES_WINDOW_SIZE
+from .data import get_dataset, query_chroma_topk_for_each_name
+from .search import SEARCH_METRICS
+from .config import SERIES_WINDOW_SIZE, PREVIEW_PAGE_SIZE, DOWNSAMPLE_METHOD, MAIN_PLOT_POINTS, PREVIEW_POINTS, BACKGROUND_BATCH_TICKERS
 from .utils import parse_and_interpolate_path, get_color_palette
+from .results import result_store, load_results
+from .downsample import downsample_indices, minmax_indices
+from .background import make_background_manager
 import dash
+import logging
 import plotly.graph_objs as go
 import numpy as np
 import uuid
@@ -23,97 +28,191 @@ except Exception:
         WINDOW_SIZE_LABELS,
     )
 
+log = logging.getLogger(__name__)
+
+
+def match_arrays(match_data, series):
+    """
+    Compact columnar copy of the match results for the clientside filters
+    (assets/clientside.js): one entry per match with its ticker index (t),
+    pattern index (p), start/end row (s/e), window size (w), score (d) and
+    start/end dates (x0/x1). `series` is the dataset's series dict.
+    """
+    name_to_index = {name: i for i, name in enumerate(series["titles"])}
+    patterns = []
+    pattern_index = {}
+    cols = {"t": [], "p": [], "s": [], "e": [], "w": [], "d": []}
+    for name, uuid_dict in (match_data or {}).items():
+        i = name_to_index.get(name)
+        if i is None:
+            continue
+        for pattern_id, matches in uuid_dict.items():
+            if pattern_id not in pattern_index:
+                pattern_index[pattern_id] = len(patterns)
+                patterns.append(pattern_id)
+            for m in matches:
+                if m.get("score") is None:
+                    continue
+                cols["t"].append(i)
+                cols["p"].append(pattern_index[pattern_id])
+                cols["s"].append(m["start_idx"])
+                cols["e"].append(m["end_idx"])
+                cols["w"].append(m["window_size"])
+                cols["d"].append(round(float(m["score"]), 6))
+    dates = series["dates"]
+    last = len(dates) - 1
+    x0 = np.datetime_as_string(dates[np.asarray(cols["s"], dtype=np.intp)], unit="s")
+    x1 = np.datetime_as_string(dates[np.minimum(np.asarray(cols["e"], dtype=np.intp), last)], unit="s")
+    return dict(cols, patterns=patterns, x0=x0.tolist(), x1=x1.tolist(), last=last)
+
+
+def distance_histogram(all_scores):
+    """Compact histogram of match distances shown above the threshold slider."""
+    hist_fig = go.Figure()
+    hist_fig.add_trace(go.Histogram(
+        x=all_scores,
+        nbinsx=60,
+        marker_color="rgba(33, 150, 243, 0.4)",
+        marker_line_color="rgba(33, 150, 243, 1)",
+        marker_line_width=1,
+        opacity=0.85
+    ))
+    hist_fig.update_layout(
+        margin=dict(t=2, b=20, l=0, r=0),
+        height=90,  # compact height
+        bargap=0.1,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        showlegend=False,
+        xaxis=dict(
+            showticklabels=True,   # <-- show x-axis labels
+            showgrid=False,
+            zeroline=False,
+            fixedrange=True,
+            ticks='',
+            linecolor='#e0e0e0',
+            linewidth=1,
+            title='',              # no title for compactness
+            anchor = "y",
+            position = 0  # forces x-axis to bottom
+        ),
+        yaxis=dict(
+            visible = False,
+            showticklabels=False,
+            showgrid=False,
+            zeroline=False,
+            fixedrange=True,
+            ticks='',
+            linecolor='#e0e0e0',
+            linewidth=1,
+        ),
+    )
+    return hist_fig
+
+
+def collect_scores(match_data):
+    return [
+        match["score"]
+        for uuid_dict in match_data.values()
+        for matches in uuid_dict.values()
+        for match in matches
+    ]
+
 
 def register_callbacks(app):
+    background_manager = make_background_manager()
+
     @app.callback(
         Output('series-selector-container', 'children'),
+        Output("preview-more-button", "children"),
+        Output("preview-more-button", "style"),
+        Output("preview-visible-count", "data"),
         Input('selected-series-store', 'data'),
         Input('match-results-store', 'data'),
         Input('distance-threshold-store', 'data'),
         Input('series-name-filter', 'value'),
-        Input("window-size-min-input", "value"),
-        Input("window-size-max-input", "value"),
         State("series-to-sketch-map", "data"),
         State("sketch-color-list", "data"),
         Input("active-patterns-with-selection", "data"),
-        Input("active-sketch-id", "data")
+        Input("active-sketch-id", "data"),
+        Input("preview-more-button", "n_clicks"),
+        State("preview-visible-count", "data"),
+        State("main-dataset-selector", "value"),
     )
-    def update_series_preview_list(selected, match_data, threshold, filtered_names, min_ws, max_ws, series_to_sketch, color_list, patterns_history_with_selection, active_sketch_id):
-        print(f"update_series_preview_list triggered with selected={selected}, threshold={threshold}, filtered_names={filtered_names}, min_ws={min_ws}, max_ws={max_ws}")
-        children = []
-        x_max = max(series["x"])
+    def update_series_preview_list(selected, match_handle, threshold, filtered_names, series_to_sketch, color_list, patterns_history_with_selection, active_sketch_id, more_clicks, visible_count, dataset_id):
+        """
+        Render one page of cards, ranked by matches under the score
+        threshold over every ticker, so the best tickers are always on the
+        first pages. The window-size filter and the match shading of the
+        rendered cards run clientside in filterPreviews.
+        """
+        log.debug("update_series_preview_list", extra={"fields": {
+            "selected": selected, "threshold": threshold, "filtered_names": len(filtered_names or []),
+            "visible_count": visible_count,
+        }})
+        match_data = load_results(match_handle)
+        series = get_dataset(dataset_id).series
         titles = series["titles"]
         name_to_index = {name: i for i, name in enumerate(titles)}
+        visible_count = visible_count or PREVIEW_PAGE_SIZE
+        triggered = callback_context.triggered_id
+        if triggered == "preview-more-button":
+            visible_count += PREVIEW_PAGE_SIZE
+        elif triggered in ("match-results-store", "distance-threshold-store", "series-name-filter"):
+            # New results, a new threshold or a new filter start again from the first page
+            visible_count = PREVIEW_PAGE_SIZE
 
         # Decide which names to show
         if not match_data:
             sorted_names = sorted(titles)[:20]
         else:
+            limit = np.inf if threshold is None else threshold
             match_counts = {
                 name: sum(
                     1 for matches in match_data[name].values()
-                    for m in matches if m.get('score') is not None and m['score'] <= threshold
+                    for m in matches if m.get('score') is not None and m['score'] <= limit
                 )
                 for name in match_data
             }
             filtered = {n: c for n, c in match_counts.items() if c > 0}
             sorted_names = sorted(filtered, key=lambda n: -filtered[n])
+        if filtered_names:
+            sorted_names = [name for name in sorted_names if name in filtered_names]
 
         selected = selected or []
         prev_selected_series = [v["selected_series"] for k, v in patterns_history_with_selection.items() if v.get("selected_series") is not None][:-1]
-        print(f"prev_selected_series = {prev_selected_series}")
         prev_patterns = list(patterns_history_with_selection.keys())
 
-        for name in sorted_names:
-            if filtered_names and name not in filtered_names:
-                continue
-
+        def preview_card(name):
             i = name_to_index[name]
+            # min-max keeps every peak and trough a plain stride would skip
+            points = minmax_indices(series["y"][i], PREVIEW_POINTS)
             is_selected = str(i) in selected
             border_style = '3px solid #007BFF' if is_selected else '0px solid #ccc'
             sketch_idx = series_to_sketch.get(str(i), i)
             preview_color = color_list[sketch_idx % len(color_list)] if is_selected else '#ccc'
 
-            # only show shading in the mini‐chart if that card is selected
-            shapes = []
+            # Patterns whose matches shade this mini-chart; the shapes themselves
+            # are drawn clientside from the compact match arrays
+            shaded = []
             if match_data and name in match_data:
-                pattern_intervals = {
-                    pattern_id: [
-                        match for match in matches
-                        if match["score"] <= threshold and min_ws <= match["window_size"] <= max_ws
-                    ]
-                    for pattern_id, matches in match_data[name].items()
-                }
-                for p_idx, (pattern_id, matches) in enumerate(pattern_intervals.items()):
+                for p_idx, pattern_id in enumerate(match_data[name]):
                     if (patterns_history_with_selection == {} or  # case 1: initial preview generation
                             pattern_id == active_sketch_id or  # case 2: current
                             (pattern_id in prev_patterns and str(name_to_index[name]) in prev_selected_series)):
-                        for match in matches:
-                            shapes.append({
-                                'type': 'rect',
-                                'xref': 'x',
-                                'yref': 'paper',
-                                'x0': series["x"][match['start_idx']],
-                                'x1': min(series["x"][match['end_idx']], x_max),
-                                'y0': 0,
-                                'y1': 1,
-                                'fillcolor': color_list[p_idx % len(color_list)],
-                                'opacity': 0.25,
-                                'line': {
-                                    'width': 1,
-                                    'color': color_list[p_idx % len(color_list)],
-                                    'dash': ['solid', 'dot', 'dash', 'longdash'][p_idx % 4]
-                                },
-                                'layer': 'below'
-                            })
-
-            children.append(html.Div([
+                        shaded.append({
+                            'pattern': pattern_id,
+                            'color': color_list[p_idx % len(color_list)],
+                            'dash': ['solid', 'dot', 'dash', 'longdash'][p_idx % 4],
+                        })
+
+            return html.Div([
                 dcc.Graph(
                     id={'type': 'series-preview', 'index': i},
                     figure={
                         'data': [{
-                            'x': series["x"][::10],
-                            'y': series["y"][i][::10],
+                            'x': series["x"][points],
+                            'y': series["y"][i][points],
                             'mode': 'lines',
                             'line': {'width': 1, 'color': preview_color}
                         }],
@@ -123,7 +222,8 @@ def register_callbacks(app):
                             'xaxis': {'visible': False},
                             'yaxis': {'visible': False},
                             'showlegend': False,
-                            'shapes': shapes
+                            'shapes': [],
+                            'meta': {'ticker': i, 'shaded': shaded}
                         }
                     },
                     config={'staticPlot': True, 'displayModeBar': False},
@@ -139,9 +239,19 @@ def register_callbacks(app):
                     'padding': '4px',
                     'backgroundColor': '#fff',
                 }
-            ))
+            )
+
+        remaining = max(len(sorted_names) - visible_count, 0)
+        more_label = f"Show more ({remaining} left)"
+        more_style = {"display": "block" if remaining else "none", "width": "100%", "marginTop": "4px"}
+
+        # "Show more" only appends the next page to the cards already on the page
+        if triggered == "preview-more-button":
+            children = Patch()
+            children.extend([preview_card(name) for name in sorted_names[visible_count - PREVIEW_PAGE_SIZE:visible_count]])
+            return children, more_label, more_style, visible_count
 
-        return children
+        return [preview_card(name) for name in sorted_names[:visible_count]], more_label, more_style, visible_count
 
     @app.callback(
         Output('selected-series-store', 'data'),
@@ -152,18 +262,16 @@ def register_callbacks(app):
         State("active-patterns", "data"),
         Input("active-patterns-with-selection", "data"), 
         State('active-sketch-id', 'data'),
+        State("main-dataset-selector", "value"),
     )
-    def toggle_selection(n_clicks_list, current_selected, series_to_sketch, active_patterns, active_patterns_with_selection, active_sketch_id):
-        print(f"toggle_selection triggered")
+    def toggle_selection(n_clicks_list, current_selected, series_to_sketch, active_patterns, active_patterns_with_selection, active_sketch_id, dataset_id):
         ctx = callback_context
         if not ctx.triggered or all(n == 0 or n is None for n in n_clicks_list):
             return current_selected or [], dash.no_update
 
         triggered_id = ctx.triggered[0]['prop_id'].split('.')[0]
         idx = str(eval(triggered_id)['index'])
-        
-        print(triggered_id)
-        print(idx)
+        log.debug("toggle_selection", extra={"fields": {"series": idx, "active_sketch_id": active_sketch_id}})
 
         # Find the pattern/sketch this series belongs to
         pattern_idx = str(series_to_sketch.get(idx))
@@ -179,8 +287,6 @@ def register_callbacks(app):
         # Toggle: add if not present, remove if present
         if idx not in new_selected:
             new_selected.append(idx)
-        print(active_sketch_id)
-        print(len(active_patterns))
 
         if active_patterns_with_selection == {}:
             active_patterns_with_selection = copy.deepcopy(active_patterns)
@@ -205,24 +311,60 @@ def register_callbacks(app):
 
         # Now you can safely assign
         active_patterns_with_selection[key]["selected_series"] = idx
-        active_patterns_with_selection[key]["selected_series_name"] = series["titles"][int(idx)]
-        
+        active_patterns_with_selection[key]["selected_series_name"] = get_dataset(dataset_id).series["titles"][int(idx)]
 
-        print(len(active_patterns_with_selection))
 
         return new_selected, active_patterns_with_selection
     
     @app.callback(
-        Output("example-plot", "figure"),
+        Output("main-plot-xrange", "data"),
+        Input("example-plot", "relayoutData"),
+        State("main-dataset-selector", "value"),
+        prevent_initial_call=True
+    )
+    def track_main_plot_range(relayout_data, dataset_id):
+        """Row range [lo, hi) shown after a zoom or range-slider drag; None when autoscaled."""
+        if not relayout_data:
+            raise dash.exceptions.PreventUpdate
+        if relayout_data.get("xaxis.autorange"):
+            return None
+        x_range = relayout_data.get("xaxis.range") or [
+            relayout_data.get("xaxis.range[0]"), relayout_data.get("xaxis.range[1]")
+        ]
+        if None in x_range:
+            raise dash.exceptions.PreventUpdate
+        dates = get_dataset(dataset_id).series["dates"]
+        lo = int(np.searchsorted(dates, np.datetime64(str(x_range[0]).strip()), side="left"))
+        hi = int(np.searchsorted(dates, np.datetime64(str(x_range[1]).strip()), side="right"))
+        # One extra point on each side so lines run to the plot edges
+        return [max(lo - 1, 0), min(hi + 1, len(dates))]
+
+    @app.callback(
+        Output("main-figure-base", "data"),
         Input("active-patterns-with-selection", "data"),
         Input('selected-series-store', 'data'),
-        State("distance-threshold-store", "data"),
-        Input("window-size-min-input", "value"),
-        Input("window-size-max-input", "value"),
+        State("match-results-store", "data"),
+        Input("main-plot-xrange", "data"),
+        State("main-dataset-selector", "value"),
     )
-    def update_main_plot(active_patterns, selected, threshold, min_ws, max_ws):
-        print(f"update_main_plot triggered")
+    def update_main_plot(active_patterns, selected, match_handle, x_range, dataset_id):
+        """
+        Series traces and layout of the main chart, plus which (pattern,
+        ticker) pairs get match regions. composeMainPlot in
+        assets/clientside.js adds the regions that pass the current
+        threshold and window-size filters.
+        """
+        log.debug("update_main_plot", extra={"fields": {
+            "patterns": len(active_patterns or {}), "selected": selected, "x_range": x_range,
+        }})
         fig = go.Figure()
+        lo, hi = x_range or (None, None)
+        series = get_dataset(dataset_id).series
+
+        def decimated(i):
+            """Dates and prices of series i, downsampled with full detail inside the visible range."""
+            points = downsample_indices(series["y"][i], MAIN_PLOT_POINTS, DOWNSAMPLE_METHOD, lo, hi)
+            return series["dates"][points], series["y"][i][points]
         xaxis_style = dict(
             rangeslider=dict(visible=True, thickness=0.07, bgcolor="#f5f5f5"),
             type='date',
@@ -266,6 +408,8 @@ def register_callbacks(app):
             yaxis=yaxis_style,
             plot_bgcolor='#fff',
             paper_bgcolor='#fff',
+            # Keep the user's zoom when the traces are re-fetched for a new range
+            uirevision="main-plot",
             font=dict(family="Roboto, Arial, sans-serif", color="#212121"),
             hoverlabel=dict(
                 bgcolor="#fafafa",
@@ -280,23 +424,25 @@ def register_callbacks(app):
             if selected:
                 for idx in selected[:1]:  # show the first selection to keep the view clean
                     i = int(idx)
+                    x, y = decimated(i)
                     fig.add_trace(go.Scatter(
-                        x=series["x_date"],
-                        y=series["y"][i],
+                        x=x,
+                        y=y,
                         mode='lines',
                         name=series["titles"][i],
                         line={'color': '#2196f3'}
                     ))
             fig.update_layout(**layout_style)
-            return fig
+            return {"figure": fig.to_plotly_json(), "regions": []}
 
         x_max = max(series["x"])
         titles = series["titles"]
         selected = set(selected or [])
 
+        match_data = load_results(match_handle)
+        regions = []
         for pattern_id, pattern_info in active_patterns.items():
             color = pattern_info["color"]
-            matched_patterns = pattern_info["matched_patterns"]
             # Determine which series index to plot
             i_val = pattern_info.get("selected_series")
             if i_val is None:
@@ -307,34 +453,26 @@ def register_callbacks(app):
                     continue
             i = int(i_val)
             # Draw the main series line
+            x, y = decimated(i)
             fig.add_trace(go.Scatter(
-                x=series["x_date"],
-                y=series["y"][i],
+                x=x,
+                y=y,
                 mode='lines',
                 name=f"{pattern_info['selected_series_name']}",
                 line={'color': color}
             ))
 
             sel_name = pattern_info.get("selected_series_name")
-            if not sel_name or sel_name not in matched_patterns:
+            if not sel_name or pattern_id not in match_data.get(sel_name, {}):
                 continue
-            for match in matched_patterns[sel_name]:
-                if match["score"] is not None and match["score"] <= threshold and min_ws <= match["window_size"] <= max_ws:
-                    fig.add_vrect(
-                        x0=series["x_date"][match["start_idx"]],
-                        x1=min(series["x_date"][match["end_idx"]], series["x_date"][-1]),
-                        fillcolor=color,
-                        opacity=0.25,
-                        layer='below',
-                        line_width=1,
-                        # annotation_text=f"Match",
-                        # annotation_position='top left'
-                    )
+            regions.append({"pattern": pattern_id, "ticker": i, "color": color})
 
         fig.update_layout(**layout_style)
-        return fig
+        # Match regions live on a hidden 0..1 axis so they always span the plot height
+        fig.update_layout(yaxis2=dict(overlaying="y", range=[0, 1], visible=False, fixedrange=True))
+        return {"figure": fig.to_plotly_json(), "regions": regions}
 
-    @app.callback(
+    submit_dependencies = [
         # Output("submit-sketch", "children"),
         Output("match-results-store", "data"),
         Output("distance-histogram", "figure"),
@@ -345,6 +483,7 @@ def register_callbacks(app):
         Output("auto-select-series", "data"), 
         Output("series-to-sketch-map", "data"),
         Output("active-patterns", "data"),  # <-- Add this output
+        Output("match-arrays", "data"),
         Input("submit-sketch", "n_clicks"),
         Input('series-name-filter', 'value'),
         State("sketch-shape-store", "data"),
@@ -352,54 +491,78 @@ def register_callbacks(app):
         State("window-size-store", "data"),
         State("sketch-color-list", "data"),
         State("active-patterns", "data"),  # <-- Add this line
-        prevent_initial_call=True
-    )
-    def submit_sketch(n_clicks, series_name_filter, shapes, history, window_size, color_list, prev_active_patterns):
-        print(f"submit_sketch triggered with n_clicks={n_clicks}, shapes={shapes}, history={history}, window_size={window_size}, series_name_filter={series_name_filter}")
+        State("match-results-store", "data"),
+        State("distance-measure-dropdown", "value"),
+        State("session-id", "data"),
+        State("main-dataset-selector", "value"),
+    ]
+
+    def submit_sketch(set_progress, n_clicks, series_name_filter, shapes, history, window_size, color_list, prev_active_patterns, prev_match_handle, distance_measure, session_id, dataset_id):
+        """
+        Search the new sketch over every (filtered) ticker. As a background
+        callback it searches in batches of tickers and streams the partial
+        matches, histogram and a progress message through set_progress.
+        """
         if not n_clicks or not shapes:
             raise dash.exceptions.PreventUpdate
 
         sketch_id = str(uuid.uuid4())
         history = history or {} 
         history[sketch_id] = shapes
-        print(history)
+        series = get_dataset(dataset_id).series
         name_to_index = {name: i for i, name in enumerate(series["titles"])}
 
         sketch = np.array(shapes)
-        print(series_name_filter)
-        topk_matches = query_chroma_topk_for_each_name(history, k=10, filtered_titles=series_name_filter)
-
-        all_scores = [match["score"] for matches in topk_matches.values() for match in matches]
+        log.info("submit_sketch", extra={"fields": {
+            "sketch_id": sketch_id, "points": len(shapes), "sketches": len(history), "window_size": window_size,
+            "filtered_names": len(series_name_filter or []), "metric": distance_measure, "dataset": dataset_id,
+        }})
+        # Only the new sketch is searched; earlier sketches keep their stored matches
+        window_range = tuple(window_size[:2]) if window_size and None not in window_size[:2] else None
+        metric = distance_measure if distance_measure in SEARCH_METRICS else "euclidean"
+        names = list(series_name_filter or series["titles"])
+        batch_size = BACKGROUND_BATCH_TICKERS if background_manager is not None else len(names)
+
+        reformatted = load_results(prev_match_handle)
+        for lo in range(0, len(names), max(batch_size, 1)):
+            topk_matches = query_chroma_topk_for_each_name(
+                {sketch_id: shapes}, k=10, filtered_titles=names[lo:lo + batch_size], window_range=window_range, metric=metric,
+                dataset=dataset_id,
+            )
+            for curr_uuid, matches in topk_matches.items():
+                for match in matches:
+                    name = match["name"]
+                    entry = {
+                        "start_idx": match["start_idx"],
+                        "end_idx": match["end_idx"],
+                        "score": match["score"],
+                        "window_size": match["end_idx"] - match["start_idx"]
+                    }
+                    if name not in reformatted:
+                        reformatted[name] = {}
+                    if curr_uuid not in reformatted[name]:
+                        reformatted[name][curr_uuid] = []
+                    reformatted[name][curr_uuid].append(entry)
+
+            done = min(lo + batch_size, len(names))
+            if done < len(names):
+                set_progress((
+                    result_store.put(session_id, reformatted),
+                    match_arrays(reformatted, series),
+                    distance_histogram(collect_scores(reformatted)),
+                    f"Searching… {done}/{len(names)} tickers",
+                ))
+
+        all_scores = collect_scores(reformatted)
         max_dist = max(all_scores) if all_scores else 1.0
 
-        reformatted = {}
-        for curr_uuid, matches in topk_matches.items():
-            for match in matches:
-                name = match["name"]
-                entry = {
-                    "start_idx": match["start_idx"],
-                    "end_idx": match["end_idx"],
-                    "score": match["score"],
-                    "window_size": match["end_idx"] - match["start_idx"]
-                }
-                if name not in reformatted:
-                    reformatted[name] = {}
-                if curr_uuid not in reformatted[name]:
-                    reformatted[name][curr_uuid] = []
-                reformatted[name][curr_uuid].append(entry)
-
-        # Build active_patterns
+        # Build active_patterns; the matches themselves stay in the result store
         if color_list is not None:
             active_patterns = copy.deepcopy(prev_active_patterns) if prev_active_patterns else {}
             color = color_list[(len(history)-1) % len(color_list)]
-            matched_patterns = {}
-            for name, uuid_dict in reformatted.items():
-                for pattern_uuid, matches in uuid_dict.items():
-                    matched_patterns[name] = matches
             active_patterns[sketch_id] = {
                 "color": color,
                 "name": f"Pattern {len(history)}",
-                "matched_patterns": matched_patterns,
                 "shapes": shapes,
                 "window_size": window_size,
                 "selected_series": None, 
@@ -414,86 +577,96 @@ def register_callbacks(app):
                 
         series_to_sketch = {}
         for idx, name in enumerate(series["titles"]):
-            for sketch_idx, (sketch_id, _) in enumerate(history.items()):
-                if name in reformatted and sketch_id in reformatted[name]:
+            for sketch_idx, hist_id in enumerate(history):
+                if name in reformatted and hist_id in reformatted[name]:
                     series_to_sketch[str(name_to_index[name])] = sketch_idx
 
         matched_series = list(matched_indices)
-        print(f"current window_size = {window_size}")
-
-        hist_fig = go.Figure()
-        hist_fig.add_trace(go.Histogram(
-            x=all_scores,
-            nbinsx=60,
-            marker_color="rgba(33, 150, 243, 0.4)",
-            marker_line_color="rgba(33, 150, 243, 1)",
-            marker_line_width=1,
-            opacity=0.85
-        ))
-        hist_fig.update_layout(
-            margin=dict(t=2, b=20, l=0, r=0),
-            height=90,  # compact height
-            bargap=0.1,
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            showlegend=False,
-            xaxis=dict(
-                showticklabels=True,   # <-- show x-axis labels
-                showgrid=False,
-                zeroline=False,
-                fixedrange=True,
-                ticks='',
-                linecolor='#e0e0e0',
-                linewidth=1,
-                title='',              # no title for compactness
-                anchor = "y",
-                position = 0  # forces x-axis to bottom
-            ),
-            yaxis=dict(
-                visible = False,
-                showticklabels=False,
-                showgrid=False,
-                zeroline=False,
-                fixedrange=True,
-                ticks='',
-                linecolor='#e0e0e0',
-                linewidth=1,
-            ),
-        )
+        log.info("submit_sketch done", extra={"fields": {
+            "sketch_id": sketch_id, "matched_series": len(matched_series), "matches": len(all_scores),
+        }})
 
         return (
             # f"Submitted ({len(shapes)} shape{'s' if len(shapes) != 1 else ''})",
-            reformatted,
-            hist_fig,
+            result_store.put(session_id, reformatted),
+            distance_histogram(all_scores),
             max_dist,
             max_dist,
             history,
             sketch_id,
             matched_series, 
             series_to_sketch,
-            active_patterns
+            active_patterns,
+            match_arrays(reformatted, series),
         )
 
+    if background_manager is not None:
+        # Runs in a worker process; Clear cancels a running search
+        app.callback(
+            *submit_dependencies,
+            background=True,
+            manager=background_manager,
+            progress=[
+                Output("match-results-store", "data"),
+                Output("match-arrays", "data"),
+                Output("distance-histogram", "figure"),
+                Output("search-progress", "children"),
+            ],
+            running=[
+                (Output("submit-sketch", "disabled"), True, False),
+                (Output("search-progress", "style"), {"display": "block"}, {"display": "none"}),
+            ],
+            cancel=[Input("refresh-sketch", "n_clicks")],
+            prevent_initial_call=True
+        )(submit_sketch)
+    else:
+        def submit_sketch_blocking(*args):
+            return submit_sketch(lambda progress: None, *args)
+
+        app.callback(*submit_dependencies, prevent_initial_call=True)(submit_sketch_blocking)
+
     @app.callback(
         Output('sketch-shape-store', 'data'),
         Input('sketch-graph', 'relayoutData'),
         State('sketch-shape-store', 'data')
     )
     def update_sketch_store(relayout_data, current_data):
-        print(f"update_sketch_store triggered with relayout_data={relayout_data}, current_data={current_data}")
+        log.debug("update_sketch_store", extra={"fields": {"relayout_keys": sorted(relayout_data or {})}})
         if not relayout_data:
             raise dash.exceptions.PreventUpdate
 
         updated_shapes = parse_and_interpolate_path(relayout_data["shapes"][0]["path"]) if "shapes" in relayout_data else []
         return updated_shapes
 
-    @app.callback(
+    # Threshold and window-size filtering never leaves the browser
+    app.clientside_callback(
+        ClientsideFunction(namespace="seqindexing", function_name="passThrough"),
         Output("distance-threshold-store", "data"),
         Input("distance-threshold-slider", "value")
     )
-    def update_threshold_store(value):
-        print(f"update_threshold_store triggered with value={value}")
-        return value
+
+    app.clientside_callback(
+        ClientsideFunction(namespace="seqindexing", function_name="filterPreviews"),
+        Output({'type': 'series-preview', 'index': ALL}, 'figure'),
+        Output({'type': 'series-card', 'index': ALL}, 'style'),
+        Input("match-arrays", "data"),
+        Input("distance-threshold-store", "data"),
+        Input("window-size-min-input", "value"),
+        Input("window-size-max-input", "value"),
+        Input("series-selector-container", "children"),
+        State({'type': 'series-preview', 'index': ALL}, 'figure'),
+        State({'type': 'series-card', 'index': ALL}, 'style'),
+    )
+
+    app.clientside_callback(
+        ClientsideFunction(namespace="seqindexing", function_name="composeMainPlot"),
+        Output("example-plot", "figure"),
+        Input("main-figure-base", "data"),
+        Input("match-arrays", "data"),
+        Input("distance-threshold-store", "data"),
+        Input("window-size-min-input", "value"),
+        Input("window-size-max-input", "value"),
+    )
 
     @app.callback(
         Output("sketch-graph-container", "children"),
@@ -502,7 +675,7 @@ def register_callbacks(app):
         State("sketch-color-list", "data"),
     )
     def render_sketch_graph(refresh_key, history, color_list):
-        print("sketch area rendered with refresh key {}".format(refresh_key))
+        log.debug("render_sketch_graph", extra={"fields": {"refresh_key": refresh_key}})
         history = history or {}
         color_list = color_list or ['red']
         next_sketch_idx = len(history)
@@ -562,7 +735,7 @@ def register_callbacks(app):
         prevent_initial_call=True
     )
     def refresh_sketch_view(n_clicks, current_key):
-        print(f"sketch area refreshed, current key: {current_key}")
+        log.debug("refresh_sketch_view", extra={"fields": {"refresh_key": current_key}})
         return current_key + 1  # just bump the key to remount the component
 
     @app.callback(
@@ -647,14 +820,17 @@ def register_callbacks(app):
         Output("match-results-store", "data", allow_duplicate=True),
         Output("series-to-sketch-map", "data", allow_duplicate=True),
         Output("active-sketch-id", "data", allow_duplicate=True),
+        Output("match-arrays", "data", allow_duplicate=True),
         Input({'type': 'remove-sketch', 'index': ALL}, 'n_clicks'),
         State("active-patterns", "data"),
         State("sketch-history-store", "data"),
         State("match-results-store", "data"),
         State("active-sketch-id", "data"),
+        State("session-id", "data"),
+        State("main-dataset-selector", "value"),
         prevent_initial_call=True
     )
-    def remove_sketch(n_clicks_list, active_patterns, history, match_data, active_sketch_id):
+    def remove_sketch(n_clicks_list, active_patterns, history, match_handle, active_sketch_id, session_id, dataset_id):
         ctx = callback_context
         if not ctx.triggered or all(n == 0 or n is None for n in (n_clicks_list or [])):
             raise dash.exceptions.PreventUpdate
@@ -671,6 +847,7 @@ def register_callbacks(app):
 
         # Filter matches referencing the removed id
         new_match = {}
+        match_data = load_results(match_handle)
         if match_data:
             for name, uuid_dict in match_data.items():
                 filtered = {uuid: matches for uuid, matches in uuid_dict.items() if str(uuid) != removed_id}
@@ -678,10 +855,11 @@ def register_callbacks(app):
                     new_match[name] = filtered
 
         # Rebuild series_to_sketch_map from remaining active patterns
+        series = get_dataset(dataset_id).series
         name_to_index = {name: i for i, name in enumerate(series["titles"])}
         series_to_sketch = {}
-        for sketch_idx, (sk_uuid, pat) in enumerate(new_active.items()):
-            for name in pat.get("matched_patterns", {}).keys():
+        for sketch_idx, sk_uuid in enumerate(new_active):
+            for name in (n for n, uuid_dict in new_match.items() if sk_uuid in uuid_dict):
                 idx = name_to_index.get(name)
                 if idx is not None:
                     series_to_sketch[str(idx)] = sketch_idx
@@ -692,17 +870,53 @@ def register_callbacks(app):
         else:
             new_active_sketch = active_sketch_id
 
-        return new_active, new_history, new_match, series_to_sketch, new_active_sketch
+        return (
+            new_active, new_history, result_store.put(session_id, new_match),
+            series_to_sketch, new_active_sketch, match_arrays(new_match, series),
+        )
 
     @app.callback(
+        Output("series-name-filter", "options"),
+        Output("series-name-filter", "value", allow_duplicate=True),
+        Output("main-series-filter", "options"),
+        Output("main-series-filter", "value"),
+        Output("match-results-store", "data", allow_duplicate=True),
+        Output("match-arrays", "data", allow_duplicate=True),
+        Output("sketch-history-store", "data", allow_duplicate=True),
+        Output("active-sketch-id", "data", allow_duplicate=True),
+        Output("active-patterns", "data", allow_duplicate=True),
+        Output("active-patterns-with-selection", "data", allow_duplicate=True),
+        Output("selected-series-store", "data", allow_duplicate=True),
+        Output("series-to-sketch-map", "data", allow_duplicate=True),
+        Output("auto-select-series", "data", allow_duplicate=True),
+        Output("main-plot-xrange", "data", allow_duplicate=True),
+        Output("distance-histogram", "figure", allow_duplicate=True),
+        Output("sketch-shape-store", "data", allow_duplicate=True),
+        Output("sketch-refresh-key", "data", allow_duplicate=True),
+        Input("main-dataset-selector", "value"),
+        State("sketch-refresh-key", "data"),
+        prevent_initial_call=True
+    )
+    def switch_dataset(dataset_id, refresh_key):
+        # Matches, sketches and selections refer to the previous dataset's tickers; start over.
+        # The drawn sketch goes too: the filter reset below re-triggers submit_sketch, which
+        # would otherwise search the old sketch on the new dataset.
+        dataset = get_dataset(dataset_id)
+        options = [{"label": n, "value": n} for n in dataset.series["titles"]]
+        log.info("switch_dataset", extra={"fields": {"dataset": dataset.id, "tickers": len(options)}})
+        return (
+            options, [], options, [],
+            None, None, {}, None, {}, {}, [], {}, [], None,
+            distance_histogram([]), None, (refresh_key or 0) + 1,
+        )
+
+    app.clientside_callback(
+        ClientsideFunction(namespace="seqindexing", function_name="windowSizeStore"),
         Output("window-size-store", "data"),
         Input("window-size-min-input", "value"),
         Input("window-size-max-input", "value"),
         Input("window-size-unit-dropdown", "value"),
     )
-    def update_window_size(min_val, max_val, unit):
-        print(f"window size updated with min={min_val}, max={max_val}, unit={unit}")
-        return [min_val, max_val, unit]
 
     @app.callback(
         Output("window-size-slider", "min"),
@@ -712,8 +926,9 @@ def register_callbacks(app):
         Input("match-results-store", "data"),
         State("window-size-unit-dropdown", "value"),
     )
-    def update_window_size_slider(match_data, unit):
-        print(f"update_window_size_slider triggered with match_data={match_data}, unit={unit}")
+    def update_window_size_slider(match_handle, unit):
+        log.debug("update_window_size_slider", extra={"fields": {"match_handle": match_handle, "unit": unit}})
+        match_data = load_results(match_handle)
         ws_min, ws_max = min(WINDOW_SIZES), max(WINDOW_SIZES)
         # Default to labeled presets (e.g., 7->1w, 14->2w, 30->1m)
         default_marks = {p["value"]: p["label"] for p in WINDOW_PRESETS}
@@ -750,5 +965,5 @@ def register_callbacks(app):
         prevent_initial_call=True
     )
     def update_series_name_filter(new_value):
-        print(f"update_series_name_filter triggered with new_value={new_value}")
+        log.debug("update_series_name_filter", extra={"fields": {"names": len(new_value or [])}})
         return new_value
\ No newline at end of file
@@ -0,0 +1,280 @@
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from chromadb import PersistentClient
+
+from .cache import QueryCache
+from .config import (
+    DATASETS, DEFAULT_DATASET, DATASET_MEMORY_BUDGET_BYTES, QUERY_CACHE_MAX_ENTRIES, QUERY_CACHE_TTL_SECONDS,
+)
+from .prices import load_prices
+from .search import WindowIndex
+from .store import STORE_META, store_exists
+
+# Datasets the app can switch between (config.yaml `datasets`). Every
+# dataset opens its price matrix, Chroma collection and window index on
+# first use; the catalog unloads the least recently used datasets once the
+# loaded ones exceed the memory budget, so unused datasets hold no memory.
+
+log = logging.getLogger(__name__)
+
+
+def series_from_matrix(values, dates, titles):
+    """The `series` dict for a (n_series, n_points) price matrix and its dates and ticker names."""
+    return {
+        "y": values,
+        "x": np.arange(values.shape[1]),
+        "titles": titles,
+        "shape": values.shape,
+        "x_date": pd.DatetimeIndex(dates).tolist(),
+        "dates": dates,
+    }
+
+
+class _LazySeries(Mapping):
+    """The `series` dict, loaded on first access instead of at import."""
+
+    def __init__(self, loader, on_load=None):
+        self._loader = loader
+        self._on_load = on_load
+        self._lock = threading.Lock()
+        self._value = None
+
+    def override(self, value):
+        """Serve `value` instead of the CSV (e.g. synthetic prices for benchmarks)."""
+        with self._lock:
+            self._value = value
+
+    def reset(self):
+        """Drop the loaded value; the next access loads it again."""
+        with self._lock:
+            self._value = None
+
+    @property
+    def loaded(self):
+        return self._value is not None
+
+    def _data(self):
+        value = self._value
+        if value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self._loader()
+                value = self._value
+            if self._on_load is not None:
+                self._on_load()
+        return value
+
+    def __getitem__(self, key):
+        return self._data()[key]
+
+    def __iter__(self):
+        return iter(self._data())
+
+    def __len__(self):
+        return len(self._data())
+
+
+def _held_arrays(value, depth=0):
+    """Arrays reachable from `value` through attributes, dicts, lists and tuples (a few levels deep)."""
+    if isinstance(value, np.ndarray):
+        yield value
+        return
+    if depth >= 3:
+        return
+    if isinstance(value, dict):
+        children = value.values()
+    elif isinstance(value, (list, tuple)):
+        children = value
+    elif hasattr(value, "__dict__"):
+        children = vars(value).values()
+    else:
+        return
+    for child in children:
+        yield from _held_arrays(child, depth + 1)
+
+
+def _index_nbytes(index):
+    """Bytes of every array the index holds, lazily built ones (SAX buckets) included; shared buffers count once."""
+    buffers = {}
+    for array in _held_arrays(index):
+        while isinstance(array.base, np.ndarray):
+            array = array.base
+        buffers[id(array)] = array.nbytes
+    return sum(buffers.values())
+
+
+class Dataset:
+    """
+    One catalog entry: price source, window store and Chroma collection.
+    The series, collection and index are opened on first use, reopened when
+    the index is rebuilt on disk, and released by unload().
+    """
+
+    def __init__(self, dataset_id, label, source, store, chroma, collection, on_load=None):
+        self.id = dataset_id
+        self.label = label
+        self.source = Path(source)
+        self.store_path = Path(store)
+        self.chroma_path = Path(chroma)
+        self.collection_name = collection
+        self.cache_dir = self.source.parent / ".cache" / self.source.stem
+        self._on_load = on_load
+        self.series = _LazySeries(self._load_series, on_load=self._loaded)
+        self.query_cache = QueryCache(max_entries=QUERY_CACHE_MAX_ENTRIES, ttl_seconds=QUERY_CACHE_TTL_SECONDS)
+        self._lock = threading.RLock()
+        self._client = None
+        self._collection = None
+        self._window_index = None
+        self._store_stamp = None
+
+    @property
+    def available(self):
+        return self.source.exists()
+
+    def _load_series(self):
+        return series_from_matrix(*load_prices(self.source, self.cache_dir))
+
+    def _loaded(self):
+        if self._on_load is not None:
+            self._on_load(self)
+
+    def _read_store_stamp(self):
+        """Size and mtime of the Chroma sqlite files and the window store; changes whenever the index is rebuilt."""
+        stamp = []
+        for path in (self.chroma_path / "chroma.sqlite3", self.chroma_path / "chroma.sqlite3-wal",
+                     self.store_path / STORE_META):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            stamp.append((str(path), st.st_mtime_ns, st.st_size))
+        return tuple(stamp)
+
+    def _close(self):
+        """Drop the collection, index and cached queries. Caller holds _lock."""
+        if self._client is not None:
+            # Drop Chroma's per-path system cache so a rebuilt store is really reopened
+            self._client.clear_system_cache()
+        self._client = None
+        self._collection = None
+        self._window_index = None
+        self.query_cache.clear()
+
+    def _ensure_fresh(self):
+        stamp = self._read_store_stamp()
+        if stamp == self._store_stamp:
+            return
+        with self._lock:
+            if stamp != self._store_stamp:
+                self._close()
+                self._store_stamp = stamp
+
+    def get_collection(self):
+        """The dataset's Chroma collection, reopened if the store changed on disk."""
+        self._ensure_fresh()
+        with self._lock:
+            if self._collection is None:
+                self._client = PersistentClient(path=str(self.chroma_path))
+                self._collection = self._client.get_collection(self.collection_name)
+            return self._collection
+
+    def get_window_index(self):
+        """
+        In-process WindowIndex, opened on first use. Memory-maps the window store
+        when ingestion wrote one; otherwise loads every window out of Chroma.
+        """
+        self._ensure_fresh()
+        index = self._window_index
+        if index is None:
+            # Load the series before taking the lock: loading may unload other datasets
+            titles, dates = self.series["titles"], self.series["x_date"]
+            with self._lock:
+                if self._window_index is None:
+                    if store_exists(self.store_path):
+                        self._window_index = WindowIndex.from_store(self.store_path, dates)
+                    else:
+                        self._window_index = WindowIndex.from_collection(self.get_collection(), titles, dates)
+                index = self._window_index
+            self._loaded()
+        return index
+
+    def nbytes(self):
+        """Memory held by the loaded price matrix and window index (mapped store pages included)."""
+        total = self.series["y"].nbytes if self.series.loaded else 0
+        index = self._window_index
+        if index is not None:
+            total += _index_nbytes(index)
+        return total
+
+    def unload(self):
+        with self._lock:
+            self._close()
+            self._store_stamp = None
+            self.series.reset()
+
+
+class DatasetCatalog:
+    """Datasets by id, with least-recently-used unloading under `max_bytes`."""
+
+    def __init__(self, specs, default_id, max_bytes):
+        if default_id not in specs:
+            raise ValueError(f"Default dataset {default_id!r} is not in the catalog")
+        self.default_id = default_id
+        self.max_bytes = max_bytes
+        self._datasets = {
+            dataset_id: Dataset(dataset_id, on_load=self.enforce_budget, **spec)
+            for dataset_id, spec in specs.items()
+        }
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, dataset_id=None):
+        """The dataset `dataset_id` (the default one when None), marked as most recently used."""
+        dataset_id = dataset_id or self.default_id
+        dataset = self._datasets.get(dataset_id)
+        if dataset is None:
+            raise KeyError(f"Unknown dataset: {dataset_id}")
+        with self._lock:
+            self._recent[dataset_id] = None
+            self._recent.move_to_end(dataset_id)
+        return dataset
+
+    def __iter__(self):
+        return iter(self._datasets.values())
+
+    def options(self):
+        """Dropdown options; datasets whose source is missing are listed but disabled."""
+        return [{"label": d.label, "value": d.id, "disabled": not d.available} for d in self._datasets.values()]
+
+    def enforce_budget(self, keep):
+        """Unload least recently used datasets other than `keep` until the loaded ones fit the budget."""
+        with self._lock:
+            order = list(self._recent)
+        total = sum(d.nbytes() for d in self._datasets.values())
+        for dataset_id in order:
+            if total <= self.max_bytes:
+                break
+            dataset = self._datasets[dataset_id]
+            if dataset is keep:
+                continue
+            freed = dataset.nbytes()
+            if not freed:
+                continue
+            dataset.unload()
+            total -= freed
+            log.info("dataset unloaded", extra={"fields": {
+                "dataset": dataset_id, "freed_bytes": freed, "loaded_bytes": total, "budget_bytes": self.max_bytes,
+            }})
+
+    def stats(self):
+        return {d.id: {"loaded": d.series.loaded, "bytes": d.nbytes()} for d in self._datasets.values()}
+
+
+def make_catalog(specs=DATASETS, default_id=DEFAULT_DATASET, max_bytes=DATASET_MEMORY_BUDGET_BYTES):
+    return DatasetCatalog(specs, default_id, max_bytes)
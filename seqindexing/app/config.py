@@ -25,7 +25,62 @@ MATCH_COLOR_OPACITY = config["colors"]["match_opacity"]
 # Layout
 PREVIEW_HEIGHT = config["layout"]["preview_height"]
 PREVIEW_CARD_HEIGHT = config["layout"]["preview_card_height"]
+PREVIEW_PAGE_SIZE = config["layout"]["preview_page_size"]
 PREVIEW_FONT_SIZE = SMALL_FONT_SIZE
 
 # data
-SERIES_WINDOW_SIZE = config["series"]["window_size"]
\ No newline at end of file
+SERIES_WINDOW_SIZE = config["series"]["window_size"]
+
+# chart downsampling
+DOWNSAMPLE_METHOD = config["plot"]["downsample"]
+MAIN_PLOT_POINTS = config["plot"]["main_points"]
+PREVIEW_POINTS = config["plot"]["preview_points"]
+
+# query cache
+QUERY_CACHE_MAX_ENTRIES = config["query_cache"]["max_entries"]
+QUERY_CACHE_TTL_SECONDS = config["query_cache"]["ttl_seconds"]
+QUERY_CACHE_TOLERANCE = config["query_cache"]["tolerance"]
+
+# search
+DTW_BAND = config["search"]["dtw_band"]
+SAX_MIN_ROWS = config["search"]["sax_min_rows"]
+TRIVIAL_MATCH_EXCLUSION = config["search"]["trivial_match_exclusion"]
+SEARCH_OVERFETCH = config["search"]["overfetch"]
+
+# result store
+RESULT_STORE_BACKEND = config["result_store"]["backend"]
+RESULT_STORE_MAX_BYTES = int(config["result_store"]["max_mb"] * 1024 * 1024)
+RESULT_STORE_DIRECTORY = Path(__file__).resolve().parents[2] / config["result_store"]["directory"]
+
+# background search
+BACKGROUND_ENABLED = config["background"]["enabled"]
+BACKGROUND_CACHE_DIR = Path(__file__).resolve().parents[2] / config["background"]["cache_dir"]
+BACKGROUND_BATCH_TICKERS = config["background"]["batch_tickers"]
+
+# logging
+LOG_LEVEL = config["logging"]["level"]
+LOG_FORMAT = config["logging"]["format"]
+
+# metrics
+METRICS_ENABLED = config["metrics"]["enabled"]
+METRICS_SPOOL_DIR = Path(__file__).resolve().parents[2] / config["metrics"]["spool_dir"]
+
+# datasets
+DEFAULT_DATASET = config["datasets"]["default"]
+DATASET_MEMORY_BUDGET_BYTES = int(config["datasets"]["memory_budget_mb"] * 1024 * 1024)
+DATASETS = {
+    dataset_id: {
+        "label": spec["label"],
+        "source": Path(__file__).resolve().parents[2] / spec["source"],
+        "store": Path(__file__).resolve().parents[2] / spec["store"],
+        "chroma": Path(__file__).resolve().parents[2] / spec["chroma"],
+        "collection": spec["collection"],
+    }
+    for dataset_id, spec in config["datasets"]["catalog"].items()
+}
+
+# batch search API
+API_MAX_QUERIES = config["api"]["max_queries"]
+API_MAX_K = config["api"]["max_k"]
+API_MAX_MASS_QUERIES = config["api"]["max_mass_queries"]
+API_MAX_MASS_WINDOW_SIZES = config["api"]["max_mass_window_sizes"]
@@ -1,38 +1,42 @@
+import logging
+import time
 import numpy as np
-import pandas as pd
 from numpy.linalg import norm
-from pathlib import Path
 np.random.seed(0)
 
-from chromadb import PersistentClient
 from .utils import interpolate_to_fixed_size
+from .search import make_hits
+from .topk import distinct_topk
+from .mass import mass_topk
+from .catalog import make_catalog
+from .metrics import metrics
+from .config import QUERY_CACHE_TOLERANCE, DTW_BAND, SAX_MIN_ROWS, TRIVIAL_MATCH_EXCLUSION, SEARCH_OVERFETCH
+try:
+    from seqindexing.data.data_sp500 import TARGET_SIZE, WINDOW_SIZES
+except Exception:
+    from ..data.data_sp500 import TARGET_SIZE, WINDOW_SIZES
 
 
-CSV_PATH = str((Path(__file__).resolve().parents[2] / "data" / "sp500.csv"))
+log = logging.getLogger(__name__)
 
-df = (
-    pd.read_csv(CSV_PATH, parse_dates=["Date"])
-    .set_index("Date")
-    .dropna(axis=1)
-    .iloc[:, :]
-)
+# Every dataset's series, collection and index live in the catalog; the
+# functions below take a dataset id and default to the catalog's default.
+catalog = make_catalog()
+# The default dataset's series, for code that predates the catalog
+series = catalog.get().series
 
-series_y = df.T.to_numpy()
 
-series = {
-    "y": series_y,
-    "x": np.arange(df.shape[0]),
-    "titles": df.columns.tolist(),
-    "shape": series_y.shape, 
-    "x_date": df.index.tolist(),
-}
+def get_dataset(dataset_id=None):
+    return catalog.get(dataset_id)
 
 
-def query_chroma_topk(histories: dict[str, list[float]], k: int = 100):
-    print(os.getcwd())
-    # Initialize ChromaDB client and collection
-    client = PersistentClient(path="./chroma_db")
-    collection = client.get_collection("sp500_series")
+def get_collection(dataset=None):
+    """The dataset's Chroma collection, reopened if the store changed on disk."""
+    return catalog.get(dataset).get_collection()
+
+
+def query_chroma_topk(histories: dict[str, list[float]], k: int = 100, dataset=None):
+    collection = get_collection(dataset)
 
     all_results = {}
 
@@ -63,44 +67,141 @@ def query_chroma_topk(histories: dict[str, list[float]], k: int = 100):
     return all_results
 
 
-def query_chroma_topk_for_each_name(histories: dict[str, list[float]], k: int = 10, filtered_titles=None):
+def get_window_index(dataset=None):
+    """The dataset's in-process WindowIndex (see catalog.Dataset.get_window_index)."""
+    return catalog.get(dataset).get_window_index()
+
+
+def warm_up():
+    """Open the default dataset's index (map the window store, or load it from Chroma) before the first request arrives."""
+    started = time.perf_counter()
+    try:
+        index = get_window_index()
+    except Exception as exc:
+        log.warning("index warm-up skipped", extra={"fields": {"error": str(exc)}})
+        return
+    log.info("index warm-up", extra={"fields": {
+        "windows": len(index), "seconds": round(time.perf_counter() - started, 2),
+    }})
+
+
+def _query_cache_key(vector, filtered_titles, k, window_range, metric):
+    """Sketches that agree to within QUERY_CACHE_TOLERANCE share a key."""
+    quantized = np.round(np.asarray(vector) / QUERY_CACHE_TOLERANCE).astype(np.int64)
+    return (
+        quantized.tobytes(),
+        frozenset(filtered_titles or ()),
+        k,
+        tuple(window_range) if window_range is not None else None,
+        metric,
+    )
+
+
+def query_cache_stats():
+    """Query cache counters summed over the loaded datasets."""
+    totals = {"hits": 0, "misses": 0, "entries": 0, "max_entries": 0}
+    for dataset in catalog:
+        for key, value in dataset.query_cache.stats().items():
+            if key in totals:
+                totals[key] += value
+    lookups = totals["hits"] + totals["misses"]
+    totals["hit_rate"] = totals["hits"] / lookups if lookups else 0.0
+    return totals
+
+
+def search_raw_series(vector, k=10, filtered_titles=None, window_range=None, dataset=None):
     """
-    For each sketch_id in histories, query top-k for each name in the collection,
-    and flatten all hits into a single list for that sketch_id.
-    Returns: {sketch_id: [hit, hit, ...]} (same structure as query_chroma_topk)
+    MASS search directly over series["y"]: every window length in window_range
+    (inclusive), not only the indexed WINDOW_SIZES. Needs no prebuilt index.
+    Overlapping hits of a ticker are suppressed like in WindowIndex.search.
     """
-    client = PersistentClient(path="./chroma_db")
-    collection = client.get_collection("sp500_series")
-    if filtered_titles is None: 
-        filtered_titles = series["titles"]
-    all_results = {}
-
-    for sketch_id, vector in histories.items():
-        hits = []
-        for idx, name in enumerate(filtered_titles):
-            # print(f"Querying {name} for sketch_id {sketch_id}...")
-            interpolated = interpolate_to_fixed_size(np.array(vector), target_size=32)
-            results = collection.query(
-                query_embeddings=[interpolated.tolist()],
-                n_results=k,
-                where={"name": str(name)}
+    series = catalog.get(dataset).series
+    titles = series["titles"]
+    if filtered_titles:
+        name_to_index = {name: i for i, name in enumerate(titles)}
+        rows = np.asarray([name_to_index[n] for n in filtered_titles if n in name_to_index], dtype=np.intp)
+    else:
+        rows = np.arange(len(titles))
+    lo, hi = window_range if window_range is not None else (min(WINDOW_SIZES), max(WINDOW_SIZES))
+    window_lengths = range(int(lo), int(hi) + 1)
+
+    def fetch(n, groups):
+        # Groups are positions into `rows`
+        groups = np.arange(len(rows)) if groups is None else groups
+        picked, starts, sizes, scores = mass_topk(series["y"][rows[groups]], vector, window_lengths, n,
+                                                  zone=TRIVIAL_MATCH_EXCLUSION)
+        return groups[picked], starts, starts + sizes, sizes, scores
+
+    picked, starts, _, lengths, scores = distinct_topk(fetch, k, TRIVIAL_MATCH_EXCLUSION, SEARCH_OVERFETCH)
+    return make_hits(titles, series["x_date"], rows[picked], starts, lengths, scores)
+
+
+def search_vectors(shapes, k=10, filtered_titles=None, window_range=None, metric="euclidean", dataset=None):
+    """
+    Top-k windows of every name for each of `shapes` (sketch samples of any
+    length), restricted to filtered_titles and to window sizes within
+    window_range when given. Index metrics search the shapes resampled to
+    TARGET_SIZE; "mass" resamples the samples as drawn straight to each window
+    length. Queries found in the LRU query cache are served from it; the rest
+    are searched together in one WindowIndex.search_batch call (or one MASS
+    scan each for metric "mass").
+    metric is one of search.SEARCH_METRICS; dataset is a catalog id (None
+    for the default dataset). Returns one hit list per shape.
+    """
+    ds = catalog.get(dataset)
+    if metric == "mass":
+        vectors = [np.asarray(shape, dtype=np.float64) for shape in shapes]
+    else:
+        vectors = [interpolate_to_fixed_size(np.asarray(shape, dtype=np.float64), target_size=TARGET_SIZE)
+                   for shape in shapes]
+    keys = [_query_cache_key(vector, filtered_titles, k, window_range, metric) for vector in vectors]
+    results = [ds.query_cache.get(key) for key in keys]
+    for hits in results:
+        metrics.inc("seqindexing_query_cache_lookups_total", metric=metric, result="miss" if hits is None else "hit")
+
+    missing = [i for i, hits in enumerate(results) if hits is None]
+    if missing:
+        started = time.perf_counter()
+        if metric == "mass":
+            found = [
+                search_raw_series(vectors[i], k=k, filtered_titles=filtered_titles, window_range=window_range,
+                                  dataset=ds.id)
+                for i in missing
+            ]
+        else:
+            found = ds.get_window_index().search_batch(
+                np.stack([vectors[i] for i in missing]), k=k, names=filtered_titles, window_range=window_range,
+                metric=metric, dtw_radius=max(1, int(round(DTW_BAND * TARGET_SIZE))), sax_min_rows=SAX_MIN_ROWS,
+                exclusion=TRIVIAL_MATCH_EXCLUSION, overfetch=SEARCH_OVERFETCH,
             )
-            
-            # print(results)
-            for doc, score, meta in zip(results["documents"][0], results["distances"][0], results["metadatas"][0]):
-                hits.append({
-                    "score": score,
-                    "title": doc,
-                    "name": meta["name"],
-                    "start_date": meta["start_date"],
-                    "end_date": meta["end_date"],
-                    "start_idx": meta["start_idx"],
-                    "end_idx": meta["end_idx"],
-                    "window_size": meta["window_size"]
-                })
-        all_results[sketch_id] = hits
-
-    return all_results
-
-
-    
\ No newline at end of file
+        elapsed = time.perf_counter() - started
+        for _ in missing:
+            metrics.observe("seqindexing_query_seconds", elapsed / len(missing), metric=metric, dataset=ds.id)
+        log.debug("index query", extra={"fields": {
+            "dataset": ds.id, "metric": metric, "k": k, "queries": len(missing),
+            "tickers": len(filtered_titles) if filtered_titles else "all", "window_range": window_range,
+            "hits": sum(len(hits) for hits in found), "ms": round(elapsed * 1000.0, 2),
+        }})
+        for i, hits in zip(missing, found):
+            ds.query_cache.put(keys[i], hits)
+            results[i] = hits
+
+    return [list(hits) for hits in results]
+
+
+def query_chroma_topk_for_each_name(histories: dict[str, list[float]], k: int = 10, filtered_titles=None, window_range=None, metric="euclidean", dataset=None):
+    """
+    For each sketch_id in histories, return the top-k windows of every name
+    (restricted to filtered_titles and to window sizes within window_range
+    when given), flattened into one list.
+    Distances for all windows are computed in one pass over the in-process
+    WindowIndex instead of one filtered Chroma query per name; repeated
+    queries are answered from the LRU query cache (see search_vectors).
+    metric is one of search.SEARCH_METRICS ("euclidean", "dtw", "qetch" or
+    "mass"); "mass" bypasses the index and scans the raw series instead.
+    dataset is a catalog id (None for the default dataset).
+    Returns: {sketch_id: [hit, hit, ...]} (same structure as query_chroma_topk)
+    """
+    hits = search_vectors(list(histories.values()), k=k, filtered_titles=filtered_titles, window_range=window_range,
+                          metric=metric, dataset=dataset)
+    return dict(zip(histories, hits))
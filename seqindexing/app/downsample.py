@@ -0,0 +1,69 @@
+import numpy as np
+
+# Point selection for plotting long series at a fixed payload size. Both
+# methods return sorted indices into the original series, so callers pick
+# matching x values (dates) themselves.
+
+
+def minmax_indices(y, n_out):
+    """Keep the minimum and maximum of each of n_out // 2 equal buckets, so no peak or trough is lost."""
+    y = np.asarray(y)
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n)
+    n_buckets = max(1, n_out // 2)
+    size = -(-n // n_buckets)
+    padded = np.pad(y, (0, n_buckets * size - n), mode="edge").reshape(n_buckets, size)
+    base = np.arange(n_buckets) * size
+    picked = np.concatenate([base + padded.argmin(axis=1), base + padded.argmax(axis=1)])
+    return np.unique(np.minimum(picked, n - 1))
+
+
+def lttb_indices(y, n_out):
+    """Largest-Triangle-Three-Buckets: keep the visually most significant point of each bucket."""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 buckets over the interior points; the first and last points are always kept
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    next_lo = edges[1:]
+    next_hi = np.r_[edges[2:], n]
+    csum = np.r_[0.0, np.cumsum(y)]
+    next_y = (csum[next_hi] - csum[next_lo]) / (next_hi - next_lo)
+    next_x = (next_lo + next_hi - 1) / 2.0
+
+    out = np.empty(n_out, dtype=np.intp)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        xs = np.arange(lo, hi)
+        area = np.abs((a - next_x[i]) * (y[lo:hi] - y[a]) - (a - xs) * (next_y[i] - y[a]))
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+
+DOWNSAMPLERS = {"lttb": lttb_indices, "minmax": minmax_indices}
+
+
+def downsample_indices(y, n_out, method="lttb", lo=None, hi=None):
+    """
+    Indices of at most about `n_out` points of `y`. With a visible range
+    [lo, hi) that range gets the full `n_out` budget and the rest of the
+    series a coarse overview (a quarter of the budget), so range sliders
+    still show the whole shape.
+    """
+    pick = DOWNSAMPLERS[method]
+    n = len(y)
+    if lo is None and hi is None:
+        return pick(y, n_out)
+    lo = max(0, int(lo or 0))
+    hi = min(n, int(hi if hi is not None else n))
+    if hi - lo < 2:
+        return pick(y, n_out)
+    overview = pick(y, max(3, n_out // 4))
+    detail = lo + pick(y[lo:hi], n_out)
+    return np.union1d(overview, detail)
@@ -0,0 +1,180 @@
+import numpy as np
+
+from .topk import grouped_topk
+
+# All distances here use squared point costs, so DTW is directly comparable to
+# the squared L2 scores of the Euclidean search (and never larger than them).
+
+# Rows per block when bounding candidates: keeps the float64 temporaries in cache
+LB_BLOCK_ROWS = 2048
+# Rows in the first exact-DTW chunk; each later chunk is twice the size of the one before
+DTW_CHUNK_ROWS = 4096
+
+
+def keogh_envelope(x, radius):
+    """Upper/lower envelopes of `x` (1-D or rows of a 2-D array) for a Sakoe-Chiba band."""
+    x = np.asarray(x)
+    upper, lower = x.copy(), x.copy()
+    # One elementwise pass per offset and direction, clipped at the ends of the band
+    for shift in range(1, radius + 1):
+        np.maximum(upper[..., shift:], x[..., :-shift], out=upper[..., shift:])
+        np.maximum(upper[..., :-shift], x[..., shift:], out=upper[..., :-shift])
+        np.minimum(lower[..., shift:], x[..., :-shift], out=lower[..., shift:])
+        np.minimum(lower[..., :-shift], x[..., shift:], out=lower[..., :-shift])
+    return upper, lower
+
+
+def lb_kim(query, candidates):
+    """LB_Kim (first/last point): every warping path aligns both endpoints."""
+    return (candidates[:, 0] - query[0]) ** 2 + (candidates[:, -1] - query[-1]) ** 2
+
+
+def lb_keogh(candidates, upper, lower):
+    """LB_Keogh of each candidate row against a (query) envelope."""
+    # A point is above the upper or below the lower envelope, never both
+    excess = candidates - upper
+    np.maximum(excess, 0.0, out=excess)
+    below = lower - candidates
+    excess += np.maximum(below, 0.0, out=below)
+    return np.einsum("ij,ij->i", excess, excess)
+
+
+def lb_keogh_reversed(query, upper, lower):
+    """LB_Keogh of the query against each candidate's envelope."""
+    excess = query - upper
+    np.maximum(excess, 0.0, out=excess)
+    below = lower - query
+    excess += np.maximum(below, 0.0, out=below)
+    return np.einsum("ij,ij->i", excess, excess)
+
+
+def dtw_batch(query, candidates, radius, abandon_at=None):
+    """
+    Banded DTW between `query` and every row of `candidates`, one DP row at a
+    time across the whole batch. Rows whose running minimum exceeds their
+    `abandon_at` bound are dropped early and reported as inf.
+    """
+    query = np.asarray(query, dtype=np.float64)
+    # Candidate-minor layout: every DP cell of the batch is one contiguous vector
+    candidates = np.asarray(candidates, dtype=np.float64).T.copy()
+    m, n_cand = candidates.shape
+    n = len(query)
+    out = np.full(n_cand, np.inf)
+    if n_cand == 0:
+        return out
+
+    alive = np.arange(n_cand)
+    bound = None if abandon_at is None else np.asarray(abandon_at, dtype=np.float64)
+    prev = np.full((m + 1, n_cand), np.inf)
+    prev[0] = 0.0
+    cur = np.empty_like(prev)
+
+    for i in range(1, n + 1):
+        lo, hi = max(1, i - radius), min(m, i + radius)
+        cost = (candidates[lo - 1:hi] - query[i - 1]) ** 2
+        step = np.minimum(prev[lo - 1:hi], prev[lo:hi + 1]) + cost
+        cur[lo] = step[0]
+        for j in range(lo + 1, hi + 1):
+            np.minimum(step[j - lo], cur[j - 1] + cost[j - lo], out=cur[j])
+        # The next DP row only reads this row's band and one cell either side of it
+        cur[lo - 1] = np.inf
+        if hi < m:
+            cur[hi + 1] = np.inf
+
+        if bound is not None:
+            # A row's band minimum never decreases, so once past its bound a row
+            # stays past it; compacting only pays once enough rows are dead
+            keep = cur[lo:hi + 1].min(axis=0) <= bound
+            if len(keep) - np.count_nonzero(keep) > len(keep) // 4:
+                alive, bound = alive[keep], bound[keep]
+                candidates, cur = candidates[:, keep], cur[:, keep]
+                if len(alive) == 0:
+                    return out
+                prev = np.empty_like(cur)
+        prev, cur = cur, prev
+
+    final = prev[m]
+    if bound is not None:
+        final = np.where(final <= bound, final, np.inf)
+    out[alive] = final
+    return out
+
+
+def lower_bounds(query, candidates, radius, block=LB_BLOCK_ROWS):
+    """max(LB_Kim, LB_Keogh against the query envelope) of every candidate row, a block at a time."""
+    q_upper, q_lower = keogh_envelope(query, radius)
+    out = np.empty(len(candidates))
+    for lo in range(0, len(candidates), block):
+        cand = candidates[lo:lo + block]
+        out[lo:lo + block] = np.maximum(lb_kim(query, cand), lb_keogh(cand, q_upper, q_lower))
+    return out
+
+
+def reversed_lower_bounds(query, candidates, radius, block=LB_BLOCK_ROWS):
+    """LB_Keogh of the query against every candidate row's own envelope, a block at a time."""
+    out = np.empty(len(candidates))
+    for lo in range(0, len(candidates), block):
+        upper, lower = keogh_envelope(candidates[lo:lo + block], radius)
+        out[lo:lo + block] = lb_keogh_reversed(query, upper, lower)
+    return out
+
+
+def dtw_topk(query, candidates, group_ids, k, radius, chunk=DTW_CHUNK_ROWS):
+    """
+    Exact per-group top-k under banded DTW with cascading lower bounds.
+
+    `candidates` rows are grouped by `group_ids` (sorted). Every row gets the
+    cheap bounds (LB_Kim, LB_Keogh of the query envelope); exact DTW on each
+    group's k lowest-bound rows seeds the per-group thresholds. The remaining
+    rows are then visited in ascending bound order, a chunk at a time: rows
+    whose bound passed their group's threshold are dropped, the rest are
+    checked against LB_Keogh of their own envelopes and run through exact DTW
+    with early abandoning, and every chunk tightens the thresholds for the next.
+    Returns (positions, scores) like `grouped_topk`.
+    """
+    query = np.asarray(query, dtype=np.float64)
+    n = len(group_ids)
+    dist = np.full(n, np.inf)
+    if n == 0 or k <= 0:
+        return np.empty(0, dtype=np.intp), dist[:0]
+
+    group_ids = np.asarray(group_ids)
+    group = np.cumsum(np.r_[0, group_ids[1:] != group_ids[:-1]])
+    # Each group's k best exact distances so far (ascending, inf-padded); the last column is its threshold
+    best = np.full((group[-1] + 1, k), np.inf)
+
+    def evaluate(pos, abandon):
+        cand = candidates[pos]
+        if abandon:
+            keep = reversed_lower_bounds(query, cand, radius) <= best[group[pos], -1]
+            pos, cand = pos[keep], cand[keep]
+        dist[pos] = dtw_batch(query, cand, radius, abandon_at=best[group[pos], -1] if abandon else None)
+        found = pos[np.isfinite(dist[pos])]
+        found = found[np.argsort(group[found], kind="stable")]
+        picked = found[grouped_topk(group[found], dist[found], k)]
+        if len(picked) == 0:
+            return
+        touched, first, counts = np.unique(group[picked], return_index=True, return_counts=True)
+        slot = np.repeat(np.arange(len(touched)), counts)
+        merged = np.full((len(touched), 2 * k), np.inf)
+        merged[:, :k] = best[touched]
+        merged[slot, k + np.arange(len(picked)) - first[slot]] = dist[picked]
+        best[touched] = np.sort(merged, axis=1)[:, :k]
+
+    lb = lower_bounds(query, candidates, radius)
+    seed = grouped_topk(group_ids, lb, k)
+    evaluate(seed, abandon=False)
+
+    todo = np.ones(n, dtype=bool)
+    todo[seed] = False
+    pos = np.flatnonzero(todo)
+    pos = pos[lb[pos] <= best[group[pos], -1]]
+    pos = pos[np.argsort(lb[pos], kind="stable")]
+    while len(pos):
+        head, pos = pos[:chunk], pos[chunk:]
+        evaluate(head[lb[head] <= best[group[head], -1]], abandon=True)
+        pos = pos[lb[pos] <= best[group[pos], -1]]
+        chunk *= 2
+
+    picked = grouped_topk(group_ids, dist, k)
+    return picked, dist[picked]
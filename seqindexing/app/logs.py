@@ -0,0 +1,55 @@
+import json
+import logging
+import sys
+import time
+
+from .config import LOG_LEVEL, LOG_FORMAT
+
+# Leveled, structured logging for the app. Call sites log an event name and
+# pass their fields as extra={"fields": {...}}; the JSON format writes one
+# object per line, the text format appends key=value pairs. Fields are only
+# formatted when the record passes the level check.
+
+ROOT_LOGGER = "seqindexing"
+
+
+def _timestamp(record):
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}"
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": _timestamp(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        fields = " ".join(f"{key}={value!r}" for key, value in getattr(record, "fields", {}).items())
+        line = f"{_timestamp(record)} {record.levelname:<7} {record.name}: {record.getMessage()} {fields}".rstrip()
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+def configure_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, stream=None):
+    """Send every seqindexing.* logger to one stderr handler; safe to call more than once."""
+    if fmt not in ("json", "text"):
+        raise ValueError(f"Unknown log format: {fmt}")
+    logger = logging.getLogger(ROOT_LOGGER)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger
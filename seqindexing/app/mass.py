@@ -0,0 +1,166 @@
+import numpy as np
+from scipy.ndimage import minimum_filter1d
+
+from .utils import interpolate_to_fixed_size
+
+# MASS (Mueen's Algorithm for Similarity Search): z-normalized Euclidean
+# distance profiles from FFT sliding dot products, here batched over every row
+# of a (n_series, n_points) price matrix at once.
+
+MIN_LENGTH = 3
+# Window length whose scores are plain 2 * (1 - correlation); see length_corrected
+REFERENCE_LENGTH = 32
+# Growth of a correlation's weight with window length. A Fisher z-test of
+# independent points would use 1/2, but neighbouring prices (and sketch
+# samples) are strongly dependent; on the S&P 500 data 1/2 pushes most hits to
+# the longest windows and 0 to the shortest, while 1/4 spreads them across
+# the range.
+LENGTH_EXPONENT = 0.25
+
+
+def _fft_size(n):
+    return 1 << int(np.ceil(np.log2(n)))
+
+
+def _prefix_sums(matrix):
+    """Row-wise running sums of x and x**2 with a leading zero column."""
+    zero = np.zeros((matrix.shape[0], 1))
+    csum = np.concatenate([zero, np.cumsum(matrix, axis=1)], axis=1)
+    csum2 = np.concatenate([zero, np.cumsum(matrix ** 2, axis=1)], axis=1)
+    return csum, csum2
+
+
+def _sliding_std(prefix, m):
+    """Standard deviation of every length-m window of every row."""
+    csum, csum2 = prefix
+    mean = (csum[:, m:] - csum[:, :-m]) / m
+    var = (csum2[:, m:] - csum2[:, :-m]) / m
+    var -= mean * mean
+    return np.sqrt(np.maximum(var, 0.0, out=var), out=var)
+
+
+def length_corrected(dist, m):
+    """
+    Rescale 2 * (1 - correlation) scores of length-m windows so that lengths
+    compare fairly: the correlation's Fisher z is weighted by
+    ((m - 3) / (REFERENCE_LENGTH - 3)) ** LENGTH_EXPONENT, so short windows
+    (which correlate well with anything by chance) need a closer fit. In place.
+    """
+    rho = np.subtract(1.0, dist / 2.0, out=dist)
+    np.clip(rho, -1.0 + 1e-12, 1.0 - 1e-12, out=rho)
+    z = np.arctanh(rho, out=rho)
+    z *= (max(m - 3, 0) / (REFERENCE_LENGTH - 3)) ** LENGTH_EXPONENT
+    rho = np.tanh(z, out=z)
+    return np.multiply(np.subtract(1.0, rho, out=rho), 2.0, out=rho)
+
+
+def distance_profiles(matrix_fft, nfft, prefix, query):
+    """
+    Length-corrected z-normalized distances (in [0, 4], see `length_corrected`)
+    between `query` and every window of every row; shape
+    (n_series, n_points - m + 1). `matrix_fft` and `prefix` come from
+    np.fft.rfft and `_prefix_sums` of the series matrix. Flat windows get inf.
+    """
+    m = len(query)
+    n = prefix[0].shape[1] - 1
+    q = np.asarray(query, dtype=np.float64)
+    q = (q - q.mean()) / max(q.std(), 1e-12)
+
+    q_fft = np.fft.rfft(q[::-1], nfft)
+    qt = np.fft.irfft(matrix_fft * q_fft, nfft)[:, m - 1:n]
+
+    std = _sliding_std(prefix, m)
+    flat = std <= 1e-12
+    std *= m
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dist = np.divide(qt, std, out=std)
+    dist -= 1.0
+    dist *= -2.0
+    dist = length_corrected(dist, m)
+    dist[flat] = np.inf
+    return dist
+
+
+def _row_topk(score, columns, k):
+    """Keep the k smallest scores of every row, carrying `columns` along."""
+    kk = min(k, score.shape[1])
+    if kk < score.shape[1]:
+        keep = np.argpartition(score, kk - 1, axis=1)[:, :kk]
+    else:
+        keep = np.argsort(score, axis=1, kind="stable")
+    return np.take_along_axis(score, keep, axis=1), [np.take_along_axis(c, keep, axis=1) for c in columns]
+
+
+def _exclude_neighbours(profile, radius):
+    """Inf every score that a better one less than `radius` + 1 positions away in its row beats. In place."""
+    if radius > 0:
+        local_min = minimum_filter1d(profile, 2 * radius + 1, axis=1, mode="constant", cval=np.inf)
+        profile[profile > local_min] = np.inf
+    return profile
+
+
+def mass_topk(matrix, query, lengths, k, zone=0.0):
+    """
+    Best `k` windows per row over every window length in `lengths`.
+    `query` (the sketch samples as drawn, any length) is resampled to each
+    length before its distance profile is built.
+
+    With an exclusion `zone` > 0, windows that are trivial matches (see
+    topk.suppress_overlaps) of a better window are left out before the top-k,
+    so one event cannot fill every slot: windows of one length starting less
+    than zone * length apart, windows sharing a start, and windows of any
+    lengths starting less than zone * min(lengths) apart. The caller still
+    suppresses overlaps across the remaining candidates.
+    Returns flat arrays (row, start, length, score) ordered by row then score.
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    n_series, n = matrix.shape
+    lengths = [m for m in lengths if MIN_LENGTH <= m <= n]
+    empty = np.empty(0, dtype=np.intp)
+    if n_series == 0 or not lengths or k <= 0:
+        return empty, empty, empty, np.empty(0)
+
+    nfft = _fft_size(n + max(lengths))
+    matrix_fft = np.fft.rfft(matrix, nfft, axis=1)
+    prefix = _prefix_sums(matrix)
+
+    if zone > 0:
+        # Best length of every start; distinct lengths at one start always overlap
+        best_score = np.full((n_series, n - min(lengths) + 1), np.inf)
+        best_length = np.zeros(best_score.shape, dtype=np.intp)
+    else:
+        best_score = np.full((n_series, 0), np.inf)
+        best_start = np.empty((n_series, 0), dtype=np.intp)
+        best_length = np.empty((n_series, 0), dtype=np.intp)
+    for m in lengths:
+        profile = distance_profiles(matrix_fft, nfft, prefix, interpolate_to_fixed_size(query, m))
+        if zone > 0:
+            profile = _exclude_neighbours(profile, int(np.ceil(zone * m)) - 1)
+            width = profile.shape[1]
+            better = profile < best_score[:, :width]
+            best_score[:, :width][better] = profile[better]
+            best_length[:, :width][better] = m
+            continue
+
+        starts = np.broadcast_to(np.arange(profile.shape[1]), profile.shape)
+        score, (start,) = _row_topk(profile, [starts], k)
+        best_score, (best_start, best_length) = _row_topk(
+            np.concatenate([best_score, score], axis=1),
+            [np.concatenate([best_start, start], axis=1),
+             np.concatenate([best_length, np.full(start.shape, m)], axis=1)],
+            k,
+        )
+
+    if zone > 0:
+        best_score = _exclude_neighbours(best_score, int(np.ceil(zone * min(lengths))) - 1)
+        starts = np.broadcast_to(np.arange(best_score.shape[1]), best_score.shape)
+        best_score, (best_start, best_length) = _row_topk(best_score, [starts, best_length], k)
+
+    order = np.argsort(best_score, axis=1, kind="stable")
+    best_score = np.take_along_axis(best_score, order, axis=1)
+    best_start = np.take_along_axis(best_start, order, axis=1)
+    best_length = np.take_along_axis(best_length, order, axis=1)
+
+    valid = np.isfinite(best_score)
+    rows = np.broadcast_to(np.arange(n_series)[:, None], best_score.shape)
+    return rows[valid], best_start[valid], best_length[valid], best_score[valid]
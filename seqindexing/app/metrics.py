@@ -0,0 +1,269 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+
+import numpy as np
+from dash import callback_context
+from dash.exceptions import PreventUpdate
+from flask import Response, jsonify, request
+
+from .config import METRICS_ENABLED, METRICS_SPOOL_DIR
+
+# In-process latency histograms and counters for callbacks and index
+# queries, served on /metrics as Prometheus text (or JSON with ?format=json).
+# Background callbacks run in job processes started by the background
+# manager, which marks them with mark_background_job; their samples are
+# written to METRICS_SPOOL_DIR and folded into a server process's registry
+# on its next scrape. Every other process (including each worker of a
+# preforking server) keeps its samples to itself.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RECENT_SAMPLES = 1024  # per series, for the p50/p99 in the JSON view
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in pairs) + "}"
+
+
+class Metrics:
+    """Thread-safe histograms (`observe`) and counters (`inc`), keyed by name and labels."""
+
+    def __init__(self, spool_dir=METRICS_SPOOL_DIR):
+        self.spool_dir = Path(spool_dir)
+        self._background_job = False
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._pending = []  # samples recorded in a background job, waiting for flush_spool
+        self._started = time.time()
+
+    def mark_background_job(self):
+        """Called once at the start of a background job process: spool its samples from now on."""
+        with self._lock:
+            self._background_job = True
+
+    def _observe(self, key, seconds):
+        hist = self._histograms.get(key)
+        if hist is None:
+            hist = self._histograms[key] = {
+                "count": 0, "sum": 0.0, "max": 0.0,
+                "buckets": [0] * len(LATENCY_BUCKETS),
+                "recent": deque(maxlen=RECENT_SAMPLES),
+            }
+        hist["count"] += 1
+        hist["sum"] += seconds
+        hist["max"] = max(hist["max"], seconds)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                hist["buckets"][i] += 1
+                break
+        hist["recent"].append(seconds)
+
+    def observe(self, name, seconds, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._observe(key, seconds)
+            if self._background_job:
+                self._pending.append(("observe", name, labels, seconds))
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            if self._background_job:
+                self._pending.append(("inc", name, labels, value))
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def flush_spool(self):
+        """In a background job: hand the samples recorded so far to the server processes."""
+        if not self._background_job:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.spool_dir / f".{os.getpid()}-{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(pending, f)
+        os.replace(tmp, tmp.with_name(tmp.name[1:-4] + ".json"))
+
+    def collect_spool(self):
+        """Fold spooled samples from finished background jobs into this registry."""
+        if self._background_job or not self.spool_dir.is_dir():
+            return
+        for path in sorted(self.spool_dir.glob("*.json")):
+            try:
+                with open(path) as f:
+                    samples = json.load(f)
+                path.unlink()
+            except (FileNotFoundError, ValueError):
+                continue
+            with self._lock:
+                for kind, name, labels, value in samples:
+                    key = _key(name, labels)
+                    if kind == "observe":
+                        self._observe(key, value)
+                    else:
+                        self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self):
+        self.collect_spool()
+        with self._lock:
+            histograms, counters = {}, {}
+            for (name, labels), hist in sorted(self._histograms.items()):
+                recent = np.fromiter(hist["recent"], dtype=np.float64) * 1000.0
+                histograms.setdefault(name, []).append({
+                    "labels": dict(labels),
+                    "count": hist["count"],
+                    "sum_seconds": round(hist["sum"], 6),
+                    "max_ms": round(hist["max"] * 1000.0, 3),
+                    "p50_ms": round(float(np.percentile(recent, 50)), 3) if len(recent) else None,
+                    "p99_ms": round(float(np.percentile(recent, 99)), 3) if len(recent) else None,
+                })
+            for (name, labels), value in sorted(self._counters.items()):
+                counters.setdefault(name, []).append({"labels": dict(labels), "value": value})
+        return {
+            "pid": os.getpid(),
+            "uptime_seconds": round(time.time() - self._started, 1),
+            "histograms": histograms,
+            "counters": counters,
+        }
+
+    def prometheus(self, gauges=None):
+        """Prometheus text exposition of every series, plus `gauges` ({name: value})."""
+        self.collect_spool()
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self._histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (hist_name, labels), hist in sorted(self._histograms.items()):
+                    if hist_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, n in zip(LATENCY_BUCKETS, hist["buckets"]):
+                        cumulative += n
+                        lines.append(f"{name}_bucket{_label_text(labels, [('le', bound)])} {cumulative}")
+                    lines.append(f"{name}_bucket{_label_text(labels, [('le', '+Inf')])} {hist['count']}")
+                    lines.append(f"{name}_sum{_label_text(labels)} {hist['sum']:.6f}")
+                    lines.append(f"{name}_count{_label_text(labels)} {hist['count']}")
+            for name in sorted({name for name, _ in self._counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (counter_name, labels), value in sorted(self._counters.items()):
+                    if counter_name == name:
+                        lines.append(f"{name}{_label_text(labels)} {value}")
+        for name, value in sorted((gauges or {}).items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def _trigger_label():
+    """The prop that fired the current callback, with pattern-matching ids reduced to their type."""
+    try:
+        triggered = callback_context.triggered
+    except Exception:
+        return "none"
+    if not triggered:
+        return "initial"
+    prop_id = triggered[0]["prop_id"]
+    if prop_id == ".":
+        return "initial"
+    component, _, prop = prop_id.rpartition(".")
+    if component.startswith("{"):
+        try:
+            component = json.loads(component).get("type", "pattern")
+        except ValueError:
+            pass
+    return f"{component}.{prop}"
+
+
+def timed_callback(func):
+    """Wrap a callback so every call records its wall time, trigger and outcome."""
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            return func(*args, **kwargs)
+        except PreventUpdate:
+            outcome = "prevented"
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            metrics.observe("seqindexing_callback_seconds", time.perf_counter() - started, callback=name)
+            metrics.inc("seqindexing_callback_calls_total", callback=name, trigger=_trigger_label(), outcome=outcome)
+            metrics.flush_spool()
+
+    return wrapper
+
+
+def instrument_callbacks(app):
+    """
+    Time every callback registered on `app` from now on (call before
+    register_callbacks), and count request and response bytes of each
+    callback's HTTP round trips.
+    """
+    if not METRICS_ENABLED:
+        return app
+    register = app.callback
+
+    def callback(*args, **kwargs):
+        decorator = register(*args, **kwargs)
+        return lambda func: decorator(timed_callback(func))
+
+    app.callback = callback
+
+    @app.server.after_request
+    def _count_callback_bytes(response):
+        if request.path.endswith("/_dash-update-component"):
+            body = request.get_json(silent=True) or {}
+            spec = app.callback_map.get(body.get("output"), {})
+            name = getattr(spec.get("callback"), "__name__", "unknown")
+            metrics.inc("seqindexing_callback_request_bytes_total", request.content_length or 0, callback=name)
+            size = response.calculate_content_length()
+            metrics.inc("seqindexing_callback_response_bytes_total", size or 0, callback=name)
+        return response
+
+    return app
+
+
+def register_metrics_route(server, gauges=None):
+    """GET /metrics: Prometheus text, or JSON with ?format=json. `gauges` returns extra {name: value}."""
+    @server.route("/metrics")
+    def _metrics():
+        extra = gauges() if gauges is not None else {}
+        if request.args.get("format") == "json":
+            snapshot = metrics.snapshot()
+            snapshot["gauges"] = extra
+            return jsonify(snapshot)
+        return Response(metrics.prometheus(extra), mimetype="text/plain; version=0.0.4")
+
+    return server
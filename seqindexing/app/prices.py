@@ -0,0 +1,106 @@
+import hashlib
+import json
+import logging
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Binary cache of the price CSV: a float32 (n_series, n_points) matrix, the
+# datetime64 date index and the ticker names. It is rebuilt only when the CSV
+# changes; mtime and size are checked first and the content hash only when
+# those differ.
+
+CACHE_STAMP = "stamp.json"
+
+log = logging.getLogger(__name__)
+
+
+def _file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_csv(csv_path):
+    df = pd.read_csv(csv_path, parse_dates=["Date"]).set_index("Date").dropna(axis=1)
+    values = np.ascontiguousarray(df.to_numpy(dtype=np.float32).T)
+    return values, df.index.to_numpy(dtype="datetime64[ns]"), df.columns.tolist()
+
+
+def _write_cache(cache_dir, values, dates, titles, stamp):
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    np.save(cache_dir / "values.npy", values)
+    np.save(cache_dir / "dates.npy", dates)
+    with open(cache_dir / "titles.json", "w") as f:
+        json.dump(titles, f)
+    # Written last: a cache without a stamp is never trusted
+    with open(cache_dir / CACHE_STAMP, "w") as f:
+        json.dump(stamp, f)
+
+
+def load_price_matrix(csv_path, cache_dir):
+    """
+    (values, dates, titles) for the price CSV, from the binary cache under
+    `cache_dir` when it matches the CSV, otherwise parsed and re-cached.
+    """
+    csv_path, cache_dir = Path(csv_path), Path(cache_dir)
+    started = time.perf_counter()
+    st = csv_path.stat()
+    stamp = {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+    try:
+        with open(cache_dir / CACHE_STAMP) as f:
+            cached = json.load(f)
+    except (FileNotFoundError, ValueError):
+        cached = None
+
+    source = "cache"
+    if cached is not None and (cached["mtime_ns"], cached["size"]) != (stamp["mtime_ns"], stamp["size"]):
+        # Touched but possibly unchanged (e.g. a fresh checkout): compare contents
+        stamp["sha1"] = _file_hash(csv_path)
+        if cached.get("sha1") == stamp["sha1"]:
+            with open(cache_dir / CACHE_STAMP, "w") as f:
+                json.dump(stamp, f)
+        else:
+            cached = None
+
+    if cached is None:
+        source = "CSV"
+        values, dates, titles = _read_csv(csv_path)
+        stamp.setdefault("sha1", _file_hash(csv_path))
+        _write_cache(cache_dir, values, dates, titles, stamp)
+    else:
+        values = np.load(cache_dir / "values.npy")
+        dates = np.load(cache_dir / "dates.npy")
+        with open(cache_dir / "titles.json") as f:
+            titles = json.load(f)
+
+    log.info("price matrix loaded", extra={"fields": {
+        "shape": values.shape, "source": source, "seconds": round(time.perf_counter() - started, 2),
+    }})
+    return values, dates, titles
+
+
+def load_price_dir(directory):
+    """(values, dates, titles) from a directory in the cache layout (values.npy, dates.npy, titles.json)."""
+    directory = Path(directory)
+    started = time.perf_counter()
+    values = np.load(directory / "values.npy")
+    dates = np.load(directory / "dates.npy")
+    with open(directory / "titles.json") as f:
+        titles = json.load(f)
+    log.info("price matrix loaded", extra={"fields": {
+        "shape": values.shape, "source": str(directory), "seconds": round(time.perf_counter() - started, 2),
+    }})
+    return values, dates, titles
+
+
+def load_prices(source, cache_dir):
+    """A price CSV (parsed once, then served from `cache_dir`) or a prebuilt binary directory."""
+    if Path(source).is_dir():
+        return load_price_dir(source)
+    return load_price_matrix(source, cache_dir)
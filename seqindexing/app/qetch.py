@@ -0,0 +1,79 @@
+import numpy as np
+
+# Qetch-style matching (Mannino & Abouzied, "Expressive Time Series Querying
+# with Hand-Drawn Scale-Free Sketches", CHI 2018) over the fixed-length window
+# embeddings. Query and candidates share the same sample positions, so segments
+# line up proportionally and the horizontal scale term of the local distortion
+# error is always zero; only the vertical one remains.
+
+
+def segment_sketch(query, min_points=3):
+    """
+    Split a sketch at its turning points (slope sign changes).
+    Returns segment boundary indices b_0 = 0 < ... < b_S = len(query) - 1;
+    segment s spans points b_s..b_{s+1} inclusive and has at least `min_points`.
+    """
+    query = np.asarray(query, dtype=np.float64)
+    last = len(query) - 1
+    slope = np.sign(np.diff(query))
+    # Flat steps keep the direction of the previous step
+    carried = np.maximum.accumulate(np.where(slope != 0, np.arange(len(slope)), 0))
+    slope = slope[carried]
+    turns = np.flatnonzero(slope[1:] != slope[:-1]) + 1
+
+    bounds = [0]
+    for t in turns.tolist():
+        if t - bounds[-1] >= min_points - 1:
+            bounds.append(t)
+    if len(bounds) > 1 and last - bounds[-1] < min_points - 1:
+        bounds.pop()
+    bounds.append(last)
+    return np.asarray(bounds)
+
+
+def _segment_columns(bounds):
+    """Column list repeating shared endpoints, plus each segment's offset into it."""
+    cols = np.concatenate([np.arange(a, b + 1) for a, b in zip(bounds[:-1], bounds[1:])])
+    lengths = np.diff(bounds) + 1
+    offsets = np.r_[0, np.cumsum(lengths)[:-1]]
+    return cols, offsets, lengths
+
+
+def qetch_scores(query, candidates, min_points=3, distortion_weight=1.0, eps=0.02, chunk_size=65536):
+    """
+    Qetch distance of every candidate row to the sketch, in batched chunks.
+
+    Each sketch segment is rescaled into the vertical frame of the matching
+    candidate segment; the score is the mean squared shape error after that
+    local scaling plus `distortion_weight` times the mean squared log ratio of
+    segment heights (how much each segment had to be stretched relative to
+    the global scale).
+    """
+    query = np.asarray(query, dtype=np.float64)
+    bounds = segment_sketch(query, min_points=min_points)
+    cols, offsets, lengths = _segment_columns(bounds)
+    seg_of_col = np.repeat(np.arange(len(lengths)), lengths)
+
+    q = query[cols]
+    q_min = np.minimum.reduceat(q, offsets)
+    q_height = np.maximum.reduceat(q, offsets) - q_min
+    q_unit = (q - q_min[seg_of_col]) / np.maximum(q_height, eps)[seg_of_col]
+    q_global = query.max() - query.min() + eps
+
+    scores = np.empty(len(candidates))
+    for lo in range(0, len(candidates), chunk_size):
+        c_all = np.asarray(candidates[lo:lo + chunk_size], dtype=np.float64)
+        c = c_all[:, cols]
+        c_min = np.minimum.reduceat(c, offsets, axis=1)
+        c_height = np.maximum.reduceat(c, offsets, axis=1) - c_min
+        c_global = c_all.max(axis=1) - c_all.min(axis=1) + eps
+
+        # Local scaling: map every sketch segment onto the candidate segment's range
+        fitted = c_min[:, seg_of_col] + q_unit * c_height[:, seg_of_col]
+        shape_error = ((c - fitted) ** 2).mean(axis=1) / c_global ** 2
+
+        ratio = ((c_height + eps) / (q_height + eps)) / (c_global / q_global)[:, None]
+        distortion = (np.log(ratio) ** 2).mean(axis=1)
+
+        scores[lo:lo + chunk_size] = shape_error + distortion_weight * distortion
+    return scores
@@ -0,0 +1,166 @@
+import hashlib
+import logging
+import os
+import pickle
+import re
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+from .config import RESULT_STORE_BACKEND, RESULT_STORE_MAX_BYTES, RESULT_STORE_DIRECTORY
+
+log = logging.getLogger(__name__)
+
+# Server-side home for match results. Callbacks keep only a handle
+# ("<session id>:<key>") in their dcc.Stores and fetch the data here, so the
+# per-ticker match dicts never travel to the browser. Entries are immutable:
+# every update is a new put, and old handles age out under the size budget.
+
+# Session ids come from the browser; anything but a short plain token is hashed
+_SESSION_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+_HANDLE = re.compile(r"([A-Za-z0-9_-]{1,64}):([0-9a-f]{32})")
+# The disk store rescans its directory every this many puts (or sooner, see DiskResultStore)
+EVICT_EVERY_PUTS = 32
+
+
+def _new_handle(session_id):
+    session_id = str(session_id or "anon")
+    if not _SESSION_ID.fullmatch(session_id):
+        session_id = hashlib.sha256(session_id.encode()).hexdigest()[:32]
+    return f"{session_id}:{uuid.uuid4().hex}"
+
+
+class MemoryResultStore:
+    """In-process LRU store of pickled values, evicted by total pickled size."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def put(self, session_id, value):
+        handle = _new_handle(session_id)
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._entries[handle] = payload
+            self._size += len(payload)
+            # Always keep the newest entry, even when it alone exceeds the budget
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, old = self._entries.popitem(last=False)
+                self._size -= len(old)
+        return handle
+
+    def get(self, handle):
+        with self._lock:
+            payload = self._entries.get(handle)
+            if payload is None:
+                return None
+            self._entries.move_to_end(handle)
+        return pickle.loads(payload)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "max_bytes": self.max_bytes}
+
+
+class DiskResultStore:
+    """
+    Pickle files under `directory`, shared by every worker process on the
+    host. Eviction removes the least recently read files once the directory
+    exceeds `max_bytes`. Scanning the directory costs a stat per file, so a
+    process only does it every EVICT_EVERY_PUTS puts, or once it has written
+    a tenth of the budget since its last scan.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._written = 0
+
+    def _path(self, handle):
+        match = _HANDLE.fullmatch(handle or "")
+        if match is None:
+            return None
+        return self.directory / f"{match[1]}.{match[2]}.pkl"
+
+    def put(self, session_id, value):
+        handle = _new_handle(session_id)
+        path = self._path(handle)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = f.tell()
+        os.replace(tmp, path)
+        with self._lock:
+            self._puts += 1
+            self._written += size
+            due = self._puts >= EVICT_EVERY_PUTS or self._written * 10 >= self.max_bytes
+            if due:
+                self._puts = self._written = 0
+        if due:
+            self._evict(keep=path)
+        return handle
+
+    def get(self, handle):
+        path = self._path(handle)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        os.utime(path)
+        return value
+
+    def _evict(self, keep):
+        with self._lock:
+            files = []
+            for path in self.directory.glob("*.pkl"):
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((st.st_mtime_ns, st.st_size, path))
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def stats(self):
+        sizes = [p.stat().st_size for p in self.directory.glob("*.pkl")]
+        return {"entries": len(sizes), "bytes": sum(sizes), "max_bytes": self.max_bytes}
+
+
+def make_result_store(backend=RESULT_STORE_BACKEND, max_bytes=RESULT_STORE_MAX_BYTES, directory=RESULT_STORE_DIRECTORY):
+    if backend == "memory":
+        return MemoryResultStore(max_bytes)
+    if backend == "disk":
+        return DiskResultStore(directory, max_bytes)
+    raise ValueError(f"Unknown result store backend: {backend}")
+
+
+result_store = make_result_store()
+
+
+def load_results(handle, default=None):
+    """Value behind a store handle; `default` (or {}) when the handle is empty or evicted."""
+    value = result_store.get(handle) if handle else None
+    if value is None:
+        if handle:
+            log.warning("result handle not found (evicted?)", extra={"fields": {"handle": handle}})
+        return {} if default is None else default
+    return value
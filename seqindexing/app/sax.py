@@ -0,0 +1,143 @@
+import numpy as np
+
+from .topk import grouped_topk, kth_per_group
+
+# PAA/SAX symbolic index over the window embeddings. Embeddings are min-max
+# normalized, so symbols use equal-width cells on [0, 1]; the outer cells are
+# open-ended so the lower bound stays valid for any value.
+
+SAX_SEGMENTS = 8
+SAX_ALPHABET = 8
+HEX_DIGITS = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+
+
+def _segment_lengths(dim, segments):
+    return np.diff(np.linspace(0, dim, segments + 1).round().astype(np.intp))
+
+
+def paa(matrix, segments):
+    """Piecewise aggregate approximation: mean of each of `segments` column blocks."""
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float64))
+    lengths = _segment_lengths(matrix.shape[1], segments)
+    offsets = np.r_[0, np.cumsum(lengths)[:-1]]
+    return np.add.reduceat(matrix, offsets, axis=1) / lengths
+
+
+def sax_words(matrix, segments=SAX_SEGMENTS, alphabet=SAX_ALPHABET):
+    """SAX word (one uint8 symbol per PAA segment) of every row."""
+    symbols = np.floor(paa(matrix, segments) * alphabet)
+    return np.clip(symbols, 0, alphabet - 1).astype(np.uint8)
+
+
+def encode_words(words):
+    """Hex-string form of SAX words, for storage in per-row metadata."""
+    chars = HEX_DIGITS[np.asarray(words)]
+    return [row.tobytes().decode("ascii") for row in chars]
+
+
+def decode_words(strings):
+    """Inverse of `encode_words`; returns a (n, segments) uint8 matrix."""
+    raw = np.frombuffer("".join(strings).encode("ascii"), dtype=np.uint8)
+    lookup = np.zeros(256, dtype=np.uint8)
+    lookup[HEX_DIGITS] = np.arange(len(HEX_DIGITS), dtype=np.uint8)
+    return lookup[raw].reshape(len(strings), -1)
+
+
+class SaxIndex:
+    """
+    Windows bucketed by (ticker, window size, SAX word). A query prunes whole
+    buckets with the SAX lower bound before any exact distance is computed.
+    """
+
+    def __init__(self, words, ticker_ids, window_size, dim, alphabet=SAX_ALPHABET):
+        words = np.asarray(words, dtype=np.uint8)
+        self.alphabet = alphabet
+        self.segments = words.shape[1]
+        self.seg_lengths = _segment_lengths(dim, self.segments)
+        self.ticker_ids = ticker_ids
+
+        edges = np.linspace(0.0, 1.0, alphabet + 1)
+        edges[0], edges[-1] = -np.inf, np.inf
+        self.cell_lo, self.cell_hi = edges[:-1], edges[1:]
+
+        bits = max(1, int(np.ceil(np.log2(alphabet))))
+        if bits * self.segments > 32:
+            raise ValueError("SAX words must fit in 32 bits (segments * log2(alphabet) <= 32)")
+        word_key = np.zeros(len(words), dtype=np.int64)
+        for j in range(self.segments):
+            word_key = (word_key << bits) | words[:, j]
+        key = (ticker_ids.astype(np.int64) << 48) | (window_size.astype(np.int64) << 32) | word_key
+
+        self.members = np.argsort(key, kind="stable")
+        sorted_key = key[self.members]
+        self.offsets = np.flatnonzero(np.r_[True, sorted_key[1:] != sorted_key[:-1]])
+        self.counts = np.diff(np.r_[self.offsets, len(key)])
+        first = self.members[self.offsets]
+        self.bucket_ticker = ticker_ids[first]
+        self.bucket_window = window_size[first]
+
+        # Buckets of different tickers share words: bound each distinct word once per query
+        distinct, self.bucket_word = np.unique(word_key[first], return_inverse=True)
+        self.words = words[first][np.unique(self.bucket_word, return_index=True)[1]]
+        self._word_cells = (self.words + np.arange(self.segments) * alphabet).astype(np.intp)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def bucket_mask(self, ticker_ids=None, window_range=None):
+        mask = np.ones(len(self), dtype=bool)
+        if ticker_ids is not None:
+            mask &= np.isin(self.bucket_ticker, ticker_ids)
+        if window_range is not None:
+            lo, hi = window_range
+            mask &= (self.bucket_window >= lo) & (self.bucket_window <= hi)
+        return mask
+
+    def word_bounds(self, query):
+        """MINDIST between the query's PAA and every distinct word's SAX cells (<= squared L2)."""
+        q = paa(query, self.segments)[0][:, None]
+        gap = np.maximum(self.cell_lo - q, 0.0) + np.maximum(q - self.cell_hi, 0.0)
+        table = (gap * gap * self.seg_lengths[:, None]).ravel()
+        return table[self._word_cells].sum(axis=1)
+
+    def expand(self, buckets):
+        """Row ids of every member of `buckets`."""
+        counts = self.counts[buckets]
+        shift = self.offsets[buckets] - np.r_[0, np.cumsum(counts)[:-1]]
+        return self.members[np.repeat(shift, counts) + np.arange(counts.sum())]
+
+    def search(self, query, distance, k, bucket_mask):
+        """
+        Exact per-ticker top-k under squared L2, computing `distance(rows)` only
+        for rows in buckets the lower bound cannot rule out.
+        Phase 1 takes each ticker's k lowest-bound buckets and uses the k-th
+        exact distance among their windows as that ticker's threshold; phase 2
+        adds every remaining bucket whose bound does not exceed it.
+        Returns (rows, scores) ordered by ticker then score.
+        """
+        buckets = np.flatnonzero(bucket_mask)
+        if len(buckets) == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        lb = self.word_bounds(query)[self.bucket_word[buckets]]
+        tickers = self.bucket_ticker[buckets]
+
+        # Every bucket holds at least one window, so a ticker's k lowest-bound
+        # buckets always hold at least k windows
+        seed = np.zeros(len(buckets), dtype=bool)
+        seed[grouped_topk(tickers, lb, k)] = True
+
+        rows = np.sort(self.expand(buckets[seed]))
+        scores = distance(rows)
+        tau = np.full(int(self.ticker_ids.max()) + 1, np.inf)
+        tau[self.ticker_ids[rows]] = kth_per_group(self.ticker_ids[rows], scores, k)
+
+        rest = buckets[~seed & (lb <= tau[tickers])]
+        if len(rest):
+            more = self.expand(rest)
+            rows = np.concatenate([rows, more])
+            scores = np.concatenate([scores, distance(more)])
+            order = np.argsort(rows, kind="stable")
+            rows, scores = rows[order], scores[order]
+
+        picked = grouped_topk(self.ticker_ids[rows], scores, k)
+        return rows[picked], scores[picked]
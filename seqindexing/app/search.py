@@ -0,0 +1,296 @@
+import numpy as np
+
+from .topk import distinct_topk, grouped_topk
+from .dtw import dtw_topk
+from .qetch import qetch_scores
+from .store import open_window_store
+from .sax import SaxIndex, SAX_SEGMENTS, decode_words, sax_words as compute_sax_words
+
+# "mass" searches the raw price series (any window length) rather than this index
+SEARCH_METRICS = ("euclidean", "dtw", "qetch", "mass")
+# Largest (queries x windows) distance block a batched search holds at once (float32 cells)
+BATCH_DISTANCE_CELLS = 1 << 22
+
+
+def make_hits(names, dates, ticker_ids, starts, window_sizes, scores):
+    """Hit dicts (the shape the callbacks consume) from parallel result columns."""
+    hits = []
+    for tid, start, window_size, score in zip(
+        np.asarray(ticker_ids).tolist(), np.asarray(starts).tolist(),
+        np.asarray(window_sizes).tolist(), np.asarray(scores).tolist(),
+    ):
+        name = names[tid]
+        end = start + window_size
+        hits.append({
+            "score": score,
+            "title": f"{name}_{dates[start]}_{dates[end - 1]}",
+            "name": name,
+            "start_date": str(dates[start])[:10],
+            "end_date": str(dates[end - 1])[:10],
+            "start_idx": start,
+            "end_idx": end,
+            "window_size": window_size,
+        })
+    return hits
+
+
+class WindowIndex:
+    """
+    All window embeddings in one contiguous float32 matrix plus typed columns
+    (ticker id, start index, window size). Rows are kept sorted by ticker id so
+    every ticker owns a contiguous block, which is what `grouped_topk` needs.
+    """
+
+    def __init__(self, embeddings, ticker_ids, start_idx, window_size, names, dates, sax_words=None, sq_norms=None):
+        ticker_ids = np.asarray(ticker_ids, dtype=np.int32)
+        order = None
+        if len(ticker_ids) > 1 and np.any(ticker_ids[1:] < ticker_ids[:-1]):
+            order = np.argsort(ticker_ids, kind="stable")
+
+        def _column(arr, dtype):
+            arr = np.asarray(arr, dtype=dtype)
+            return arr[order] if order is not None else arr
+
+        self.embeddings = np.ascontiguousarray(_column(embeddings, np.float32))
+        self.ticker_ids = _column(ticker_ids, np.int32)
+        self.start_idx = _column(start_idx, np.int32)
+        self.window_size = _column(window_size, np.int32)
+        if sq_norms is None:
+            self.sq_norms = np.einsum("ij,ij->i", self.embeddings, self.embeddings)
+        else:
+            self.sq_norms = _column(sq_norms, np.float32)
+        self.names = list(names)
+        self.dates = dates
+        self.name_to_id = {name: i for i, name in enumerate(self.names)}
+        self.sax_words = None if sax_words is None else _column(sax_words, np.uint8)
+        self._sax = None
+        self._date_labels = None
+
+    def __len__(self):
+        return len(self.ticker_ids)
+
+    @property
+    def dim(self):
+        return self.embeddings.shape[1]
+
+    @classmethod
+    def from_collection(cls, collection, names, dates, batch_size=10000):
+        """Pull every embedding and its metadata out of a Chroma collection in pages."""
+        name_to_id = {name: i for i, name in enumerate(names)}
+        embeddings, ticker_ids, start_idx, window_size, words = [], [], [], [], []
+
+        total = collection.count()
+        for offset in range(0, total, batch_size):
+            page = collection.get(
+                include=["embeddings", "metadatas"],
+                limit=batch_size,
+                offset=offset,
+            )
+            for emb, meta in zip(page["embeddings"], page["metadatas"]):
+                tid = name_to_id.get(meta["name"])
+                if tid is None:
+                    continue
+                embeddings.append(emb)
+                ticker_ids.append(tid)
+                start_idx.append(meta["start_idx"])
+                window_size.append(meta["window_size"])
+                words.append(meta.get("sax"))
+
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(ticker_ids), -1)
+        # Windows indexed before SAX words were stored get theirs computed on first use
+        sax = decode_words(words) if words and None not in words else None
+        return cls(embeddings, ticker_ids, start_idx, window_size, names, dates, sax_words=sax)
+
+    @classmethod
+    def from_store(cls, path, dates):
+        """
+        Open a columnar window store (see store.py) without reading it: every
+        column stays a read-only memory map and pages in on demand.
+        """
+        names, columns = open_window_store(path)
+        return cls(
+            columns["embeddings"], columns["ticker_ids"], columns["start_idx"], columns["window_size"],
+            names, dates, sax_words=columns["sax_words"], sq_norms=columns["sq_norms"],
+        )
+
+    def ids(self, names):
+        """Ticker ids of `names` (None, meaning every ticker, when no names are given)."""
+        if not names:
+            return None
+        return np.asarray([self.name_to_id[n] for n in names if n in self.name_to_id], dtype=np.int32)
+
+    def rows(self, names=None, window_range=None, ids=None):
+        """Row indices (still grouped by ticker) matching the ticker and window-size filters."""
+        mask = None
+        if ids is None:
+            ids = self.ids(names)
+        if ids is not None:
+            mask = np.isin(self.ticker_ids, ids)
+        if window_range is not None:
+            lo, hi = window_range
+            ws_mask = (self.window_size >= lo) & (self.window_size <= hi)
+            mask = ws_mask if mask is None else mask & ws_mask
+        if mask is None:
+            return np.arange(len(self))
+        return np.flatnonzero(mask)
+
+    def _take(self, arr, rows):
+        """`arr[rows]`, without copying when every row is selected."""
+        return arr if len(rows) == len(self) else arr[rows]
+
+    @property
+    def sax(self):
+        """Symbolic (PAA/SAX) bucket index over all windows, built on first use."""
+        if self._sax is None:
+            words = self.sax_words
+            if words is None or words.shape[1] != SAX_SEGMENTS:
+                words = compute_sax_words(self.embeddings)
+            self._sax = SaxIndex(words, self.ticker_ids, self.window_size, self.dim)
+        return self._sax
+
+    def euclidean(self, vector, rows):
+        """Squared L2 distances (the Chroma "l2" space) from `vector` to `rows`."""
+        q = np.asarray(vector, dtype=np.float32)
+        emb, sq = self._take(self.embeddings, rows), self._take(self.sq_norms, rows)
+        dist = sq - 2.0 * (emb @ q) + float(q @ q)
+        return np.maximum(dist, 0.0, out=dist)
+
+    def euclidean_batch(self, vectors, rows):
+        """Squared L2 distances from every row of `vectors` to `rows`, as one matrix product."""
+        q = np.asarray(vectors, dtype=np.float32)
+        emb, sq = self._take(self.embeddings, rows), self._take(self.sq_norms, rows)
+        dist = q @ emb.T
+        dist *= -2.0
+        dist += sq
+        dist += np.einsum("ij,ij->i", q, q)[:, None]
+        return np.maximum(dist, 0.0, out=dist)
+
+    def dtw(self, vector, rows, k, radius):
+        """Per-ticker top-k under banded DTW; returns (rows, scores) like `topk`."""
+        picked, scores = dtw_topk(vector, self._take(self.embeddings, rows), self.ticker_ids[rows], k, radius)
+        return rows[picked], scores
+
+    def topk(self, rows, scores, k):
+        """Best `k` rows per ticker; returns (rows, scores) ordered by ticker then score."""
+        picked = grouped_topk(self.ticker_ids[rows], scores, k)
+        return rows[picked], scores[picked]
+
+    @property
+    def date_labels(self):
+        """str() of every date, formatted once instead of for every hit."""
+        if self._date_labels is None:
+            self._date_labels = [str(d) for d in self.dates]
+        return self._date_labels
+
+    def hits(self, rows, scores):
+        """Materialise result rows as the hit dicts the callbacks consume."""
+        return make_hits(
+            self.names, self.date_labels, self.ticker_ids[rows], self.start_idx[rows], self.window_size[rows], scores
+        )
+
+    def euclidean_sax(self, vector, k, names=None, window_range=None, ids=None):
+        """Per-ticker top-k under squared L2, pruning SAX buckets before exact distances."""
+        if ids is None:
+            ids = self.ids(names)
+        mask = self.sax.bucket_mask(ticker_ids=ids, window_range=window_range)
+        q = np.asarray(vector, dtype=np.float32)
+        return self.sax.search(q, lambda rows: self.euclidean(q, rows), k, mask)
+
+    def candidates(self, vector, k, ids=None, window_range=None, metric="euclidean", dtw_radius=3, sax_min_rows=None):
+        """
+        Per-ticker top-k (rows, scores) for one query vector, restricted to
+        ticker `ids` (every ticker when None). Euclidean queries go through the
+        SAX index once the index holds at least `sax_min_rows` windows.
+        """
+        if metric == "euclidean" and sax_min_rows is not None and len(self) >= sax_min_rows:
+            return self.euclidean_sax(vector, k, window_range=window_range, ids=ids)
+
+        rows = self.rows(window_range=window_range, ids=ids)
+        if len(rows) == 0:
+            return rows, np.empty(0)
+        if metric == "dtw":
+            return self.dtw(vector, rows, k, dtw_radius)
+        if metric == "qetch":
+            scores = qetch_scores(vector, self._take(self.embeddings, rows))
+        elif metric == "euclidean":
+            scores = self.euclidean(vector, rows)
+        else:
+            raise ValueError(f"Unknown metric: {metric}")
+        return self.topk(rows, scores, k)
+
+    def search(self, vector, k=10, names=None, window_range=None, metric="euclidean", dtw_radius=3, sax_min_rows=None,
+               exclusion=0.0, overfetch=4):
+        """
+        Per-ticker top-k hits for one query vector (see `candidates`). With an
+        `exclusion` zone, windows of a ticker that overlap a better hit by more
+        than (1 - exclusion) of the shorter window are dropped as trivial
+        matches, and `overfetch` * k candidates per ticker are ranked so that k
+        distinct ones remain (see topk.distinct_topk).
+        """
+        ids = self.ids(names)
+
+        def fetch(n, tickers):
+            rows, scores = self.candidates(vector, n, ids=ids if tickers is None else tickers,
+                                           window_range=window_range, metric=metric,
+                                           dtw_radius=dtw_radius, sax_min_rows=sax_min_rows)
+            starts = self.start_idx[rows]
+            return self.ticker_ids[rows], starts, starts + self.window_size[rows], rows, scores
+
+        _, _, _, rows, scores = distinct_topk(fetch, k, exclusion, overfetch)
+        if len(rows) == 0:
+            return []
+        return self.hits(rows, scores)
+
+    def search_batch(self, vectors, k=10, names=None, window_range=None, metric="euclidean", dtw_radius=3,
+                     sax_min_rows=None, exclusion=0.0, overfetch=4):
+        """
+        `search` for many query vectors; returns one hit list per vector.
+        Euclidean queries are answered a block at a time: one (queries x
+        windows) matrix product, then one grouped top-k and one suppression
+        pass in which every (query, ticker) pair is a group. DTW, Qetch and
+        SAX-pruned indexes are searched query by query.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if metric != "euclidean" or (sax_min_rows is not None and len(self) >= sax_min_rows):
+            return [
+                self.search(vector, k=k, names=names, window_range=window_range, metric=metric,
+                            dtw_radius=dtw_radius, sax_min_rows=sax_min_rows, exclusion=exclusion, overfetch=overfetch)
+                for vector in vectors
+            ]
+
+        rows = self.rows(names=names, window_range=window_range)
+        if len(rows) == 0:
+            return [[] for _ in vectors]
+        n_rows = len(rows)
+        # Local ticker number of every row, and each ticker's block of rows
+        first = np.flatnonzero(np.r_[True, self.ticker_ids[rows][1:] != self.ticker_ids[rows][:-1]])
+        counts = np.diff(np.r_[first, n_rows])
+        local = np.repeat(np.arange(len(first), dtype=np.int32), counts)
+
+        results = []
+        block = max(1, BATCH_DISTANCE_CELLS // n_rows)
+        for lo in range(0, len(vectors), block):
+            dist = self.euclidean_batch(vectors[lo:lo + block], rows).ravel()
+            n_queries = len(dist) // n_rows
+            # Row-major distances are already ordered by (query, ticker)
+            pairs = (np.arange(n_queries, dtype=np.int32)[:, None] * len(first) + local).ravel()
+
+            def fetch(n, groups):
+                if groups is None:
+                    pos = grouped_topk(pairs, dist, n)
+                else:
+                    query, ticker = np.divmod(groups.astype(np.intp), len(first))
+                    sizes = counts[ticker]
+                    shift = query * n_rows + first[ticker] - np.r_[0, np.cumsum(sizes)[:-1]]
+                    cells = np.repeat(shift, sizes) + np.arange(sizes.sum())
+                    pos = cells[grouped_topk(pairs[cells], dist[cells], n)]
+                picked = rows[pos % n_rows]
+                starts = self.start_idx[picked]
+                return pairs[pos], starts, starts + self.window_size[picked], pos, dist[pos]
+
+            _, _, _, pos, scores = distinct_topk(fetch, k, exclusion, overfetch)
+            bounds = np.searchsorted(pos // n_rows, np.arange(n_queries + 1))
+            for q in range(n_queries):
+                cut = slice(bounds[q], bounds[q + 1])
+                results.append(self.hits(rows[pos[cut] % n_rows], scores[cut]))
+        return results
@@ -0,0 +1,83 @@
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+# On-disk window store: one .npy file per column, rows sorted by ticker id, so
+# the app can np.load(..., mmap_mode="r") everything and every worker process
+# shares the same read-only pages through the OS page cache.
+
+STORE_META = "meta.json"
+STORE_COLUMNS = {
+    "embeddings": np.float32,
+    "sq_norms": np.float32,
+    "ticker_ids": np.int32,
+    "start_idx": np.int32,
+    "window_size": np.int32,
+    "sax_words": np.uint8,
+}
+
+
+def write_window_store(path, names, chunks):
+    """
+    Write `chunks` ({ticker_id: [(starts, window_size, embeddings, sax_words), ...]})
+    as a columnar store under `path`. The store is assembled in a sibling
+    directory and swapped in at the end; meta.json is written last. The old
+    store is renamed aside before the swap and deleted only after it, so a
+    reader never finds `path` without a store for longer than two renames.
+    """
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    parts = [part for tid in sorted(chunks) for part in chunks[tid]]
+    n_rows = sum(len(starts) for starts, _, _, _ in parts)
+    dim = next((emb.shape[1] for _, _, emb, _ in parts if len(emb)), 0)
+    segments = next((words.shape[1] for _, _, _, words in parts if len(words)), 0)
+    shapes = {"embeddings": (n_rows, dim), "sax_words": (n_rows, segments)}
+
+    columns = {
+        name: np.lib.format.open_memmap(tmp / f"{name}.npy", mode="w+", dtype=dtype,
+                                        shape=shapes.get(name, (n_rows,)))
+        for name, dtype in STORE_COLUMNS.items()
+    }
+    lo = 0
+    for tid in sorted(chunks):
+        for starts, window_size, emb, words in chunks[tid]:
+            hi = lo + len(starts)
+            columns["embeddings"][lo:hi] = emb
+            columns["sq_norms"][lo:hi] = np.einsum("ij,ij->i", emb, emb)
+            columns["ticker_ids"][lo:hi] = tid
+            columns["start_idx"][lo:hi] = starts
+            columns["window_size"][lo:hi] = window_size
+            columns["sax_words"][lo:hi] = words
+            lo = hi
+    for column in columns.values():
+        column.flush()
+    del columns
+
+    with open(tmp / STORE_META, "w") as f:
+        json.dump({"names": list(names), "rows": n_rows, "dim": dim}, f)
+
+    old = path.with_name(path.name + ".old")
+    shutil.rmtree(old, ignore_errors=True)
+    if path.exists():
+        path.rename(old)
+    tmp.rename(path)
+    shutil.rmtree(old, ignore_errors=True)
+    return n_rows
+
+
+def open_window_store(path):
+    """Memory-map every column of the store at `path` read-only; returns (names, columns)."""
+    path = Path(path)
+    with open(path / STORE_META) as f:
+        meta = json.load(f)
+    columns = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in STORE_COLUMNS}
+    return meta["names"], columns
+
+
+def store_exists(path):
+    return (Path(path) / STORE_META).exists()
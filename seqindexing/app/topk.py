@@ -0,0 +1,135 @@
+import numpy as np
+
+
+def grouped_topk(group_ids, scores, k):
+    """
+    Per-group top-k over rows that are sorted by group id.
+    Scores are scattered into a padded (n_groups, max_group_size) matrix and a
+    single argpartition along axis 1 picks the k smallest of every group.
+    Returns positions into `scores`, ordered by group then ascending score.
+    Non-finite scores are treated as pruned and never returned.
+    """
+    scores = np.asarray(scores)
+    n = len(scores)
+    if n == 0 or k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    group_ids = np.asarray(group_ids)
+    starts = np.flatnonzero(np.r_[True, group_ids[1:] != group_ids[:-1]])
+    counts = np.diff(np.r_[starts, n])
+    group = np.repeat(np.arange(len(starts)), counts)
+    pos = np.arange(n) - starts[group]
+
+    width = int(counts.max())
+    padded = np.full((len(starts), width), np.inf, dtype=scores.dtype)
+    padded[group, pos] = scores
+
+    kk = min(k, width)
+    if kk < width:
+        part = np.argpartition(padded, kk - 1, axis=1)[:, :kk]
+    else:
+        part = np.tile(np.arange(width), (len(starts), 1))
+    part_scores = np.take_along_axis(padded, part, axis=1)
+    order = np.argsort(part_scores, axis=1, kind="stable")
+    part = np.take_along_axis(part, order, axis=1)
+    part_scores = np.take_along_axis(part_scores, order, axis=1)
+
+    keep = np.isfinite(part_scores)
+    return (starts[:, None] + part)[keep]
+
+
+def kth_per_group(group_ids, scores, k):
+    """k-th smallest score of each row's group (inf when the group has fewer than k)."""
+    group_ids = np.asarray(group_ids)
+    group = np.cumsum(np.r_[0, group_ids[1:] != group_ids[:-1]])
+    kth = np.full(group[-1] + 1 if len(group) else 0, np.inf)
+    picked = grouped_topk(group_ids, scores, k)
+    counts = np.bincount(group[picked], minlength=len(kth))
+    full = counts >= k
+    # grouped_topk returns each group's picks in ascending order, so the last one is the k-th
+    last = np.cumsum(counts) - 1
+    kth[full] = scores[picked[last[full]]]
+    return kth[group]
+
+
+def suppress_overlaps(group_ids, starts, ends, k, zone):
+    """
+    Greedy non-maximum suppression over [start, end) intervals, for candidates
+    ordered by group then ascending score (as `grouped_topk` returns them).
+    A candidate is dropped when it overlaps a better one kept for its group by
+    more than (1 - zone) of the shorter interval; for equal lengths m that is
+    a start within zone * m of the kept one. Every group advances one rank
+    per step, so the loop runs once per rank rather than once per candidate.
+    Returns positions of the kept candidates (at most k per group), in order.
+    """
+    n = len(group_ids)
+    if n == 0 or k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    group_ids = np.asarray(group_ids)
+    first = np.flatnonzero(np.r_[True, group_ids[1:] != group_ids[:-1]])
+    counts = np.diff(np.r_[first, n])
+    group = np.repeat(np.arange(len(first)), counts)
+    pos = np.arange(n) - first[group]
+
+    width = int(counts.max())
+    lo = np.zeros((len(first), width), dtype=np.int64)
+    hi = np.zeros((len(first), width), dtype=np.int64)
+    lo[group, pos] = starts
+    hi[group, pos] = ends
+
+    kept_lo = np.zeros((len(first), k), dtype=np.int64)
+    kept_hi = np.zeros((len(first), k), dtype=np.int64)
+    n_kept = np.zeros(len(first), dtype=np.intp)
+    keep = np.zeros((len(first), width), dtype=bool)
+    slots = np.arange(k)
+    for rank in range(width):
+        live = np.flatnonzero((rank < counts) & (n_kept < k))
+        if len(live) == 0:
+            break
+        s, e = lo[live, rank, None], hi[live, rank, None]
+        overlap = np.minimum(e, kept_hi[live]) - np.maximum(s, kept_lo[live])
+        limit = (1.0 - zone) * np.minimum(e - s, kept_hi[live] - kept_lo[live])
+        clash = ((overlap > limit) & (slots < n_kept[live, None])).any(axis=1)
+        live = live[~clash]
+        kept_lo[live, n_kept[live]] = lo[live, rank]
+        kept_hi[live, n_kept[live]] = hi[live, rank]
+        n_kept[live] += 1
+        keep[live, rank] = True
+
+    return (first[:, None] + np.arange(width))[keep]
+
+
+def distinct_topk(fetch, k, zone, overfetch):
+    """
+    Per-group top-k with trivial matches (overlapping windows of one event)
+    suppressed. `fetch(n, groups)` returns the per-group top-n of `groups`
+    (every group when None) as parallel arrays (group_ids, starts, ends, ...)
+    ordered by group then ascending score. Fetches overfetch * k candidates,
+    suppresses overlaps, and fetches again with twice as many candidates only
+    for groups that ran out before k distinct matches. zone <= 0 disables
+    suppression. Returns the arrays filtered to the kept candidates.
+    """
+    if zone <= 0:
+        return fetch(k, None)
+
+    n = k * max(1, overfetch)
+    columns = fetch(n, None)
+    done = []
+    while True:
+        groups = columns[0]
+        keep = suppress_overlaps(groups, columns[1], columns[2], k, zone)
+        ids, candidates = np.unique(groups, return_counts=True)
+        kept = np.bincount(np.searchsorted(ids, groups[keep]), minlength=len(ids))
+        # A group with n candidates may have more beyond them; fewer means it is exhausted
+        short = ids[(kept < k) & (candidates >= n)]
+        settled = keep[~np.isin(groups[keep], short)]
+        done.append([np.asarray(c)[settled] for c in columns])
+        if len(short) == 0:
+            break
+        n *= 2
+        columns = fetch(n, short)
+
+    merged = [np.concatenate(parts) for parts in zip(*done)]
+    order = np.argsort(merged[0], kind="stable")
+    return [c[order] for c in merged]
@@ -57,4 +57,25 @@ def normalize_minmax(arr):
     max_val = float(np.max(arr))
     if max_val == min_val:
         return np.zeros_like(arr)
-    return (arr - min_val) / (max_val - min_val)
\ No newline at end of file
+    return (arr - min_val) / (max_val - min_val)
+
+
+def normalize_minmax_rows(mat):
+    """Row-wise normalize_minmax over a 2-D (n_windows, window_size) matrix."""
+    mat = np.asarray(mat, dtype=np.float64)
+    min_val = mat.min(axis=1, keepdims=True)
+    span = mat.max(axis=1, keepdims=True) - min_val
+    out = np.zeros_like(mat)
+    np.divide(mat - min_val, span, out=out, where=span != 0)
+    return out
+
+
+def interpolate_rows_to_fixed_size(mat, target_size):
+    """Row-wise interpolate_to_fixed_size; every row shares the same sample positions."""
+    mat = np.asarray(mat, dtype=np.float64)
+    n = mat.shape[1]
+    pos = np.linspace(0, n - 1, target_size)
+    lo = np.floor(pos).astype(np.intp)
+    hi = np.minimum(lo + 1, n - 1)
+    frac = pos - lo
+    return mat[:, lo] * (1.0 - frac) + mat[:, hi] * frac
@@ -0,0 +1,304 @@
+import argparse
+import contextlib
+import json
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Ensure project root is on sys.path when running as a script
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import numpy as np
+import pandas as pd
+import dash
+from flask import Flask
+
+from seqindexing.app import data as app_data
+from seqindexing.app.callbacks import register_callbacks
+from seqindexing.app.catalog import series_from_matrix
+from seqindexing.app.config import PREVIEW_PAGE_SIZE, SAX_MIN_ROWS, SEARCH_OVERFETCH, TRIVIAL_MATCH_EXCLUSION
+from seqindexing.app.layout import serve_layout
+from seqindexing.app.results import result_store
+from seqindexing.app.search import WindowIndex
+from seqindexing.app.utils import get_color_palette, interpolate_to_fixed_size, normalize_minmax
+from seqindexing.data.data_sp500 import TARGET_SIZE, WINDOW_SIZES, ingest
+
+# Performance benchmarks on synthetic prices (no data/sp500.csv needed):
+# ingestion throughput, per-query search latency over a grid of k, ticker
+# count and window range, and server time of the two figure-building
+# callbacks. Results are written as JSON so runs can be compared.
+#
+#   python -m seqindexing.benchmark --tickers 500 --days 2520 --out bench.json
+
+DEFAULT_KS = [1, 10, 100]
+DEFAULT_TICKER_COUNTS = [10, 100, 0]  # 0 = every ticker
+DEFAULT_WINDOW_RANGES = [[7, 7], [7, 30]]
+
+
+def synthetic_prices(n_tickers, n_days, seed=0):
+    """Geometric random-walk closes on business days, one column per ticker (T0000, T0001, ...)."""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0003, 0.02, size=(n_days, n_tickers))
+    start = rng.uniform(10, 500, size=n_tickers)
+    values = start * np.exp(np.cumsum(returns, axis=0))
+    dates = pd.bdate_range("2010-01-04", periods=n_days, name="Date")
+    return pd.DataFrame(values, index=dates, columns=[f"T{i:04d}" for i in range(n_tickers)])
+
+
+def random_sketches(n, seed=1, length=50):
+    """Drawn-looking query shapes: short random walks, min-max normalized like the sketch pad sends them."""
+    rng = np.random.default_rng(seed)
+    return [normalize_minmax(np.cumsum(rng.normal(size=length))).tolist() for _ in range(n)]
+
+
+def latency_summary(seconds):
+    ms = np.asarray(seconds) * 1000.0
+    return {
+        "n": len(ms),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def bench_ingest(df, store_path, workers, chroma_path=None):
+    collection = None
+    if chroma_path is not None:
+        from chromadb import PersistentClient
+        collection = PersistentClient(path=str(chroma_path)).get_or_create_collection("benchmark")
+    started = time.perf_counter()
+    n_windows = ingest(df, collection, store_path=store_path, workers=workers)
+    elapsed = time.perf_counter() - started
+    return {
+        "windows": n_windows,
+        "seconds": round(elapsed, 3),
+        "windows_per_sec": round(n_windows / max(elapsed, 1e-9)),
+        "workers": workers,
+        "chroma": collection is not None,
+    }
+
+
+def bench_queries(index, titles, sketches, ks, ticker_counts, window_ranges, metric):
+    """Latency of WindowIndex.search, the engine behind query_chroma_topk_for_each_name, without the query cache."""
+    vectors = [interpolate_to_fixed_size(np.array(s), target_size=TARGET_SIZE) for s in sketches]
+    results = []
+    for k in ks:
+        for n_tickers in ticker_counts:
+            names = titles[:n_tickers] if n_tickers else None
+            for window_range in window_ranges:
+                timings = []
+                for vector in vectors:
+                    t0 = time.perf_counter()
+                    index.search(vector, k=k, names=names, window_range=tuple(window_range),
+                                 metric=metric, sax_min_rows=SAX_MIN_ROWS,
+                                 exclusion=TRIVIAL_MATCH_EXCLUSION, overfetch=SEARCH_OVERFETCH)
+                    timings.append(time.perf_counter() - t0)
+                results.append({
+                    "metric": metric,
+                    "k": k,
+                    "tickers": len(names) if names else len(titles),
+                    "window_range": list(window_range),
+                    "sax": len(index) >= SAX_MIN_ROWS,
+                    **latency_summary(timings),
+                })
+                print(f"query {results[-1]}")
+    return results
+
+
+def match_data_for(index, sketch, pattern_id):
+    """Per-ticker top-10 matches of one sketch, reformatted the way submit_sketch stores them."""
+    vector = interpolate_to_fixed_size(np.array(sketch), target_size=TARGET_SIZE)
+    match_data = {}
+    for hit in index.search(vector, k=10, sax_min_rows=SAX_MIN_ROWS,
+                            exclusion=TRIVIAL_MATCH_EXCLUSION, overfetch=SEARCH_OVERFETCH):
+        match_data.setdefault(hit["name"], {}).setdefault(pattern_id, []).append({
+            "start_idx": hit["start_idx"],
+            "end_idx": hit["end_idx"],
+            "score": hit["score"],
+            "window_size": hit["end_idx"] - hit["start_idx"],
+        })
+    return match_data
+
+
+def make_bench_app():
+    """The dashboard's Dash app (layout and callbacks) without create_app's index warm-up."""
+    server = Flask(__name__)
+    app = dash.Dash(__name__, server=server, url_base_pathname="/dashboard/")
+    app.layout = serve_layout
+    register_callbacks(app)
+    return app
+
+
+def call_callback(client, app, output, values, changed):
+    """
+    POST one callback request the way the browser does; `output` picks the
+    callback by (part of) its output id and `values` maps "id.property" to
+    the input/state values. Returns (seconds, response bytes).
+    """
+    key = next(k for k in app.callback_map if output in k)
+    spec = app.callback_map[key]
+
+    def deps(items):
+        return [{"id": d["id"], "property": d["property"], "value": values.get(f"{d['id']}.{d['property']}")}
+                for d in items]
+
+    if key.startswith(".."):
+        outputs = [dict(zip(("id", "property"), part.rsplit(".", 1))) for part in key[2:-2].split("...")]
+    else:
+        outputs = dict(zip(("id", "property"), key.rsplit(".", 1)))
+    body = {"output": key, "outputs": outputs, "inputs": deps(spec["inputs"]),
+            "state": deps(spec["state"]), "changedPropIds": [changed]}
+
+    t0 = time.perf_counter()
+    response = client.post("/dashboard/_dash-update-component", json=body)
+    elapsed = time.perf_counter() - t0
+    if response.status_code != 200:
+        raise RuntimeError(f"{key} returned {response.status_code}: {response.data[:200]!r}")
+    return elapsed, len(response.data)
+
+
+def bench_callbacks(index, titles, sketches, pattern_counts, repeats):
+    app = make_bench_app()
+    client = app.server.test_client()
+    colors = get_color_palette(10)
+    results = []
+
+    for n_patterns in pattern_counts:
+        match_data, active_patterns = {}, {}
+        for p in range(n_patterns):
+            pattern_id = f"pattern-{p}"
+            for name, patterns in match_data_for(index, sketches[p % len(sketches)], pattern_id).items():
+                match_data.setdefault(name, {}).update(patterns)
+            # Each pattern shows a different ticker, as after clicking a preview card
+            active_patterns[pattern_id] = {
+                "color": colors[p % len(colors)],
+                "name": f"Pattern {p + 1}",
+                "selected_series": p % len(titles),
+                "selected_series_name": titles[p % len(titles)],
+            }
+        handle = result_store.put("benchmark", match_data)
+
+        values = {
+            "active-patterns-with-selection.data": active_patterns,
+            "selected-series-store.data": [],
+            "match-results-store.data": handle,
+            "main-plot-xrange.data": None,
+        }
+        runs = [call_callback(client, app, "main-figure-base.data", values, "active-patterns-with-selection.data")
+                for _ in range(repeats)]
+        results.append({
+            "callback": "update_main_plot",
+            "patterns": n_patterns,
+            "response_bytes": runs[-1][1],
+            **latency_summary([seconds for seconds, _ in runs]),
+        })
+        print(f"callback {results[-1]}")
+
+        # New results render the first page; "Show more" appends one page to it
+        for trigger, clicks in (("match-results-store.data", 0), ("preview-more-button.n_clicks", 1)):
+            values = {
+                "selected-series-store.data": [],
+                "match-results-store.data": handle,
+                "distance-threshold-store.data": None,
+                "series-name-filter.value": None,
+                "series-to-sketch-map.data": {},
+                "sketch-color-list.data": colors,
+                "active-patterns-with-selection.data": {},
+                "active-sketch-id.data": f"pattern-{n_patterns - 1}",
+                "preview-more-button.n_clicks": clicks,
+                "preview-visible-count.data": PREVIEW_PAGE_SIZE * max(clicks, 1),
+            }
+            runs = [call_callback(client, app, "series-selector-container.children", values, trigger)
+                    for _ in range(repeats)]
+            results.append({
+                "callback": "update_series_preview_list",
+                "patterns": n_patterns,
+                "trigger": trigger.split(".")[0],
+                "cards": PREVIEW_PAGE_SIZE,
+                "response_bytes": runs[-1][1],
+                **latency_summary([seconds for seconds, _ in runs]),
+            })
+            print(f"callback {results[-1]}")
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark ingestion, search and callbacks on synthetic prices.")
+    parser.add_argument("--tickers", type=int, default=100, help="synthetic tickers")
+    parser.add_argument("--days", type=int, default=2520, help="synthetic trading days")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1, help="ingestion worker processes")
+    parser.add_argument("--chroma", action="store_true", help="also time inserting into a (temporary) Chroma collection")
+    parser.add_argument("--queries", type=int, default=50, help="queries per grid point")
+    parser.add_argument("--k", type=int, nargs="+", default=DEFAULT_KS)
+    parser.add_argument("--ticker-counts", type=int, nargs="+", default=DEFAULT_TICKER_COUNTS,
+                        help="tickers searched per query (0 for all)")
+    parser.add_argument("--window-ranges", type=json.loads, default=DEFAULT_WINDOW_RANGES,
+                        help='JSON list of [min, max] window ranges, e.g. "[[7, 7], [7, 30]]"')
+    parser.add_argument("--metrics", nargs="+", default=["euclidean"], help="search metrics to time")
+    parser.add_argument("--patterns", type=int, nargs="+", default=[1, 5], help="active patterns in the main chart")
+    parser.add_argument("--repeats", type=int, default=10, help="runs per callback case")
+    parser.add_argument("--skip", nargs="+", default=[], choices=["ingest", "query", "callbacks"])
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    return parser.parse_args()
+
+
+def run(args):
+    df = synthetic_prices(args.tickers, args.days, seed=args.seed)
+    titles = list(df.columns)
+    sketches = random_sketches(args.queries, seed=args.seed + 1)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "dash": dash.__version__,
+            "platform": platform.platform(),
+            "args": vars(args),
+            "window_sizes": list(WINDOW_SIZES),
+        },
+    }
+
+    with tempfile.TemporaryDirectory(prefix="seqindexing_bench_") as tmp:
+        store_path = Path(tmp) / "window_store"
+        # The store is needed for the other sections even when ingestion is not being timed
+        ingest_report = bench_ingest(df, store_path, args.workers,
+                                     chroma_path=Path(tmp) / "chroma_db" if args.chroma else None)
+        if "ingest" not in args.skip:
+            report["ingest"] = ingest_report
+            print(f"ingest {ingest_report}")
+
+        index = WindowIndex.from_store(store_path, df.index.tolist())
+        report["meta"]["windows"] = len(index)
+        if "query" not in args.skip:
+            report["query"] = [
+                row for metric in args.metrics
+                for row in bench_queries(index, titles, sketches, args.k, args.ticker_counts, args.window_ranges, metric)
+            ]
+        if "callbacks" not in args.skip:
+            app_data.series.override(series_from_matrix(
+                np.ascontiguousarray(df.to_numpy(dtype=np.float32).T),
+                df.index.to_numpy(dtype="datetime64[ns]"),
+                titles,
+            ))
+            report["callbacks"] = bench_callbacks(index, titles, sketches, args.patterns, args.repeats)
+        del index
+    return report
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    # Progress and the app's own logging go to stderr; stdout carries only the report
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+        print(f"Wrote {args.out}", file=sys.stderr)
+    else:
+        print(text)
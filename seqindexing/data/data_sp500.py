@@ -1,12 +1,20 @@
-import uuid
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
 from chromadb import PersistentClient
+from numpy.lib.stride_tricks import sliding_window_view
 from tqdm import tqdm
 
-from seqindexing.app.utils import interpolate_to_fixed_size, normalize_minmax
+from seqindexing.app.utils import interpolate_rows_to_fixed_size, normalize_minmax_rows
+from seqindexing.app.sax import encode_words, sax_words
+from seqindexing.app.store import open_window_store, store_exists, write_window_store
 
 # --- Config ---
 # Preset windows expressed in dataset units with human-friendly labels
@@ -21,48 +29,326 @@ WINDOW_SIZE_LABELS = {p["value"]: p["label"] for p in WINDOW_PRESETS}
 TARGET_SIZE = 32
 STEP_SIZE = 1
 MAX_STOCKS = 20
+BATCH_SIZE = 5000
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 CSV_PATH = PROJECT_ROOT / "data" / "sp500.csv"
 CHROMA_PATH = PROJECT_ROOT / "chroma_db"
+STORE_PATH = PROJECT_ROOT / "window_store"
+MANIFEST_PATH = PROJECT_ROOT / "build_manifest.json"
 COLLECTION_NAME = "sp500_series"
+# HNSW index of the Chroma collection (Chroma's defaults). space, M and
+# ef_construction are fixed when the collection is built; ef_search can be
+# changed on an existing collection. See seqindexing.ann_eval for picking them.
+HNSW_SPACE = "l2"
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 100
+HNSW_EF_SEARCH = 100
+
+
+def build_windows(values, window_size, step=STEP_SIZE, target_size=TARGET_SIZE):
+    """
+    Embed every window of one series at once.
+    Returns (starts, embeddings): the start index of each kept window and its
+    min-max normalized, resampled (n_windows, target_size) embedding.
+    Windows containing NaN are dropped.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < window_size:
+        return np.empty(0, dtype=np.int64), np.empty((0, target_size))
+
+    windows = sliding_window_view(values, window_size)[::step]
+    starts = np.arange(0, len(values) - window_size + 1, step)
+    valid = ~np.isnan(windows).any(axis=1)
+    windows, starts = windows[valid], starts[valid]
+
+    embeddings = interpolate_rows_to_fixed_size(normalize_minmax_rows(windows), target_size)
+    return starts, embeddings
+
+
+def window_records(stock_name, window_size, starts, words, date_labels):
+    """Chroma documents and metadatas for the windows starting at `starts`."""
+    documents, metadatas = [], []
+    for start, word in zip(starts.tolist(), encode_words(words)):
+        end = start + window_size
+        documents.append(f"{stock_name}_{date_labels[start]}_{date_labels[end - 1]}")
+        metadatas.append({
+            "name": stock_name,
+            "start_date": date_labels[start][:10],
+            "end_date": date_labels[end - 1][:10],
+            "start_idx": start,
+            "end_idx": end,
+            "window_size": window_size,
+            "sax": word
+        })
+    return documents, metadatas
+
+
+def hnsw_configuration(space=HNSW_SPACE, m=HNSW_M, ef_construction=HNSW_EF_CONSTRUCTION, ef_search=HNSW_EF_SEARCH):
+    """Chroma collection configuration for the HNSW index over the window embeddings."""
+    return {"hnsw": {"space": space, "max_neighbors": m, "ef_construction": ef_construction, "ef_search": ef_search}}
+
+
+def window_ids(stock_name, window_size, starts, date_labels):
+    """Deterministic ids ("ticker:window:start date"), so re-inserting a window overwrites it."""
+    return [f"{stock_name}:{window_size}:{date_labels[start][:10]}" for start in starts.tolist()]
+
+
+def embed_shard(values, ticker_ids, window_sizes, shard_path, since=0):
+    """
+    Embed the series in `values` (one row per ticker in `ticker_ids`) at every
+    window size and save the rows to the .npz file `shard_path`, grouped by
+    ticker, then window size. Only windows ending at or after row `since` are
+    kept. Runs inside the worker processes.
+    """
+    columns = {"ticker_ids": [], "start_idx": [], "window_size": [], "embeddings": [], "sax_words": []}
+    for ticker_id, series in zip(ticker_ids, values):
+        for window_size in window_sizes:
+            offset = max(0, since - window_size + 1)
+            starts, embeddings = build_windows(series[offset:], window_size)
+            starts = starts + offset
+            columns["ticker_ids"].append(np.full(len(starts), ticker_id, dtype=np.int32))
+            columns["start_idx"].append(starts.astype(np.int32))
+            columns["window_size"].append(np.full(len(starts), window_size, dtype=np.int32))
+            columns["embeddings"].append(embeddings.astype(np.float32))
+            columns["sax_words"].append(sax_words(embeddings))
+    np.savez(shard_path, **{name: np.concatenate(parts) for name, parts in columns.items()})
+    return shard_path
+
+
+def shard_chunks(shard):
+    """Split a loaded shard into (ticker_id, starts, window_size, embeddings, sax_words) runs."""
+    tids, sizes = shard["ticker_ids"], shard["window_size"]
+    breaks = np.flatnonzero((np.diff(tids) != 0) | (np.diff(sizes) != 0)) + 1
+    bounds = np.r_[0, breaks, len(tids)] if len(tids) else np.empty(0, dtype=np.intp)
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        yield (int(tids[lo]), shard["start_idx"][lo:hi], int(sizes[lo]),
+               shard["embeddings"][lo:hi], shard["sax_words"][lo:hi])
+
+
+def ingest(df, collection, window_sizes=WINDOW_SIZES, batch_size=BATCH_SIZE, store_path=STORE_PATH, workers=1,
+           since=0):
+    """
+    Embed every (stock, window size) pair and write it to `collection` (if
+    given) in large batches, and to the memory-mapped window store at
+    `store_path` (if given).
+
+    With `since` > 0 the first `since` rows of `df` are already indexed: only
+    windows ending after them are embedded, upserted into `collection` and
+    appended to the existing store.
+
+    Tickers are split into shards embedded by `workers` processes; each shard
+    is saved as an .npz file and a single merge step in this process feeds
+    Chroma (which takes one writer) and assembles the window store.
+    """
+    date_labels = [str(d) for d in df.index]
+    names = list(df.columns)
+    values = df.to_numpy(dtype=np.float64).T
+    n_shards = max(1, min(len(names), workers * 4))
+    shards = [ids for ids in np.array_split(np.arange(len(names)), n_shards) if len(ids)]
+    store_chunks = {}
+    n_windows = 0
+    started = time.perf_counter()
+
+    with tempfile.TemporaryDirectory(prefix="sp500_shards_") as shard_dir:
+        jobs = [(values[ids], ids.tolist(), list(window_sizes), str(Path(shard_dir) / f"shard_{k:04d}.npz"), since)
+                for k, ids in enumerate(shards)]
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(embed_shard, *job) for job in jobs]
+                for future in tqdm(as_completed(futures), total=len(futures), desc="embedding"):
+                    future.result()
+        else:
+            for job in tqdm(jobs, desc="embedding"):
+                embed_shard(*job)
+        embed_seconds = time.perf_counter() - started
+
+        merge_started = time.perf_counter()
+        if since and store_path is not None:
+            # Keep the indexed rows; the new windows of each ticker follow them
+            _, old = open_window_store(store_path)
+            bounds = np.searchsorted(old["ticker_ids"], np.arange(len(names) + 1))
+            for ticker_id in range(len(names)):
+                lo, hi = bounds[ticker_id], bounds[ticker_id + 1]
+                if hi > lo:
+                    store_chunks[ticker_id] = [(old["start_idx"][lo:hi], old["window_size"][lo:hi],
+                                                old["embeddings"][lo:hi], old["sax_words"][lo:hi])]
+
+        for _, _, _, shard_path, _ in tqdm(jobs, desc="merging"):
+            with np.load(shard_path) as f:
+                shard = {name: f[name] for name in f.files}
+            n_rows = len(shard["ticker_ids"])
+            n_windows += n_rows
+            if not n_rows:
+                continue
+
+            if collection is not None:
+                ids, documents, metadatas = [], [], []
+                for ticker_id, starts, window_size, _, words in shard_chunks(shard):
+                    docs, metas = window_records(names[ticker_id], window_size, starts, words, date_labels)
+                    ids.extend(window_ids(names[ticker_id], window_size, starts, date_labels))
+                    documents.extend(docs)
+                    metadatas.extend(metas)
+                for lo in range(0, n_rows, batch_size):
+                    hi = min(lo + batch_size, n_rows)
+                    collection.upsert(
+                        embeddings=shard["embeddings"][lo:hi],
+                        documents=documents[lo:hi],
+                        ids=ids[lo:hi],
+                        metadatas=metadatas[lo:hi]
+                    )
+            if store_path is not None:
+                for ticker_id, starts, window_size, embeddings, words in shard_chunks(shard):
+                    store_chunks.setdefault(ticker_id, []).append((starts, window_size, embeddings, words))
+
+        if store_path is not None:
+            write_window_store(store_path, names, store_chunks)
+            print(f"Wrote window store to {store_path}")
+        merge_seconds = time.perf_counter() - merge_started
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"Inserted {n_windows} windows in {elapsed:.1f}s "
+        f"({n_windows / max(elapsed, 1e-9):.0f} windows/sec end-to-end, "
+        f"{n_windows / max(embed_seconds, 1e-9):.0f} windows/sec embedding on {workers} worker(s), "
+        f"{n_windows / max(merge_seconds, 1e-9):.0f} windows/sec merge)"
+    )
+    return n_windows
+
+
+def build_manifest(df, window_sizes, chroma, store, hnsw=None):
+    """What an index build covered; compared against the CSV on the next --incremental run."""
+    # Only the build-time HNSW settings; ef_search is applied to the existing collection
+    hnsw_build = {key: value for key, value in (hnsw or {}).get("hnsw", {}).items() if key != "ef_search"}
+    return {
+        "tickers": list(df.columns),
+        "window_sizes": list(window_sizes),
+        "target_size": TARGET_SIZE,
+        "step": STEP_SIZE,
+        "first_date": str(df.index[0]),
+        "last_date": str(df.index[-1]),
+        "n_dates": len(df.index),
+        "chroma": chroma,
+        "store": store,
+        "hnsw": hnsw_build if chroma else None,
+    }
+
+
+def read_manifest(path=MANIFEST_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def write_manifest(manifest, path=MANIFEST_PATH):
+    tmp = Path(str(path) + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
+
+
+def incremental_start(df, manifest, window_sizes, chroma, store, hnsw=None):
+    """
+    Number of leading rows of `df` already indexed according to `manifest`,
+    or None (with a printed reason) when the last build cannot be extended
+    and a full rebuild is needed.
+    """
+    if manifest is None:
+        print("No build manifest; doing a full build")
+        return None
+    current = build_manifest(df, window_sizes, chroma, store, hnsw)
+    keys = ("tickers", "window_sizes", "target_size", "step", "first_date") + (("hnsw",) if chroma else ())
+    for key in keys:
+        if manifest.get(key) != current[key]:
+            print(f"Build manifest {key} differs from the data; doing a full build")
+            return None
+    if (chroma and not manifest.get("chroma")) or (store and not manifest.get("store")):
+        print("Last build did not write every requested target; doing a full build")
+        return None
+    n_dates = manifest.get("n_dates", 0)
+    if n_dates > len(df.index) or str(df.index[n_dates - 1]) != manifest.get("last_date"):
+        print("Indexed dates are not a prefix of the CSV; doing a full build")
+        return None
+    return n_dates
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build the S&P 500 window index.")
+    parser.add_argument("--max-stocks", type=int, default=MAX_STOCKS,
+                        help="number of tickers to index (0 for all)")
+    parser.add_argument("--dataset",
+                        help="build this entry of the app's dataset catalog (config.yaml) instead of data/sp500.csv")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help="windows per collection.add call")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes embedding ticker shards in parallel (0 for all cores)")
+    parser.add_argument("--no-chroma", action="store_true",
+                        help="only build the window store (all the app needs); skip the Chroma collection")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only index windows ending on dates added since the last build")
+    parser.add_argument("--hnsw-space", choices=["l2", "cosine", "ip"], default=HNSW_SPACE,
+                        help="distance of the Chroma HNSW index (the app ranks by l2)")
+    parser.add_argument("--hnsw-m", type=int, default=HNSW_M,
+                        help="HNSW graph degree (max_neighbors)")
+    parser.add_argument("--hnsw-ef-construction", type=int, default=HNSW_EF_CONSTRUCTION,
+                        help="HNSW candidate list size while building")
+    parser.add_argument("--hnsw-ef-search", type=int, default=HNSW_EF_SEARCH,
+                        help="HNSW candidate list size per query; also updates an existing collection")
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
+    args = parse_args()
+
+    csv_path, store_path, chroma_path, collection_name, manifest_path = (
+        CSV_PATH, STORE_PATH, CHROMA_PATH, COLLECTION_NAME, MANIFEST_PATH)
+    if args.dataset:
+        from seqindexing.app.config import DATASETS
+        if args.dataset not in DATASETS:
+            raise SystemExit(f"Unknown dataset {args.dataset!r}; the catalog has {', '.join(DATASETS)}")
+        spec = DATASETS[args.dataset]
+        csv_path, store_path, chroma_path, collection_name = (
+            spec["source"], spec["store"], spec["chroma"], spec["collection"])
+        manifest_path = PROJECT_ROOT / f"build_manifest_{args.dataset}.json"
+
     # Load data
-    df = pd.read_csv(CSV_PATH, parse_dates=["Date"]).set_index("Date").dropna(axis=1)
-
-    client = PersistentClient(path=str(CHROMA_PATH))
-    collection = client.get_or_create_collection(name=COLLECTION_NAME)
-
-    # Add vectors
-    for window_size in WINDOW_SIZES:
-        print(f"processing window size {window_size} from {WINDOW_SIZES}")
-        for stock_name in tqdm(df.columns[:MAX_STOCKS]):
-            values = df[stock_name].to_numpy()
-            dates = df.index
-
-            for start in range(0, len(values) - window_size + 1, STEP_SIZE):
-                end = start + window_size
-                window = values[start:end]
-
-                if np.isnan(window).any():
-                    continue
-
-                normalized = normalize_minmax(window)
-                interpolated = interpolate_to_fixed_size(normalized, target_size=TARGET_SIZE)
-
-                collection.add(
-                    embeddings=[interpolated.tolist()],
-                    documents=[f"{stock_name}_{dates[start]}_{dates[end-1]}"],
-                    ids=[str(uuid.uuid4())],
-                    metadatas=[{
-                        "name": stock_name,
-                        "start_date": str(dates[start])[:10],
-                        "end_date": str(dates[end - 1])[:10],
-                        "start_idx": start,
-                        "end_idx": end,
-                        "window_size": window_size
-                    }]
-                )
-
-    print("Inserted vectors into ChromaDB.")
\ No newline at end of file
+    if Path(csv_path).is_dir():
+        from seqindexing.app.prices import load_price_dir
+        values, dates, titles = load_price_dir(csv_path)
+        df = pd.DataFrame(values.T, index=pd.DatetimeIndex(dates, name="Date"), columns=titles).dropna(axis=1)
+    else:
+        df = pd.read_csv(csv_path, parse_dates=["Date"]).set_index("Date").dropna(axis=1)
+    if args.max_stocks:
+        df = df.iloc[:, :args.max_stocks]
+
+    workers = args.workers or os.cpu_count()
+    chroma = not args.no_chroma
+    hnsw = hnsw_configuration(args.hnsw_space, args.hnsw_m, args.hnsw_ef_construction, args.hnsw_ef_search)
+    manifest = read_manifest(manifest_path)
+    since = incremental_start(df, manifest, WINDOW_SIZES, chroma, store=True, hnsw=hnsw) if args.incremental else None
+    if since is not None and not store_exists(store_path):
+        print("Window store missing; doing a full build")
+        since = None
+
+    collection, batch_size = None, args.batch_size
+    if chroma:
+        client = PersistentClient(path=str(chroma_path))
+        if since is None and collection_name in [c.name for c in client.list_collections()]:
+            # A full build replaces the collection instead of adding a second copy of every window
+            client.delete_collection(collection_name)
+        collection = client.get_or_create_collection(name=collection_name, configuration=hnsw)
+        if since is not None:
+            # An existing collection keeps its configuration; only ef_search can change in place
+            collection.modify(configuration={"hnsw": {"ef_search": args.hnsw_ef_search}})
+        batch_size = min(args.batch_size, client.get_max_batch_size())
+
+    if since == len(df.index):
+        print(f"Index is up to date through {manifest['last_date']}; nothing to do.")
+    else:
+        if since:
+            print(f"Indexing {len(df.index) - since} new dates after {manifest['last_date']}")
+        ingest(df, collection, batch_size=batch_size, store_path=store_path, workers=workers, since=since or 0)
+        write_manifest(build_manifest(df, WINDOW_SIZES, chroma, store=True, hnsw=hnsw), manifest_path)
+        if chroma:
+            print("Inserted vectors into ChromaDB.")
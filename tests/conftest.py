@@ -0,0 +1,79 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+# The app package first: data_sp500 imports from it
+import seqindexing.app  # noqa: E402,F401
+from seqindexing.app.search import WindowIndex  # noqa: E402
+from seqindexing.app.utils import interpolate_to_fixed_size, normalize_minmax  # noqa: E402
+from seqindexing.data.data_sp500 import ingest  # noqa: E402
+
+WINDOW_SIZES = [7, 14]
+
+
+def random_walk_prices(n_tickers=5, n_days=120, seed=0):
+    """Positive random-walk closes with a business-day index, like data/sp500.csv."""
+    rng = np.random.default_rng(seed)
+    values = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.02, size=(n_days, n_tickers)), axis=0))
+    dates = pd.bdate_range("2020-01-01", periods=n_days, name="Date")
+    return pd.DataFrame(values, index=dates, columns=[f"T{i:02d}" for i in range(n_tickers)])
+
+
+def embed_windows(prices, window_sizes):
+    """Every window of every ticker, min-max normalized and resampled to 32 points like data_sp500 does."""
+    embeddings, ticker_ids, start_idx, window_size = [], [], [], []
+    for tid, name in enumerate(prices.columns):
+        values = prices[name].to_numpy()
+        for size in window_sizes:
+            for start in range(len(values) - size + 1):
+                embeddings.append(interpolate_to_fixed_size(normalize_minmax(values[start:start + size]), 32))
+                ticker_ids.append(tid)
+                start_idx.append(start)
+                window_size.append(size)
+    return np.asarray(embeddings), ticker_ids, start_idx, window_size
+
+
+@pytest.fixture(scope="session")
+def prices():
+    return random_walk_prices()
+
+
+@pytest.fixture(scope="session")
+def store_path(prices, tmp_path_factory):
+    path = tmp_path_factory.mktemp("store") / "window_store"
+    ingest(prices, None, window_sizes=WINDOW_SIZES, store_path=path)
+    return path
+
+
+@pytest.fixture(scope="session")
+def index(prices, store_path):
+    return WindowIndex.from_store(store_path, prices.index.tolist())
+
+
+@pytest.fixture
+def sketch():
+    rng = np.random.default_rng(1)
+    walk = np.cumsum(rng.normal(size=32))
+    return ((walk - walk.min()) / (walk.max() - walk.min())).astype(np.float32)
+
+
+@pytest.fixture
+def catalog(prices, store_path, tmp_path, monkeypatch):
+    """A one-dataset catalog over the synthetic prices and store, installed as the app's catalog."""
+    from seqindexing.app import data
+    from seqindexing.app.catalog import make_catalog
+
+    source = tmp_path / "prices.csv"
+    prices.to_csv(source)
+    specs = {"synth": {"label": "Synthetic", "source": source, "store": store_path,
+                       "chroma": tmp_path / "chroma_db", "collection": "synth_series"}}
+    catalog = make_catalog(specs, "synth", max_bytes=1 << 30)
+    monkeypatch.setattr(data, "catalog", catalog)
+    return catalog
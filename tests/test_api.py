@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from flask import Flask
+
+from seqindexing.app import api
+from seqindexing.app.api import register_api_routes
+from seqindexing.app.data import query_chroma_topk_for_each_name
+
+
+@pytest.fixture
+def client(catalog):
+    return register_api_routes(Flask(__name__)).test_client()
+
+
+def test_columns_match_the_dashboard_search(client):
+    shapes = {"up": [0.0, 0.5, 1.0], "v": [1.0, 0.0, 1.0, 0.2]}
+    response = client.post("/api/search", json={"queries": shapes, "k": 2, "window_range": [7, 14]})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["ids"] == ["up", "v"] and body["dataset"] == "synth"
+    columns = body["columns"]
+    assert body["count"] == len(columns["query"]) == len(columns["score"])
+
+    expected = query_chroma_topk_for_each_name(shapes, k=2, window_range=(7, 14))
+    for q, query_id in enumerate(body["ids"]):
+        got = [(body["names"][columns["ticker"][i]], columns["start_idx"][i], columns["window_size"][i])
+               for i in range(body["count"]) if columns["query"][i] == q]
+        assert got == [(h["name"], h["start_idx"], h["window_size"]) for h in expected[query_id]]
+
+
+def test_ticker_filter_and_list_queries(client):
+    response = client.post("/api/search", json={"queries": [[0, 1, 0], [1, 0, 1]], "k": 1, "tickers": ["T01"]})
+    body = response.get_json()
+    assert body["ids"] == [0, 1]
+    assert body["names"] == ["T01"] and body["columns"]["query"] == [0, 1]
+
+
+@pytest.mark.parametrize("metric", ["euclidean", "dtw", "mass"])
+def test_queries_are_normalized_like_a_drawn_sketch(client, metric):
+    def search(shape):
+        body = client.post("/api/search", json={"queries": [shape], "k": 2, "metric": metric}).get_json()
+        return [body["columns"][c] for c in ("ticker", "start_idx", "window_size", "score")]
+
+    unit = search((np.arange(30) / 29).tolist())
+    assert search(list(range(30))) == unit
+    assert search((np.arange(30) * 250.0 - 40.0).tolist()) == unit
+    assert max(unit[3]) <= 32.0
+
+
+@pytest.mark.parametrize("payload, message", [
+    ({"queries": []}, "queries is empty"),
+    ({"queries": "x"}, "queries must be"),
+    ({"queries": [[1]]}, "at least two finite values"),
+    ({"queries": [[1, float("nan")]]}, "at least two finite values"),
+    ({"queries": [["a", 2]]}, "not a list of numbers"),
+    ({"queries": [[1, 2]], "k": 0}, "k must be"),
+    ({"queries": [[1, 2]], "k": True}, "k must be"),
+    ({"queries": [[1, 2]], "metric": "cosine"}, "metric must be"),
+    ({"queries": [[1, 2]], "dataset": "nope"}, "Unknown dataset"),
+    ({"queries": [[1, 2]], "tickers": ["ZZZ"]}, "unknown tickers: ZZZ"),
+    ({"queries": [[1, 2]], "tickers": "T01"}, "tickers must be"),
+    ({"queries": [[1, 2]], "window_range": [14, 7]}, "window_range must be"),
+    ({"queries": [[1, 2]], "window_range": [7]}, "window_range must be"),
+])
+def test_invalid_requests_get_400(client, payload, message):
+    response = client.post("/api/search", json=payload)
+    assert response.status_code == 400
+    assert message in response.get_json()["error"]
+
+
+def test_non_json_body_gets_400(client):
+    response = client.post("/api/search", data="not json")
+    assert response.status_code == 400
+
+
+def test_query_limit(client, monkeypatch):
+    monkeypatch.setattr(api, "API_MAX_QUERIES", 2)
+    response = client.post("/api/search", json={"queries": np.ones((3, 4)).tolist()})
+    assert response.status_code == 400
+
+
+def test_mass_limits(client, monkeypatch):
+    monkeypatch.setattr(api, "API_MAX_MASS_QUERIES", 2)
+    monkeypatch.setattr(api, "API_MAX_MASS_WINDOW_SIZES", 10)
+    queries = np.arange(12.0).reshape(3, 4).tolist()
+    response = client.post("/api/search", json={"queries": queries, "metric": "mass"})
+    assert response.status_code == 400 and "mass queries" in response.get_json()["error"]
+    response = client.post("/api/search", json={"queries": queries[:2], "metric": "mass", "window_range": [5, 15]})
+    assert response.status_code == 400 and "mass window_range" in response.get_json()["error"]
+    response = client.post("/api/search", json={"queries": queries[:2], "metric": "mass", "window_range": [5, 14]})
+    assert response.status_code == 200
+    # The limits are for mass only
+    assert client.post("/api/search", json={"queries": queries, "window_range": [5, 15]}).status_code == 200
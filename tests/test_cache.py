@@ -0,0 +1,36 @@
+import numpy as np
+
+from seqindexing.app import cache
+from seqindexing.app.cache import QueryCache
+from seqindexing.app.data import _query_cache_key
+
+
+def test_lru_eviction_and_counters():
+    c = QueryCache(max_entries=2, ttl_seconds=None)
+    c.put("a", 1)
+    c.put("b", 2)
+    assert c.get("a") == 1  # "a" becomes most recently used
+    c.put("c", 3)
+    assert c.get("b") is None
+    assert (c.get("a"), c.get("c")) == (1, 3)
+    assert c.stats() == {"hits": 3, "misses": 1, "hit_rate": 0.75, "entries": 2, "max_entries": 2}
+
+
+def test_entries_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    c = QueryCache(max_entries=4, ttl_seconds=10)
+    c.put("a", 1)
+    now[0] += 9
+    assert c.get("a") == 1
+    now[0] += 2
+    assert c.get("a") is None
+    assert c.stats()["entries"] == 0
+
+
+def test_nearby_sketches_share_a_key():
+    vector = np.round(np.linspace(0.0, 1.0, 32), 2)
+    key = _query_cache_key(vector, ["B", "A"], 10, (7, 30), "euclidean")
+    assert _query_cache_key(vector + 0.001, ["A", "B"], 10, [7, 30], "euclidean") == key
+    assert _query_cache_key(vector + 0.05, ["A", "B"], 10, (7, 30), "euclidean") != key
+    assert _query_cache_key(vector, ["A", "B"], 10, (7, 30), "dtw") != key
@@ -0,0 +1,115 @@
+from types import SimpleNamespace
+
+import pytest
+from dash import Output, Patch
+from dash.exceptions import PreventUpdate
+
+from seqindexing.app import callbacks as app_callbacks
+from seqindexing.app import results
+from seqindexing.app.results import MemoryResultStore
+
+
+class Recorder:
+    """Stands in for the Dash app: keeps each registered callback and its dependencies."""
+
+    def __init__(self):
+        self.functions, self.dependencies = {}, {}
+
+    def callback(self, *dependencies, **kwargs):
+        def register(fn):
+            self.functions[fn.__name__] = fn
+            self.dependencies[fn.__name__] = dependencies
+            return fn
+        return register
+
+    def clientside_callback(self, *args, **kwargs):
+        pass
+
+
+@pytest.fixture
+def app(catalog, monkeypatch):
+    store = MemoryResultStore(max_bytes=1 << 20)
+    monkeypatch.setattr(results, "result_store", store)
+    monkeypatch.setattr(app_callbacks, "result_store", store)
+    monkeypatch.setattr(app_callbacks, "make_background_manager", lambda: None)
+    recorder = Recorder()
+    app_callbacks.register_callbacks(recorder)
+    return recorder
+
+
+def triggered(monkeypatch, component):
+    monkeypatch.setattr(app_callbacks, "callback_context", SimpleNamespace(triggered_id=component))
+
+
+def test_only_the_preview_list_pages(app):
+    writers = [name for name, deps in app.dependencies.items()
+               if any(isinstance(d, Output) and d.component_id == "preview-visible-count" for d in deps)]
+    assert writers == ["update_series_preview_list"]
+
+
+def test_new_results_render_once_from_the_first_page(app, catalog, monkeypatch):
+    monkeypatch.setattr(app_callbacks, "PREVIEW_PAGE_SIZE", 2)
+    names = catalog.get().series["titles"]
+    handle = results.result_store.put("s", {
+        name: {"p": [{"start_idx": 0, "end_idx": 7, "score": 0.1, "window_size": 7}] * (i + 1)}
+        for i, name in enumerate(names)
+    })
+    render = app.functions["update_series_preview_list"]
+
+    def call(visible_count):
+        return render([], handle, None, None, {}, ["#f00"], {}, "p", 0, visible_count, None)
+
+    triggered(monkeypatch, "match-results-store")
+    cards, label, _, count = call(4)
+    assert count == 2 and len(cards) == 2 and label == f"Show more ({len(names) - 2} left)"
+
+    triggered(monkeypatch, "preview-more-button")
+    patch, label, _, count = call(2)
+    assert isinstance(patch, Patch) and count == 4 and label == f"Show more ({len(names) - 4} left)"
+
+    triggered(monkeypatch, "selected-series-store")
+    cards, _, _, count = call(4)
+    assert count == 4 and len(cards) == 4
+
+
+def test_previews_rank_every_ticker_by_matches_under_the_threshold(app, catalog, monkeypatch):
+    monkeypatch.setattr(app_callbacks, "PREVIEW_PAGE_SIZE", 2)
+    names = catalog.get().series["titles"]
+    # Every ticker has three matches; the last tickers have the lowest scores
+    handle = results.result_store.put("s", {
+        name: {"p": [{"start_idx": 0, "end_idx": 7, "score": len(names) - i + j, "window_size": 7}
+                     for j in range(3)]}
+        for i, name in enumerate(names)
+    })
+    render = app.functions["update_series_preview_list"]
+    triggered(monkeypatch, "distance-threshold-store")
+    cards, label, _, count = render([], handle, 2.5, None, {}, ["#f00"], {}, "p", 0, 4, None)
+    assert count == 2 and label == "Show more (0 left)"
+    assert [card.children[1].children for card in cards] == [names[-1], names[-2]]
+
+
+def test_repeated_submit_is_served_from_the_query_cache(app):
+    from seqindexing.app.data import query_cache_stats
+
+    submit = app.functions["submit_sketch_blocking"]
+    shape = [0.0, 0.3, 0.1, 0.8, 1.0, 0.6]
+    args = (1, None, shape, {}, [7, 14], ["#f00"], {}, None, "euclidean", "s", None)
+    first = submit(*args)
+    before = query_cache_stats()["hits"]
+    second = submit(*args)
+    assert query_cache_stats()["hits"] == before + 1
+    # Each submit files its matches under a new sketch id
+    matches = [{name: list(by_sketch.values()) for name, by_sketch in results.result_store.get(out[0]).items()}
+               for out in (first, second)]
+    assert matches[0] == matches[1]
+
+
+def test_switching_dataset_clears_the_drawn_sketch(app):
+    writes = [d.component_id for d in app.dependencies["switch_dataset"] if isinstance(d, Output)]
+    assert {"series-name-filter", "sketch-shape-store", "sketch-refresh-key"} <= set(writes)
+    out = app.functions["switch_dataset"]("synth", 3)
+    shape, refresh_key = (out[writes.index(c)] for c in ("sketch-shape-store", "sketch-refresh-key"))
+    assert shape is None and refresh_key == 4
+    # The filter reset re-triggers submit_sketch, which must then have nothing to search
+    with pytest.raises(PreventUpdate):
+        app.functions["submit_sketch_blocking"](1, [], shape, {}, [7, 14], ["#f00"], {}, None, "euclidean", "s", "synth")
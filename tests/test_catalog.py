@@ -0,0 +1,78 @@
+import importlib
+
+import numpy as np
+import pytest
+from chromadb import PersistentClient
+
+from seqindexing.app.catalog import make_catalog
+from seqindexing.data.data_sp500 import ingest
+
+from conftest import WINDOW_SIZES
+
+
+def keys(hits):
+    return [(h["name"], h["start_idx"], h["window_size"], round(h["score"], 4)) for h in hits]
+
+
+def make_dataset(prices, tmp_path, store, chroma):
+    source = tmp_path / "prices.csv"
+    prices.to_csv(source)
+    specs = {"synth": {"label": "Synthetic", "source": source, "store": store, "chroma": chroma,
+                       "collection": "synth_series"}}
+    return make_catalog(specs, "synth", max_bytes=1 << 30).get("synth")
+
+
+def test_store_only_dataset_never_opens_chroma(prices, store_path, tmp_path, monkeypatch, sketch):
+    def no_chroma(*args, **kwargs):
+        raise AssertionError("Chroma opened for a dataset with a window store")
+
+    # seqindexing.app.catalog is also the name of the app's catalog instance
+    monkeypatch.setattr(importlib.import_module("seqindexing.app.catalog"), "PersistentClient", no_chroma)
+    dataset = make_dataset(prices, tmp_path, store_path, tmp_path / "chroma_db")
+    hits = dataset.get_window_index().search(sketch, k=3)
+    assert len(hits) == 3 * len(prices.columns)
+    assert not (tmp_path / "chroma_db").exists()
+
+
+def test_parallel_store_only_build_serves_the_app(prices, store_path, tmp_path, monkeypatch, sketch):
+    # What `data_sp500 --no-chroma --workers 2` builds is all the app needs
+    def no_chroma(*args, **kwargs):
+        raise AssertionError("Chroma opened for a dataset with a window store")
+
+    monkeypatch.setattr(importlib.import_module("seqindexing.app.catalog"), "PersistentClient", no_chroma)
+    ingest(prices, None, window_sizes=WINDOW_SIZES, store_path=tmp_path / "window_store", workers=2)
+    parallel = make_dataset(prices, tmp_path, tmp_path / "window_store", tmp_path / "chroma_db").get_window_index()
+    serial = make_dataset(prices, tmp_path, store_path, tmp_path / "chroma_db").get_window_index()
+    assert keys(parallel.search(sketch, k=3)) == keys(serial.search(sketch, k=3))
+
+
+def test_collection_is_the_fallback_without_a_store(prices, store_path, tmp_path, sketch):
+    chroma = tmp_path / "chroma_db"
+    collection = PersistentClient(path=str(chroma)).get_or_create_collection("synth_series")
+    ingest(prices, collection, window_sizes=WINDOW_SIZES, store_path=tmp_path / "unused_store")
+    dataset = make_dataset(prices, tmp_path, tmp_path / "missing_store", chroma)
+    from_chroma = dataset.get_window_index()
+    from_store = make_dataset(prices, tmp_path, store_path, chroma).get_window_index()
+    assert len(from_chroma) == len(from_store)
+    assert keys(from_chroma.search(sketch, k=3)) == keys(from_store.search(sketch, k=3))
+
+
+@pytest.mark.parametrize("metric", ["euclidean", "dtw", "mass"])
+def test_app_search_on_a_store_only_dataset(catalog, metric):
+    from seqindexing.app.data import query_chroma_topk_for_each_name
+
+    shape = np.linspace(0.0, 1.0, 30) ** 2
+    hits = query_chroma_topk_for_each_name({"s": shape}, k=2, metric=metric)["s"]
+    assert {h["name"] for h in hits} == set(catalog.get().series["titles"])
+
+
+def test_nbytes_counts_the_sax_index(prices, store_path, tmp_path):
+    dataset = make_dataset(prices, tmp_path, store_path, tmp_path / "chroma_db")
+    index = dataset.get_window_index()
+    before = dataset.nbytes()
+    sax = index.sax
+    own = [v for v in vars(sax).values() if isinstance(v, np.ndarray) and not np.shares_memory(v, index.ticker_ids)]
+    grown = dataset.nbytes() - before
+    # Buckets are counted; the ticker ids the SAX index shares with the window index are not counted twice
+    assert grown >= max(a.nbytes for a in own)
+    assert grown <= sum(a.nbytes for a in own)
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from seqindexing.app import layout
+from seqindexing.app.downsample import downsample_indices, lttb_indices, minmax_indices
+
+
+def reference_lttb(y, n_out):
+    """Textbook LTTB over the same bucket edges: one triangle per candidate, against the next bucket's mean."""
+    n = len(y)
+    edges = [int(e) for e in np.linspace(1, n - 1, n_out - 1)] + [n]
+    out, a = [0], 0
+    for i in range(n_out - 2):
+        nxt = range(edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else range(n - 1, n)
+        cx = sum(nxt) / len(nxt)
+        cy = sum(y[j] for j in nxt) / len(nxt)
+        areas = [abs((a - cx) * (y[b] - y[a]) - (a - b) * (cy - y[a])) for b in range(edges[i], edges[i + 1])]
+        a = edges[i] + int(np.argmax(areas))
+        out.append(a)
+    return out + [n - 1]
+
+
+@pytest.fixture
+def walk():
+    return np.cumsum(np.random.default_rng(3).normal(size=5000))
+
+
+@pytest.mark.parametrize("n_out", [3, 10, 257])
+def test_lttb_matches_reference(walk, n_out):
+    picked = lttb_indices(walk, n_out)
+    assert picked.tolist() == reference_lttb(walk, n_out)
+    assert np.all(np.diff(picked) > 0)
+
+
+def test_minmax_keeps_every_bucket_extreme(walk):
+    picked = minmax_indices(walk, 100)
+    assert len(picked) <= 100 and np.all(np.diff(picked) > 0)
+    for bucket in np.array_split(np.arange(len(walk)), 50):
+        assert walk[bucket].argmin() + bucket[0] in picked
+        assert walk[bucket].argmax() + bucket[0] in picked
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+def test_short_series_are_kept_whole(method):
+    assert downsample_indices(np.arange(50.0), 100, method).tolist() == list(range(50))
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+def test_visible_range_gets_the_full_budget(walk, method):
+    picked = downsample_indices(walk, 200, method, lo=1000, hi=1500)
+    inside = picked[(picked >= 1000) & (picked < 1500)]
+    assert len(inside) >= 190
+    # The rest of the series keeps a coarse overview: a point in each of its first and last buckets
+    assert picked[0] < 200 and picked[-1] >= len(walk) - 200
+    assert len(picked) <= 200 + 200 // 4 + 1
+
+
+def test_initial_main_figure_is_downsampled(catalog, monkeypatch):
+    series = catalog.get().series
+    monkeypatch.setattr(layout, "series", series)
+    monkeypatch.setattr(layout, "catalog", catalog)
+    monkeypatch.setattr(layout, "MAIN_PLOT_POINTS", 30)
+
+    def find(node, component_id):
+        if getattr(node, "id", None) == component_id:
+            return node
+        children = getattr(node, "children", None)
+        for child in children if isinstance(children, list) else [children]:
+            if child is not None and not isinstance(child, str):
+                found = find(child, component_id)
+                if found is not None:
+                    return found
+
+    [trace] = find(layout.serve_layout(), "example-plot").figure["data"]
+    expected = downsample_indices(series["y"][0], 30, layout.DOWNSAMPLE_METHOD)
+    assert len(trace["y"]) == len(expected) <= 30
+    np.testing.assert_array_equal(trace["y"], series["y"][0][expected])
@@ -0,0 +1,119 @@
+from pathlib import Path
+
+import numpy as np
+
+from seqindexing.app import store
+from seqindexing.app.store import open_window_store, store_exists
+from seqindexing.data.data_sp500 import build_manifest, build_windows, incremental_start, ingest, window_ids
+
+from conftest import WINDOW_SIZES, embed_windows
+
+
+def read_store(path):
+    names, columns = open_window_store(path)
+    return names, {name: np.asarray(column) for name, column in columns.items()}
+
+
+def canonical(store):
+    order = np.lexsort((store["start_idx"], store["window_size"], store["ticker_ids"]))
+    return {name: column[order] for name, column in store.items()}
+
+
+class RecordingCollection:
+    """Stands in for a Chroma collection: keeps every upsert call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def upsert(self, embeddings, documents, ids, metadatas):
+        self.calls.append((np.asarray(embeddings), documents, ids, metadatas))
+
+
+def test_build_windows_matches_per_window_embedding(prices):
+    values = prices.iloc[:, 2].to_numpy().copy()
+    values[50] = np.nan
+    starts, embeddings = build_windows(values, 7)
+    assert not np.isin(np.arange(44, 51), starts).any()
+    expected = embed_windows(prices.iloc[:, [2]], [7])[0]
+    kept = np.r_[np.arange(44), np.arange(51, len(values) - 6)]
+    np.testing.assert_array_equal(starts, kept)
+    np.testing.assert_allclose(embeddings, expected[kept], atol=1e-12)
+
+
+def test_ingest_writes_every_window_in_batches(prices):
+    collection = RecordingCollection()
+    n = ingest(prices, collection, window_sizes=WINDOW_SIZES, batch_size=100, store_path=None)
+    embeddings, _, ticker_ids, start_idx, window_size = [], [], [], [], []
+    for emb, documents, ids, metadatas in collection.calls:
+        assert len(emb) == len(documents) == len(ids) == len(metadatas) <= 100
+        embeddings.append(emb)
+        for meta in metadatas:
+            ticker_ids.append(list(prices.columns).index(meta["name"]))
+            start_idx.append(meta["start_idx"])
+            window_size.append(meta["window_size"])
+            assert meta["end_idx"] == meta["start_idx"] + meta["window_size"]
+    order = np.lexsort((start_idx, window_size, ticker_ids))
+    expected = embed_windows(prices, WINDOW_SIZES)[0]
+    assert n == len(order) == len(expected)
+    np.testing.assert_allclose(np.concatenate(embeddings)[order], expected, atol=1e-12)
+
+
+def test_store_rows_match_direct_embedding(prices, store_path):
+    names, store = read_store(store_path)
+    assert names == list(prices.columns)
+    row = np.flatnonzero((store["ticker_ids"] == 2) & (store["window_size"] == 7) & (store["start_idx"] == 40))[0]
+    window = prices.iloc[40:47, 2].to_numpy()
+    expected = np.interp(np.linspace(0, 1, 32), np.linspace(0, 1, 7), (window - window.min()) / np.ptp(window))
+    np.testing.assert_allclose(store["embeddings"][row], expected, atol=1e-6)
+    np.testing.assert_allclose(store["sq_norms"][row], expected @ expected, rtol=1e-5)
+
+
+def test_incremental_build_equals_full_build(prices, store_path, tmp_path):
+    path = tmp_path / "window_store"
+    ingest(prices.iloc[:90], None, window_sizes=WINDOW_SIZES, store_path=path)
+    manifest = build_manifest(prices.iloc[:90], WINDOW_SIZES, chroma=False, store=True)
+    since = incremental_start(prices, manifest, WINDOW_SIZES, chroma=False, store=True)
+    assert since == 90
+    ingest(prices, None, window_sizes=WINDOW_SIZES, store_path=path, since=since)
+
+    # Rows only need to be grouped by ticker; new windows follow each ticker's old ones
+    incremental, full = (canonical(read_store(p)[1]) for p in (path, store_path))
+    for name in ("ticker_ids", "start_idx", "window_size", "sax_words"):
+        np.testing.assert_array_equal(incremental[name], full[name])
+    np.testing.assert_allclose(incremental["embeddings"], full["embeddings"], atol=1e-6)
+    np.testing.assert_allclose(incremental["sq_norms"], full["sq_norms"], atol=1e-5)
+
+
+def test_incremental_start_falls_back_to_full_builds(prices):
+    manifest = build_manifest(prices, WINDOW_SIZES, chroma=False, store=True)
+    assert incremental_start(prices, manifest, WINDOW_SIZES, chroma=False, store=True) == len(prices)
+    assert incremental_start(prices, None, WINDOW_SIZES, chroma=False, store=True) is None
+    assert incremental_start(prices.iloc[:, :3], manifest, WINDOW_SIZES, chroma=False, store=True) is None
+    assert incremental_start(prices, manifest, [7], chroma=False, store=True) is None
+    assert incremental_start(prices, manifest, WINDOW_SIZES, chroma=True, store=True) is None
+    assert incremental_start(prices.iloc[:50], manifest, WINDOW_SIZES, chroma=False, store=True) is None
+
+
+def test_window_ids_are_deterministic(prices):
+    labels = [str(d) for d in prices.index]
+    ids = window_ids("T00", 7, np.array([0, 5]), labels)
+    assert ids == ["T00:7:2020-01-01", "T00:7:2020-01-08"]
+    assert window_ids("T00", 7, np.array([0, 5]), labels) == ids
+
+
+def test_rewriting_the_store_swaps_it_in_whole(prices, tmp_path, monkeypatch):
+    path = tmp_path / "window_store"
+    ingest(prices.iloc[:60], None, window_sizes=WINDOW_SIZES, store_path=path)
+    seen = []
+    rmtree = store.shutil.rmtree
+
+    def checked_rmtree(target, *args, **kwargs):
+        # The live store is never deleted in place, and a complete store is there whatever is deleted
+        seen.append(Path(target) != path and store_exists(path))
+        rmtree(target, *args, **kwargs)
+
+    monkeypatch.setattr(store.shutil, "rmtree", checked_rmtree)
+    ingest(prices, None, window_sizes=WINDOW_SIZES, store_path=path)
+    assert seen and all(seen)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["window_store"]
+    assert read_store(path)[1]["start_idx"].max() == len(prices) - min(WINDOW_SIZES)
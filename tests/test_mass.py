@@ -0,0 +1,82 @@
+import numpy as np
+
+from seqindexing.app import data
+from seqindexing.app.mass import LENGTH_EXPONENT, REFERENCE_LENGTH, mass_topk
+from seqindexing.app.utils import interpolate_to_fixed_size
+
+
+def znorm(x):
+    return (x - x.mean()) / x.std()
+
+
+def corrected(rho, m):
+    weight = ((m - 3) / (REFERENCE_LENGTH - 3)) ** LENGTH_EXPONENT
+    return 2.0 * (1.0 - np.tanh(np.arctanh(np.clip(rho, -1 + 1e-12, 1 - 1e-12)) * weight))
+
+
+def brute_mass(matrix, query, lengths, k):
+    """Every window's length-corrected z-normalized distance, each row's k best."""
+    out = []
+    for row, series in enumerate(matrix):
+        found = []
+        for m in lengths:
+            q = znorm(interpolate_to_fixed_size(query, m))
+            for start in range(len(series) - m + 1):
+                window = series[start:start + m]
+                if window.std() > 1e-12:
+                    rho = 1.0 - np.sum((q - znorm(window)) ** 2) / (2 * m)
+                    found.append((corrected(rho, m), start, m))
+        found.sort()
+        out.extend((row, start, m, score) for score, start, m in found[:k])
+    return out
+
+
+def test_mass_matches_brute_force(prices):
+    matrix = prices.to_numpy().T[:3, :80]
+    query = np.sin(np.linspace(0.0, 3.0, 20))
+    rows, starts, lengths, scores = mass_topk(matrix, query, range(5, 12), 4)
+    expected = brute_mass(matrix, query, range(5, 12), 4)
+    assert list(zip(rows.tolist(), starts.tolist(), lengths.tolist())) == [e[:3] for e in expected]
+    np.testing.assert_allclose(scores, [e[3] for e in expected], atol=1e-8)
+
+
+def test_equal_correlation_scores_worse_on_shorter_windows():
+    rho = np.full(3, 0.9)
+    short, ref, long = (corrected(rho, m)[0] for m in (8, REFERENCE_LENGTH, 60))
+    assert short > ref > long
+    assert np.isclose(ref, 2 * (1 - 0.9))
+
+
+def test_mass_searches_the_sketch_as_drawn(catalog):
+    shape = np.abs(np.sin(np.linspace(0.0, 4.0, 9)))
+    [hits] = data.search_vectors([shape], k=2, window_range=(5, 12), metric="mass")
+    expected = data.search_raw_series(shape, k=2, window_range=(5, 12))
+    assert [(h["name"], h["start_idx"], h["window_size"]) for h in hits] == \
+        [(h["name"], h["start_idx"], h["window_size"]) for h in expected]
+    resampled = data.search_raw_series(interpolate_to_fixed_size(shape, 32), k=2, window_range=(5, 12))
+    assert [h["score"] for h in hits] != [h["score"] for h in resampled]
+
+
+def test_mass_skips_flat_windows_and_short_lengths():
+    matrix = np.r_[np.ones(20), np.arange(20.0)].reshape(2, 20)
+    rows, starts, lengths, scores = mass_topk(matrix, np.arange(8.0), [2, 6], 3)
+    assert rows.tolist() == [1, 1, 1]
+    assert set(lengths.tolist()) == {6}
+    np.testing.assert_allclose(scores, 0.0, atol=1e-6)
+
+
+def test_exclusion_drops_trivial_matches_only(prices):
+    matrix = prices.to_numpy().T[:, :80]
+    query = np.cos(np.linspace(0.0, 5.0, 12))
+    plain = mass_topk(matrix, query, range(5, 16), 1)
+    rows, starts, lengths, scores = mass_topk(matrix, query, range(5, 16), 6, zone=0.5)
+    for row in range(len(matrix)):
+        mine = rows == row
+        assert (starts[mine][0], lengths[mine][0]) == (plain[1][row], plain[2][row])
+        assert list(scores[mine]) == sorted(scores[mine])
+        for i in range(mine.sum()):
+            for j in range(i):
+                gap = abs(starts[mine][i] - starts[mine][j])
+                assert gap >= 0.5 * 5
+                if lengths[mine][i] == lengths[mine][j]:
+                    assert gap >= 0.5 * lengths[mine][i]
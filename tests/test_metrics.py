@@ -0,0 +1,89 @@
+import io
+import json
+import logging
+import os
+import time
+
+import pytest
+
+from seqindexing.app import background
+from seqindexing.app.logs import configure_logging
+from seqindexing.app.metrics import Metrics
+
+
+def counters(registry):
+    return {(c["labels"].get("callback"), c["value"]) for c in registry.snapshot()["counters"].get("calls", [])}
+
+
+def record_calls(registry):
+    registry.observe("seconds", 0.2, callback="submit")
+    registry.inc("calls", callback="submit")
+
+
+def test_background_job_samples_reach_the_server_once(tmp_path):
+    job = Metrics(spool_dir=tmp_path)
+    job.mark_background_job()
+    record_calls(job)
+    job.flush_spool()
+    job.flush_spool()  # nothing new to hand over
+    assert len(list(tmp_path.glob("*.json"))) == 1
+    assert job.snapshot()["counters"]["calls"][0]["value"] == 1  # a job never collects
+
+    server = Metrics(spool_dir=tmp_path)
+    assert counters(server) == {("submit", 1)}
+    [hist] = server.snapshot()["histograms"]["seconds"]
+    assert hist["count"] == 1 and hist["max_ms"] == 200.0
+    assert list(tmp_path.iterdir()) == []
+    assert counters(server) == {("submit", 1)}
+
+
+def test_forked_server_workers_do_not_spool(tmp_path):
+    # As under a preforking server: workers are forks of the process that built the registry
+    registry = Metrics(spool_dir=tmp_path)
+    pid = os.fork()
+    if pid == 0:
+        record_calls(registry)
+        registry.flush_spool()
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert not tmp_path.exists() or list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.skipif(background.diskcache is None, reason="needs diskcache")
+def test_job_manager_marks_its_job_processes(tmp_path, monkeypatch):
+    monkeypatch.setattr(background, "metrics", Metrics(spool_dir=tmp_path / "spool"))
+    manager = background.JobManager(background.diskcache.Cache(str(tmp_path / "cache")))
+    manager.call_job_fn("key", lambda *args: record_calls(background.metrics), (), {})
+    deadline = time.monotonic() + 30
+    while not list((tmp_path / "spool").glob("*.json")) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert counters(Metrics(spool_dir=tmp_path / "spool")) == {("submit", 1)}
+    assert background.metrics.snapshot()["counters"] == {}  # the server process records nothing itself
+
+
+@pytest.fixture
+def restore_logging():
+    logger = logging.getLogger("seqindexing")
+    state = logger.handlers[:], logger.level, logger.propagate
+    yield
+    logger.handlers[:], logger.level, logger.propagate = state
+
+
+def test_log_formats(restore_logging):
+    stream = io.StringIO()
+    logger = configure_logging("INFO", "json", stream=stream)
+    child = logging.getLogger("seqindexing.app.test")
+    child.debug("hidden", extra={"fields": {"n": 1}})
+    child.info("search", extra={"fields": {"metric": "dtw", "ms": 1.5}})
+    [line] = stream.getvalue().splitlines()
+    entry = json.loads(line)
+    assert (entry["level"], entry["logger"], entry["event"], entry["metric"], entry["ms"]) == \
+        ("INFO", "seqindexing.app.test", "search", "dtw", 1.5)
+
+    stream = io.StringIO()
+    configure_logging("DEBUG", "text", stream=stream)
+    assert len(logger.handlers) == 1
+    child.debug("hidden", extra={"fields": {"n": 1}})
+    assert stream.getvalue().rstrip().endswith("DEBUG   seqindexing.app.test: hidden n=1")
+    with pytest.raises(ValueError):
+        configure_logging("INFO", "xml")
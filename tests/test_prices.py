@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+import pytest
+
+from seqindexing.app import prices as price_cache
+from seqindexing.app.prices import load_price_matrix, load_prices
+
+
+def fail(*args, **kwargs):
+    raise AssertionError("called on a cache hit")
+
+
+@pytest.fixture
+def csv_path(prices, tmp_path):
+    path = tmp_path / "prices.csv"
+    prices.to_csv(path)
+    return path
+
+
+def assert_matches(loaded, frame):
+    values, dates, titles = loaded
+    np.testing.assert_allclose(values, frame.to_numpy(dtype=np.float32).T)
+    np.testing.assert_array_equal(dates, frame.index.to_numpy(dtype="datetime64[ns]"))
+    assert titles == list(frame.columns)
+
+
+def test_untouched_csv_reuses_the_cache(prices, csv_path, tmp_path, monkeypatch):
+    assert_matches(load_price_matrix(csv_path, tmp_path / "cache"), prices)
+    monkeypatch.setattr(price_cache, "_read_csv", fail)
+    monkeypatch.setattr(price_cache, "_file_hash", fail)
+    assert_matches(load_price_matrix(csv_path, tmp_path / "cache"), prices)
+    # A binary directory in the cache layout loads directly
+    assert_matches(load_prices(tmp_path / "cache", None), prices)
+
+
+def test_rewritten_csv_rebuilds_the_matrix(prices, csv_path, tmp_path):
+    load_price_matrix(csv_path, tmp_path / "cache")
+    changed = prices.iloc[:, :3] * 2.0
+    changed.to_csv(csv_path)
+    assert_matches(load_price_matrix(csv_path, tmp_path / "cache"), changed)
+
+
+def test_touched_csv_is_hashed_once_and_reused(prices, csv_path, tmp_path, monkeypatch):
+    load_price_matrix(csv_path, tmp_path / "cache")
+    st = csv_path.stat()
+    os.utime(csv_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    monkeypatch.setattr(price_cache, "_read_csv", fail)
+    assert_matches(load_price_matrix(csv_path, tmp_path / "cache"), prices)
+    # The new mtime is recorded, so the next load skips the hash too
+    monkeypatch.setattr(price_cache, "_file_hash", fail)
+    assert_matches(load_price_matrix(csv_path, tmp_path / "cache"), prices)
@@ -0,0 +1,41 @@
+import pytest
+
+from seqindexing.app import results
+from seqindexing.app.results import DiskResultStore, MemoryResultStore
+
+
+@pytest.mark.parametrize("session_id", ["abc-123", "../../etc", "a/b", "a\\b", "x" * 200, "", None, "s:1"])
+def test_any_session_id_round_trips(tmp_path, session_id):
+    store = DiskResultStore(tmp_path / "results", max_bytes=1 << 20)
+    handle = store.put(session_id, {"AAPL": [1, 2]})
+    assert store.get(handle) == {"AAPL": [1, 2]}
+    assert [p.parent for p in (tmp_path / "results").iterdir()] == [tmp_path / "results"]
+
+
+@pytest.mark.parametrize("handle", ["", "abc", "../x:" + "0" * 32, "a:b", "a:" + "0" * 31 + "/", None])
+def test_malformed_handles_miss(tmp_path, handle):
+    assert DiskResultStore(tmp_path, max_bytes=1 << 20).get(handle) is None
+
+
+def test_disk_eviction_is_batched_and_keeps_the_newest(tmp_path, monkeypatch):
+    monkeypatch.setattr(results, "EVICT_EVERY_PUTS", 4)
+    store = DiskResultStore(tmp_path, max_bytes=1 << 20)
+    scans = []
+    original = store._evict
+    monkeypatch.setattr(store, "_evict", lambda keep: (scans.append(keep), original(keep)))
+    handles = [store.put("s", list(range(10))) for _ in range(8)]
+    assert len(scans) == 2
+
+    store.max_bytes = 1
+    newest = store.put("s", "x" * 100)
+    assert len(scans) == 3  # a put of a tenth of the budget triggers a scan on its own
+    assert store.get(newest) == "x" * 100
+    assert all(store.get(h) is None for h in handles)
+
+
+def test_memory_store_evicts_least_recently_read():
+    store = MemoryResultStore(max_bytes=120)
+    a, b = store.put("s", "a" * 40), store.put("s", "b" * 40)
+    store.get(a)
+    c = store.put("s", "c" * 40)
+    assert (store.get(a), store.get(b), store.get(c)) == ("a" * 40, None, "c" * 40)
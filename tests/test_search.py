@@ -0,0 +1,146 @@
+import numpy as np
+import pytest
+
+from seqindexing.app.dtw import dtw_batch, dtw_topk, keogh_envelope, lower_bounds, reversed_lower_bounds
+from seqindexing.app.qetch import qetch_scores, segment_sketch
+from seqindexing.app.topk import grouped_topk
+
+
+def reference_dtw(a, b, radius):
+    """Textbook banded DTW with squared point costs."""
+    n, m = len(a), len(b)
+    cost = np.full((n + 1, m + 1), np.inf)
+    cost[0, 0] = 0.0
+    for i in range(1, n + 1):
+        for j in range(max(1, i - radius), min(m, i + radius) + 1):
+            cost[i, j] = (a[i - 1] - b[j - 1]) ** 2 + min(cost[i - 1, j], cost[i, j - 1], cost[i - 1, j - 1])
+    return cost[n, m]
+
+
+def brute_hits(index, scores, k, rows=None):
+    """(name, start, window size) of each ticker's k best rows, by ticker then score."""
+    rows = np.arange(len(index)) if rows is None else rows
+    out = []
+    for tid in np.unique(index.ticker_ids[rows]):
+        mine = rows[index.ticker_ids[rows] == tid]
+        for row in mine[np.argsort(scores[mine], kind="stable")][:k]:
+            out.append((index.names[tid], int(index.start_idx[row]), int(index.window_size[row])))
+    return out
+
+
+def keys(hits):
+    return [(h["name"], h["start_idx"], h["window_size"]) for h in hits]
+
+
+def squared_l2(index, vector):
+    emb = np.asarray(index.embeddings, dtype=np.float64)
+    return ((emb - vector) ** 2).sum(axis=1)
+
+
+def test_euclidean_matches_brute_force(index, sketch):
+    hits = index.search(sketch, k=5)
+    assert keys(hits) == brute_hits(index, squared_l2(index, sketch), 5)
+    expected = np.sort(squared_l2(index, sketch)[index.ticker_ids == 0])[:5]
+    np.testing.assert_allclose([h["score"] for h in hits[:5]], expected, rtol=1e-4, atol=1e-4)
+
+
+def test_filters_match_brute_force(index, sketch):
+    names = [index.names[1], index.names[3]]
+    rows = np.flatnonzero(np.isin(index.ticker_ids, [1, 3]) & (index.window_size == 14))
+    hits = index.search(sketch, k=3, names=names, window_range=(10, 20))
+    assert keys(hits) == brute_hits(index, squared_l2(index, sketch), 3, rows)
+
+
+def test_sax_pruning_is_exact(index, sketch):
+    assert keys(index.search(sketch, k=5, sax_min_rows=0)) == keys(index.search(sketch, k=5))
+
+
+def test_dtw_batch_matches_reference(index, sketch):
+    rows = np.arange(0, len(index), 37)
+    expected = [reference_dtw(sketch.astype(np.float64), index.embeddings[r].astype(np.float64), 3) for r in rows]
+    np.testing.assert_allclose(dtw_batch(sketch, index.embeddings[rows], 3), expected, rtol=1e-9)
+
+
+def test_envelopes_and_lower_bounds(index, sketch):
+    rows = index.embeddings[::11]
+    upper, lower = keogh_envelope(rows, 3)
+    for row, up, low in zip(rows, upper, lower):
+        windows = [row[max(0, j - 3):j + 4] for j in range(len(row))]
+        np.testing.assert_array_equal(up, [w.max() for w in windows])
+        np.testing.assert_array_equal(low, [w.min() for w in windows])
+    exact = dtw_batch(sketch, rows, 3)
+    assert np.all(lower_bounds(sketch.astype(np.float64), rows, 3, block=7) <= exact + 1e-12)
+    assert np.all(reversed_lower_bounds(sketch.astype(np.float64), rows, 3, block=7) <= exact + 1e-12)
+
+
+def test_abandoned_rows_are_inf(index, sketch):
+    rows = index.embeddings[::5]
+    exact = dtw_batch(sketch, rows, 3)
+    bound = np.quantile(exact, 0.3)
+    np.testing.assert_allclose(dtw_batch(sketch, rows, 3, abandon_at=np.full(len(rows), bound)),
+                               np.where(exact <= bound, exact, np.inf))
+
+
+@pytest.mark.parametrize("chunk", [1, 16, 1 << 20])
+def test_dtw_topk_matches_exhaustive_dtw(index, sketch, chunk):
+    exact = dtw_batch(sketch, index.embeddings, 3)
+    picked, scores = dtw_topk(sketch, index.embeddings, index.ticker_ids, 6, 3, chunk=chunk)
+    expected = grouped_topk(index.ticker_ids, exact, 6)
+    np.testing.assert_array_equal(index.ticker_ids[picked], index.ticker_ids[expected])
+    np.testing.assert_allclose(scores, exact[expected], rtol=1e-12)
+
+
+def test_dtw_search_matches_brute_force(index, sketch):
+    scores = np.array([reference_dtw(sketch.astype(np.float64), e.astype(np.float64), 3) for e in index.embeddings])
+    hits = index.search(sketch, k=4, metric="dtw", dtw_radius=3)
+    assert keys(hits) == brute_hits(index, scores, 4)
+    expected = [scores[(index.ticker_ids == index.name_to_id[h["name"]]) & (index.start_idx == h["start_idx"])
+                       & (index.window_size == h["window_size"])][0] for h in hits]
+    np.testing.assert_allclose([h["score"] for h in hits], expected, rtol=1e-6)
+
+
+@pytest.mark.parametrize("metric", ["euclidean", "dtw", "qetch"])
+def test_suppressed_hits_are_distinct_and_best_first(index, sketch, metric):
+    hits = index.search(sketch, k=5, metric=metric, exclusion=0.5, overfetch=2)
+    by_ticker = {}
+    for hit in hits:
+        by_ticker.setdefault(hit["name"], []).append(hit)
+    plain = {h["name"]: h for h in reversed(index.search(sketch, k=1, metric=metric))}
+    for name, mine in by_ticker.items():
+        assert len(mine) == 5
+        assert mine[0]["start_idx"] == plain[name]["start_idx"]
+        assert [h["score"] for h in mine] == sorted(h["score"] for h in mine)
+        for i, a in enumerate(mine):
+            for b in mine[:i]:
+                overlap = min(a["end_idx"], b["end_idx"]) - max(a["start_idx"], b["start_idx"])
+                assert overlap <= 0.5 * min(a["window_size"], b["window_size"])
+
+
+def test_search_batch_matches_search(index, sketch):
+    rng = np.random.default_rng(2)
+    vectors = np.vstack([sketch, rng.random((6, index.dim)).astype(np.float32)])
+    for exclusion in (0.0, 0.5):
+        batch = index.search_batch(vectors, k=3, exclusion=exclusion, overfetch=1)
+        assert [keys(h) for h in batch] == [keys(index.search(v, k=3, exclusion=exclusion, overfetch=1))
+                                            for v in vectors]
+
+
+def test_segments_split_at_turning_points():
+    query = np.r_[np.linspace(0, 1, 6), np.linspace(1, 0, 6)[1:], np.zeros(3)]
+    np.testing.assert_array_equal(segment_sketch(query), [0, 5, len(query) - 1])
+
+
+def test_qetch_ignores_vertical_scale_and_offset(index):
+    row = 123
+    sketch = 3.0 * index.embeddings[row].astype(np.float64) + 5.0
+    scores = qetch_scores(sketch, index.embeddings)
+    mine = np.flatnonzero(index.ticker_ids == index.ticker_ids[row])
+    assert mine[np.argmin(scores[mine])] == row
+    hits = index.search(sketch, k=1, metric="qetch", names=[index.names[index.ticker_ids[row]]])
+    assert (hits[0]["start_idx"], hits[0]["window_size"]) == (index.start_idx[row], index.window_size[row])
+    np.testing.assert_allclose(hits[0]["score"], scores[row], rtol=1e-4, atol=1e-6)
+
+
+def test_unknown_names_give_no_hits(index, sketch):
+    assert index.search(sketch, k=3, names=["nope"]) == []
+    assert index.search_batch([sketch], k=3, names=["nope"]) == [[]]
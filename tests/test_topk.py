@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from seqindexing.app.topk import distinct_topk, grouped_topk, kth_per_group, suppress_overlaps
+
+
+def brute_topk(groups, scores, k):
+    """Positions of each group's k smallest finite scores, by group then score."""
+    out = []
+    for g in np.unique(groups):
+        members = np.flatnonzero((groups == g) & np.isfinite(scores))
+        out.extend(members[np.argsort(scores[members], kind="stable")][:k].tolist())
+    return np.asarray(out, dtype=np.intp)
+
+
+def brute_suppress(groups, starts, ends, k, zone):
+    """Greedy one-candidate-at-a-time non-maximum suppression."""
+    out, kept = [], {}
+    for i in range(len(groups)):
+        mine = kept.setdefault(groups[i], [])
+        if len(mine) >= k:
+            continue
+        if any(min(ends[i], e) - max(starts[i], s) > (1 - zone) * min(ends[i] - starts[i], e - s) for s, e in mine):
+            continue
+        mine.append((starts[i], ends[i]))
+        out.append(i)
+    return np.asarray(out, dtype=np.intp)
+
+
+def random_groups(rng, n, n_groups=8):
+    groups = np.sort(rng.integers(0, n_groups, n))
+    scores = rng.random(n)
+    scores[rng.random(n) < 0.1] = np.inf
+    return groups, scores
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_grouped_topk_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    groups, scores = random_groups(rng, int(rng.integers(1, 200)))
+    k = int(rng.integers(1, 10))
+    np.testing.assert_array_equal(grouped_topk(groups, scores, k), brute_topk(groups, scores, k))
+
+
+def test_grouped_topk_empty():
+    assert len(grouped_topk(np.empty(0, dtype=int), np.empty(0), 3)) == 0
+    assert len(grouped_topk(np.zeros(4, dtype=int), np.arange(4.0), 0)) == 0
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_kth_per_group_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    groups, scores = random_groups(rng, 150)
+    k = int(rng.integers(1, 8))
+    expected = np.empty(len(groups))
+    for g in np.unique(groups):
+        mine = np.sort(scores[groups == g])
+        expected[groups == g] = mine[k - 1] if len(mine) >= k else np.inf
+    np.testing.assert_array_equal(kth_per_group(groups, scores, k), expected)
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_suppress_overlaps_matches_greedy(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 300))
+    groups = np.sort(rng.integers(0, 12, n))
+    starts = rng.integers(0, 200, n)
+    ends = starts + rng.choice([7, 14, 30], n)
+    k = int(rng.integers(1, 8))
+    zone = float(rng.choice([0.25, 0.5, 1.0, 1.5]))
+    np.testing.assert_array_equal(suppress_overlaps(groups, starts, ends, k, zone),
+                                  brute_suppress(groups, starts, ends, k, zone))
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("overfetch", [1, 4])
+def test_distinct_topk_matches_suppression_over_everything(seed, overfetch):
+    rng = np.random.default_rng(seed)
+    n = 400
+    groups = np.sort(rng.integers(0, 6, n))
+    starts = rng.integers(0, 120, n)
+    ends = starts + rng.choice([7, 14], n)
+    scores = rng.random(n)
+    k, zone = 4, 0.5
+    fetches = []
+
+    def fetch(m, wanted):
+        fetches.append(wanted)
+        mask = np.ones(n, dtype=bool) if wanted is None else np.isin(groups, wanted)
+        pos = np.flatnonzero(mask)[grouped_topk(groups[mask], scores[mask], m)]
+        return groups[pos], starts[pos], ends[pos], pos
+
+    _, _, _, pos = distinct_topk(fetch, k, zone, overfetch)
+    order = np.lexsort((scores, groups))
+    expected = order[brute_suppress(groups[order], starts[order], ends[order], k, zone)]
+    np.testing.assert_array_equal(pos, expected)
+    if overfetch == 1:
+        # k candidates rarely hold k distinct events: only short groups are fetched again
+        assert len(fetches) > 1 and all(w is not None for w in fetches[1:])
+
+
+def test_distinct_topk_without_zone_is_plain_topk():
+    def fetch(m, wanted):
+        return (np.zeros(m, dtype=int), np.zeros(m, dtype=int), np.full(m, 7), np.arange(m))
+
+    _, _, _, pos = distinct_topk(fetch, 3, 0.0, 4)
+    np.testing.assert_array_equal(pos, [0, 1, 2])